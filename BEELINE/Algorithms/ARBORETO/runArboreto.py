@@ -18,15 +18,49 @@ def parseArgs(args):
     parser.add_option('', '--outFile', type = 'str',
                       help='File where the output network is stored')
 
+    parser.add_option('', '--workers', type = 'int', default = 0,
+                      help='Number of worker processes of a local Dask cluster. '
+                      'If 0, the trees are learned in threads of this process')
+
+    parser.add_option('', '--threads', type = 'int', default = None,
+                      help='Number of threads of each worker. Defaults to 1 '
+                      'with worker processes, and to all the cores otherwise')
+
+    parser.add_option('', '--memoryLimit', type = 'str', default = 'auto',
+                      help='Memory limit of each worker process, e.g. 4GB')
+
+    parser.add_option('', '--scheduler', type = 'str', default = None,
+                      help='Address of a running Dask scheduler to submit the '
+                      'trees to, e.g. tcp://10.0.0.1:8786, instead of a local cluster')
+
     (opts, args) = parser.parse_args(args)
 
     return opts, args
 
+def getClient(opts):
+    '''
+    Returns a Dask client connected to the scheduler set in the options,
+    to a local cluster of worker processes, or to threads of this process.
+    '''
+    if opts.scheduler:
+        return Client(opts.scheduler)
+    if opts.workers > 0:
+        # Processes do not share the GIL, which the
+        # Python code of the tree ensembles holds
+        cluster = LocalCluster(n_workers = opts.workers,
+                               threads_per_worker = opts.threads or 1,
+                               memory_limit = opts.memoryLimit,
+                               processes = True)
+        return Client(cluster)
+    if opts.threads:
+        return Client(processes = False, n_workers = 1, threads_per_worker = opts.threads)
+    return Client(processes = False)
+
 def main(args):
     opts, args = parseArgs(args)
     inDF = pd.read_csv(opts.inFile, sep = '\t', index_col = 0, header = 0)
 
-    client = Client(processes = False)    
+    client = getClient(opts)
 
     if opts.algo == 'GENIE3':
         network = genie3(inDF.to_numpy(), client_or_address = client, gene_names = inDF.columns)
@@ -38,6 +72,8 @@ def main(args):
 
     else:
         print("Wrong algorithm name. Should either be GENIE3 or GRNBoost2.")
+
+    client.close()
                         
 if __name__ == "__main__":
     main(sys.argv)
@@ -11,6 +11,7 @@ definition of BLEval class
 
 """
 import os
+import json
 import yaml
 import argparse
 import itertools
@@ -25,12 +26,14 @@ from pathlib import Path
 import concurrent.futures
 from itertools import permutations
 from collections import defaultdict
+from functools import partial
 from multiprocessing import Pool, cpu_count
 from networkx.convert_matrix import from_pandas_adjacency
 
 
 # local imports
-from BLEval.parseTime import getTime
+from BLEval.parseTime import getTime, getTelemetry, summarizeTelemetry, TelemetryKeys, TimeFields
+from BLEval.dataCache import DataCache, initProcessCache
 from BLEval.computeDGAUC import PRROC
 from BLEval.computeBorda import Borda
 from BLEval.computeJaccard import Jaccard
@@ -39,6 +42,7 @@ from BLEval.computeNetMotifs import Motifs
 from BLEval.computeEarlyPrec import EarlyPrec
 from BLEval.computePathStats import pathAnalysis
 from BLEval.computeSignedEPrec import signedEPrec
+from BLRun.outputNames import getOutputNames
 
 
 class InputSettings(object):
@@ -54,7 +58,7 @@ class InputSettings(object):
     :param datasets:   List of dataset names
     :type datasets: list
         
-    :param algorithms:   List of algorithm names
+    :param algorithms:   List of [name, params] pairs, one per combination of parameters of an algorithm. The name of a combination from a parameter sweep is <algorithm>/<hash of the parameters>, the path of its outputs.
     :type algorithms: list
     '''
 
@@ -91,14 +95,76 @@ class BLEval(object):
     The BEELINE Evaluation object is created by parsing a user-provided configuration
     file. Its methods provide for further processing its inputs into
     a series of jobs to be run, as well as running these jobs.
+
+    Parsed reference networks and predictions are kept in a
+    :class:`BLEval.dataCache.DataCache` shared by all the evaluation
+    methods, so that each file is parsed once per evaluation.
+
+    Each evaluation method splits its work into independent units, one
+    per dataset-algorithm combination where possible, and runs them in
+    a pool of worker processes if workers is greater than 1. Results are
+    merged in the order of the datasets and algorithms in the config file,
+    so they do not depend on the number of workers.
     '''
 
     def __init__(self,
             input_settings: InputSettings,
-            output_settings: OutputSettings) -> None:
+            output_settings: OutputSettings,
+            cache_size = 128,
+            workers = 1) -> None:
 
         self.input_settings = input_settings
         self.output_settings = output_settings
+        self.cache = DataCache(maxsize = cache_size)
+        self.workers = workers
+
+
+    def __subset(self, datasets, algorithms):
+        '''
+        Returns a BLEval object restricted to the given datasets
+        and algorithms, sharing the output settings and the cache.
+        '''
+        subset = BLEval(InputSettings(self.input_settings.datadir,
+                                      datasets, algorithms),
+                        self.output_settings, workers = 1)
+        subset.cache = self.cache
+        return subset
+
+
+    def __runUnits(self, function, *args, unit = " Units"):
+        '''
+        Calls function on each unit of work, i.e., on each
+        element of zip(*args), in a pool of worker processes
+        if self.workers > 1.
+
+        :returns:
+            A list of results in the same order as the units.
+        '''
+        numUnits = len(args[0])
+        if self.workers > 1 and numUnits > 1:
+            # The cache is sent to the units as a reference to the
+            # cache each worker creates once, see BLEval.dataCache
+            with concurrent.futures.ProcessPoolExecutor(max_workers = self.workers,
+                                                        initializer = initProcessCache,
+                                                        initargs = (self.cache.maxsize,)) as executor:
+                return list(tqdm(executor.map(function, *args),
+                                 total = numUnits, unit = unit))
+        return [function(*unitArgs) for unitArgs in tqdm(zip(*args),
+                                 total = numUnits, unit = unit)]
+
+
+    def __datasetAlgorithmUnits(self):
+        '''
+        Returns the list of datasets, and a list of BLEval objects
+        restricted to each dataset-algorithm combination.
+        '''
+        datasets = []
+        subsets = []
+        for dataset in self.input_settings.datasets:
+            for algo in self.input_settings.algorithms:
+                datasets.append(dataset)
+                subsets.append(self.__subset([dataset], [algo]))
+        return datasets, subsets
 
 
     def computeAUC(self, directed = True):
@@ -118,21 +184,60 @@ class BLEval(object):
             - AUPRC: A dataframe containing AUPRC values for each algorithm-dataset combination
             - AUROC: A dataframe containing AUROC values for each algorithm-dataset combination
         '''
-        AUPRCDict = {}
-        AUROCDict = {}
+        AUPRCDict = {dataset['name']: {} for dataset in self.input_settings.datasets}
+        AUROCDict = {dataset['name']: {} for dataset in self.input_settings.datasets}
 
-        for dataset in tqdm(self.input_settings.datasets, 
-                            total = len(self.input_settings.datasets), unit = " Datasets"):
-            
-            AUPRC, AUROC = PRROC(dataset, self.input_settings, 
-                                    directed = directed, selfEdges = False, plotFlag = False)
-            AUPRCDict[dataset['name']] = AUPRC
-            AUROCDict[dataset['name']] = AUROC
+        datasets, subsets = self.__datasetAlgorithmUnits()
+        results = self.__runUnits(partial(PRROC, directed = directed, selfEdges = False,
+                                          plotFlag = False, cache = self.cache),
+                                  datasets, [subset.input_settings for subset in subsets])
+
+        for dataset, (AUPRC, AUROC) in zip(datasets, results):
+            AUPRCDict[dataset['name']].update(AUPRC)
+            AUROCDict[dataset['name']].update(AUROC)
         AUPRC = pd.DataFrame(AUPRCDict)
         AUROC = pd.DataFrame(AUROCDict)
         return AUPRC, AUROC
     
 
+    def getParams(self):
+        """
+        Lists the parameters of each evaluated algorithm, to identify
+        the combinations of a parameter sweep in the results.
+
+        :returns:
+            A DataFrame with one row per combination of parameters, indexed by its name
+        """
+        return pd.DataFrame([algo[1] for algo in self.input_settings.algorithms],
+                            index = [algo[0] for algo in self.input_settings.algorithms])
+
+    def getFailures(self):
+        """
+        Lists the runs that failed, from the failure.json records
+        written by BLRunner.py in their output folders.
+
+        :returns:
+            A DataFrame with one row per failed algorithm-dataset combination,
+            and the columns Dataset, Algorithm, Stage ('inputs', 'run' or
+            'outputs'), Error, Message, Attempts, TimedOut and Time
+        """
+        columns = ['Dataset', 'Algorithm', 'Stage', 'Error', 'Message',
+                   'Attempts', 'TimedOut', 'Time']
+        outDir = str(self.output_settings.base_dir) + \
+                 str(self.input_settings.datadir).split("inputs")[1] + "/"
+        rows = []
+        for dataset in self.input_settings.datasets:
+            for algo in self.input_settings.algorithms:
+                failureFile = Path(outDir + dataset['name'] + '/' + algo[0] + '/failure.json')
+                if not failureFile.exists():
+                    continue
+                with open(str(failureFile)) as inFile:
+                    record = json.load(inFile)
+                rows.append([dataset['name'], algo[0], record.get('stage'), record.get('error'),
+                             record.get('message'), record.get('attempts'),
+                             record.get('timedOut'), record.get('time')])
+        return pd.DataFrame(rows, columns = columns)
+
     def parseTime(self):
         """
         Parse time output for each
@@ -141,15 +246,53 @@ class BLEval(object):
         :returns:
             A dictionary of times for all dataset-algorithm combinations
         """
-        TimeDict = dict()
+        TimeDict = {dataset['name']: {} for dataset in self.input_settings.datasets}
 
-        for dataset in tqdm(self.input_settings.datasets, 
-                            total = len(self.input_settings.datasets), unit = " Datasets"):
-            timevals  = getTime(self, dataset)
-            TimeDict[dataset["name"]] = timevals
+        datasets, subsets = self.__datasetAlgorithmUnits()
+        results = self.__runUnits(getTime, subsets, datasets)
+
+        for dataset, timevals in zip(datasets, results):
+            TimeDict[dataset["name"]].update(timevals)
 
         return TimeDict
 
+    def parseTelemetry(self):
+        """
+        Parse all the fields of the time output of each
+        algorithm-dataset combination, per trajectory.
+
+        :returns:
+            A DataFrame with one row per time file, the columns Dataset,
+            Algorithm, Trajectory, File and Status ('ok', 'failed' or
+            'missing'), and one column per field of the output of
+            time -v, e.g. UserTime, WallClock and MaxRSS, see
+            :func:`BLEval.parseTime.parseTimeFile`.
+        """
+        datasets, subsets = self.__datasetAlgorithmUnits()
+        results = self.__runUnits(getTelemetry, subsets, datasets)
+
+        rows = [row for unitRows in results for row in unitRows]
+        columns = TelemetryKeys + list(TimeFields.values())
+        columns += sorted(set(name for row in rows for name in row) - set(columns))
+        return pd.DataFrame(rows, columns = columns)
+
+    def summarizeTime(self, telemetry = None):
+        """
+        Summarize the time output of each algorithm-dataset
+        combination: CPU time, wall clock time, peak memory,
+        and whether the algorithm failed.
+
+        :param telemetry: The output of :meth:`parseTelemetry`, which is computed if not given.
+        :type telemetry: DataFrame
+
+        :returns:
+            A DataFrame with one row per algorithm-dataset combination,
+            see :func:`BLEval.parseTime.summarizeTelemetry`
+        """
+        if telemetry is None:
+            telemetry = self.parseTelemetry()
+        return summarizeTelemetry(telemetry)
+
     def computeJaccard(self):
 
         '''
@@ -166,9 +309,12 @@ class BLEval(object):
         JaccDF['Jaccard MAD'] = {}
         outDir = str(self.output_settings.base_dir) + \
                  str(self.input_settings.datadir).split("inputs")[1] + "/"
-        for algo in tqdm(self.input_settings.algorithms, unit = " Algorithms"):
-            if algo[1]['should_run'] == True:
-                JaccDF['Jaccard Median'][algo[0]], JaccDF['Jaccard MAD'][algo[0]] = Jaccard(self, algo[0])
+        algorithms = [algo[0] for algo in self.input_settings.algorithms
+                      if algo[1]['should_run'] == True]
+        results = self.__runUnits(Jaccard, [self]*len(algorithms), algorithms,
+                                  unit = " Algorithms")
+        for algorithm, (median, mad) in zip(algorithms, results):
+            JaccDF['Jaccard Median'][algorithm], JaccDF['Jaccard MAD'][algorithm] = median, mad
             
         return pd.DataFrame(JaccDF)     
 
@@ -189,9 +335,12 @@ class BLEval(object):
         corrDF['Spearman MAD'] = {}
         outDir = str(self.output_settings.base_dir) + \
                  str(self.input_settings.datadir).split("inputs")[1] + "/"
-        for algo in tqdm(self.input_settings.algorithms, unit = " Algorithms"):
-            if algo[1]['should_run'] == True:
-                corrDF['Spearman Median'][algo[0]],corrDF['Spearman MAD'][algo[0]] = Spearman(self, algo[0])
+        algorithms = [algo[0] for algo in self.input_settings.algorithms
+                      if algo[1]['should_run'] == True]
+        results = self.__runUnits(Spearman, [self]*len(algorithms), algorithms,
+                                  unit = " Algorithms")
+        for algorithm, (median, mad) in zip(algorithms, results):
+            corrDF['Spearman Median'][algorithm], corrDF['Spearman MAD'][algorithm] = median, mad
             
         return pd.DataFrame(corrDF)
 
@@ -215,9 +364,14 @@ class BLEval(object):
         FFLDict = {}
         FBLDict = {}
         MIDict = {}
-        for dataset in tqdm(self.input_settings.datasets, 
-                            total = len(self.input_settings.datasets), unit = " Datasets"):
-            FBLDict[dataset["name"]], FFLDict[dataset["name"]], MIDict[dataset["name"]] = Motifs(dataset, self.input_settings)
+        # Motif ratios are computed relative to the reference
+        # network of each dataset, so each dataset is one unit
+        datasets = self.input_settings.datasets
+        results = self.__runUnits(partial(Motifs, cache = self.cache),
+                                  datasets, [self.input_settings]*len(datasets),
+                                  unit = " Datasets")
+        for dataset, motifs in zip(datasets, results):
+            FBLDict[dataset["name"]], FFLDict[dataset["name"]], MIDict[dataset["name"]] = motifs
             
         FBL = pd.DataFrame(FBLDict)
         FFL = pd.DataFrame(FFLDict)
@@ -234,9 +388,12 @@ class BLEval(object):
         :returns:
             - pathStats: A dataframe path lengths in predicted network
         '''
-        for dataset in tqdm(self.input_settings.datasets, 
-                            total = len(self.input_settings.datasets), unit = " Datasets"):
-            pathAnalysis(dataset, self.input_settings)
+        # pathAnalysis writes one file per dataset,
+        # so each dataset is one unit
+        datasets = self.input_settings.datasets
+        self.__runUnits(partial(pathAnalysis, cache = self.cache),
+                        datasets, [self.input_settings]*len(datasets),
+                        unit = " Datasets")
 
                  
     def computeEarlyPrec(self):
@@ -252,11 +409,17 @@ class BLEval(object):
 
         '''
         Eprec = {}
-        outDir = str(self.output_settings.base_dir) + \
-                 str(self.input_settings.datadir).split("inputs")[1] + "/"
-        for algo in tqdm(self.input_settings.algorithms, unit = " Algorithms"):
+        datasets, subsets = self.__datasetAlgorithmUnits()
+        units = [(subset, subset.input_settings.algorithms[0][0]) for subset in subsets
+                 if subset.input_settings.algorithms[0][1]['should_run'] == True]
+        for algo in self.input_settings.algorithms:
             if algo[1]['should_run'] == True:
-                Eprec[algo[0]] = EarlyPrec(self, algo[0])
+                Eprec[algo[0]] = {}
+
+        results = self.__runUnits(EarlyPrec, [unit[0] for unit in units],
+                                  [unit[1] for unit in units])
+        for (subset, algorithm), EPR in zip(units, results):
+            Eprec[algorithm].update(EPR)
         return pd.DataFrame(Eprec).T
 
 
@@ -275,13 +438,13 @@ class BLEval(object):
         sEPRDict = {}
         sEPRDict['EPrec Activation'] = {}
         sEPRDict['EPrec Inhibition'] = {}
-        outDir = str(self.output_settings.base_dir) + \
-                 str(self.input_settings.datadir).split("inputs")[1] + "/"
-        for algo in tqdm(self.input_settings.algorithms, unit = " Algorithms"):
-            if algo[1]['should_run'] == True:
-                sEPrecDF = signedEPrec(self, algo[0])
-                sEPRDict['EPrec Activation'][algo[0]] = sEPrecDF['+']
-                sEPRDict['EPrec Inhibition'][algo[0]] = sEPrecDF['-']
+        algorithms = [algo[0] for algo in self.input_settings.algorithms
+                      if algo[1]['should_run'] == True]
+        results = self.__runUnits(signedEPrec, [self]*len(algorithms), algorithms,
+                                  unit = " Algorithms")
+        for algorithm, sEPrecDF in zip(algorithms, results):
+            sEPRDict['EPrec Activation'][algorithm] = sEPrecDF['+']
+            sEPRDict['EPrec Inhibition'][algorithm] = sEPrecDF['-']
         return(pd.DataFrame(sEPRDict['EPrec Activation']).T, pd.DataFrame(sEPRDict['EPrec Inhibition']).T)
     
     def computeBorda(self, selectedAlgorithms=None, aggregationMethod="average"):
@@ -314,7 +477,14 @@ class BLEval(object):
                 print("\nERROR: Please choose an aggregation method algorithm from following options: " % feasibleaggregationMethodOptions)
                 return
 
-        Borda(self, selectedAlgorithms, aggregationMethod)
+        # Borda writes one file per dataset, so each dataset is one
+        # unit, with its own copy of the selected algorithms
+        datasets = self.input_settings.datasets
+        subsets = [self.__subset([dataset], self.input_settings.algorithms)
+                   for dataset in datasets]
+        self.__runUnits(partial(Borda, aggregationMethod = aggregationMethod),
+                        subsets, [list(selectedAlgorithms) for dataset in datasets],
+                        unit = " Datasets")
 
 class ConfigParser(object):
     '''
@@ -386,7 +556,10 @@ class ConfigParser(object):
         
         Note that these parameters may not be
         used in the current evaluation, but can 
-        be used at a later point.
+        be used at a later point. Each combination
+        of parameters is evaluated separately, under
+        the name of its output folder, see
+        :func:`BLRun.outputNames.getOutputNames`.
         '''
         
         # Initilalize the list of algorithms
@@ -398,8 +571,9 @@ class ConfigParser(object):
                     for val in itertools.product(
                         *(algorithm['params'][param]
                             for param in algorithm['params']))]
-                for combo in combos:
-                    algorithms.append([algorithm['name'],combo])
+                outputNames = getOutputNames(algorithm['name'], combos)
+                for combo, outputName in zip(combos, outputNames):
+                    algorithms.append([outputName,combo])
             
 
         return algorithms
@@ -8,8 +8,11 @@ sns.set(rc={"lines.linewidth": 2}, palette  = "deep", style = "ticks")
 from sklearn.metrics import precision_recall_curve, roc_curve, auc
 from itertools import product, permutations, combinations, combinations_with_replacement
 from tqdm import tqdm
+from BLEval.dataCache import DataCache
+from BLEval.edgeIndex import getEdgeScores
+from BLRun.rankedEdges import findRankedEdges
 
-def PRROC(dataDict, inputSettings, directed = True, selfEdges = False, plotFlag = False):
+def PRROC(dataDict, inputSettings, directed = True, selfEdges = False, plotFlag = False, cache = None):
     '''
     Computes areas under the precision-recall and ROC curves
     for a given dataset for each algorithm.
@@ -22,17 +25,21 @@ def PRROC(dataDict, inputSettings, directed = True, selfEdges = False, plotFlag
     
     :param plotFlag:   A flag to indicate whether or not to save PR and ROC plots.
     :type plotFlag: bool
+
+    :param cache:   A cache of parsed input files. If not provided, the files are parsed again.
+    :type cache: :class:`BLEval.dataCache.DataCache`
         
     :returns:
             - AUPRC: A dictionary containing AUPRC values for each algorithm
             - AUROC: A dictionary containing AUROC values for each algorithm
     '''
     
+    if cache is None:
+        cache = DataCache()
+
     # Read file for trueEdges
-    trueEdgesDF = pd.read_csv(str(inputSettings.datadir)+'/'+ dataDict['name'] +
-                                '/' +dataDict['trueEdges'],
-                                sep = ',', 
-                                header = 0, index_col = None)
+    trueEdgesDF = cache.getTrueEdges(str(inputSettings.datadir)+'/'+ dataDict['name'] +
+                                '/' +dataDict['trueEdges'])
             
     # Initialize data dictionaries
     precisionDict = {}
@@ -50,11 +57,10 @@ def PRROC(dataDict, inputSettings, directed = True, selfEdges = False, plotFlag
                          total = len(inputSettings.algorithms), unit = " Algorithms"):
 
             # check if the output rankedEdges file exists
-            if Path(outDir + '/' +algo[0]+'/rankedEdges.csv').exists():
+            if findRankedEdges(outDir + '/' +algo[0]+'/rankedEdges.csv') is not None:
                  # Initialize Precsion
 
-                predDF = pd.read_csv(outDir + '/' +algo[0]+'/rankedEdges.csv', \
-                                            sep = '\t', header =  0, index_col = None)
+                predDF = cache.getRankedEdges(outDir + '/' +algo[0]+'/rankedEdges.csv')
 
                 precisionDict[algo[0]], recallDict[algo[0]], FPRDict[algo[0]], TPRDict[algo[0]], AUPRC[algo[0]], AUROC[algo[0]] = computeScores(trueEdgesDF, predDF, directed = True, selfEdges = selfEdges)
 
@@ -68,11 +74,10 @@ def PRROC(dataDict, inputSettings, directed = True, selfEdges = False, plotFlag
                          total = len(inputSettings.algorithms), unit = " Algorithms"):
 
             # check if the output rankedEdges file exists
-            if Path(outDir + '/' +algo[0]+'/rankedEdges.csv').exists():
+            if findRankedEdges(outDir + '/' +algo[0]+'/rankedEdges.csv') is not None:
                  # Initialize Precsion
 
-                predDF = pd.read_csv(outDir + '/' +algo[0]+'/rankedEdges.csv', \
-                                            sep = '\t', header =  0, index_col = None)
+                predDF = cache.getRankedEdges(outDir + '/' +algo[0]+'/rankedEdges.csv')
 
                 precisionDict[algo[0]], recallDict[algo[0]], FPRDict[algo[0]], TPRDict[algo[0]], AUPRC[algo[0]], AUROC[algo[0]] = computeScores(trueEdgesDF, predDF, directed = False, selfEdges = selfEdges)
 
@@ -123,10 +128,10 @@ def computeScores(trueEdgesDF, predEdgeDF,
     form of a DataFrame.
     
 
-    :param trueEdgesDF:   A pandas dataframe containing the true classes.The indices of this dataframe are all possible edgesin a graph formed using the genes in the given dataset. This dataframe only has one column to indicate the classlabel of an edge. If an edge is present in the reference network, it gets a class label of 1, else 0.
+    :param trueEdgesDF:   A pandas dataframe containing the reference network as an edge list with Gene1 and Gene2 columns. All possible edges in a graph formed using the genes in this dataframe are evaluated. If an edge is present in the reference network, it gets a class label of 1, else 0.
     :type trueEdgesDF: DataFrame
         
-    :param predEdgeDF:   A pandas dataframe containing the edge ranks from the prediced network. The indices of this dataframe are all possible edges.This dataframe only has one column to indicate the edge weightsin the predicted network. Higher the weight, higher the edge confidence.
+    :param predEdgeDF:   A pandas dataframe containing the edge ranks from the prediced network, with Gene1, Gene2 and EdgeWeight columns. Higher the absolute weight, higher the edge confidence. Edges that are not predicted get a weight of 0.
     :type predEdgeDF: DataFrame
     
     :param directed:   A flag to indicate whether to treat predictionsas directed edges (directed = True) or undirected edges (directed = False).
@@ -143,75 +148,10 @@ def computeScores(trueEdgesDF, predEdgeDF,
             - AUROC: Area under the ROC curve
     '''
 
-    if directed:        
-        # Initialize dictionaries with all 
-        # possible edges
-        if selfEdges:
-            possibleEdges = list(product(np.unique(trueEdgesDF.loc[:,['Gene1','Gene2']]),
-                                         repeat = 2))
-        else:
-            possibleEdges = list(permutations(np.unique(trueEdgesDF.loc[:,['Gene1','Gene2']]),
-                                         r = 2))
-        
-        TrueEdgeDict = {'|'.join(p):0 for p in possibleEdges}
-        PredEdgeDict = {'|'.join(p):0 for p in possibleEdges}
-        
-        # Compute TrueEdgeDict Dictionary
-        # 1 if edge is present in the ground-truth
-        # 0 if edge is not present in the ground-truth
-        for key in TrueEdgeDict.keys():
-            if len(trueEdgesDF.loc[(trueEdgesDF['Gene1'] == key.split('|')[0]) &
-                   (trueEdgesDF['Gene2'] == key.split('|')[1])])>0:
-                    TrueEdgeDict[key] = 1
-                
-        for key in PredEdgeDict.keys():
-            subDF = predEdgeDF.loc[(predEdgeDF['Gene1'] == key.split('|')[0]) &
-                               (predEdgeDF['Gene2'] == key.split('|')[1])]
-            if len(subDF)>0:
-                PredEdgeDict[key] = np.abs(subDF.EdgeWeight.values[0])
-
-    # if undirected
-    else:
-        
-        # Initialize dictionaries with all 
-        # possible edges
-        if selfEdges:
-            possibleEdges = list(combinations_with_replacement(np.unique(trueEdgesDF.loc[:,['Gene1','Gene2']]),
-                                                               r = 2))
-        else:
-            possibleEdges = list(combinations(np.unique(trueEdgesDF.loc[:,['Gene1','Gene2']]),
-                                                               r = 2))
-        TrueEdgeDict = {'|'.join(p):0 for p in possibleEdges}
-        PredEdgeDict = {'|'.join(p):0 for p in possibleEdges}
-
-        # Compute TrueEdgeDict Dictionary
-        # 1 if edge is present in the ground-truth
-        # 0 if edge is not present in the ground-truth
-
-        for key in TrueEdgeDict.keys():
-            if len(trueEdgesDF.loc[((trueEdgesDF['Gene1'] == key.split('|')[0]) &
-                           (trueEdgesDF['Gene2'] == key.split('|')[1])) |
-                              ((trueEdgesDF['Gene2'] == key.split('|')[0]) &
-                           (trueEdgesDF['Gene1'] == key.split('|')[1]))]) > 0:
-                TrueEdgeDict[key] = 1  
-
-        # Compute PredEdgeDict Dictionary
-        # from predEdgeDF
-
-        for key in PredEdgeDict.keys():
-            subDF = predEdgeDF.loc[((predEdgeDF['Gene1'] == key.split('|')[0]) &
-                               (predEdgeDF['Gene2'] == key.split('|')[1])) |
-                              ((predEdgeDF['Gene2'] == key.split('|')[0]) &
-                               (predEdgeDF['Gene1'] == key.split('|')[1]))]
-            if len(subDF)>0:
-                PredEdgeDict[key] = max(np.abs(subDF.EdgeWeight.values))
-
-                
-                
     # Combine into one dataframe
     # to pass it to sklearn
-    outDF = pd.DataFrame([TrueEdgeDict,PredEdgeDict]).T
-    outDF.columns = ['TrueEdges','PredEdges']
+    outDF = getEdgeScores(trueEdgesDF, predEdgeDF,
+                          directed = directed, selfEdges = selfEdges)
     
     fpr, tpr, thresholds = roc_curve(y_true=outDF['TrueEdges'],
                                      y_score=outDF['PredEdges'], pos_label=1)
@@ -8,8 +8,9 @@ from pathlib import Path
 import concurrent.futures
 import matplotlib.pyplot as plt
 from itertools import permutations
-from sklearn import preprocessing
+from scipy.stats import rankdata
 from sklearn.metrics import precision_recall_curve, roc_curve, auc
+from BLEval.edgeIndex import getGeneIndex, getEdgeIds
 sns.set(rc={"lines.linewidth": 2}, palette  = "deep", style = "ticks")
 
 
@@ -32,46 +33,143 @@ def Borda(evalObject, selectedAlgorithms=None, aggregationMethod="average"):
     :returns:
         - None
     """
-    evaluationDFs = []
     for dataset in tqdm(evalObject.input_settings.datasets):
-        edges = []
+        outDir = str(evalObject.output_settings.base_dir) + \
+                 str(evalObject.input_settings.datadir).split("inputs")[1] + \
+                 "/" + dataset["name"]
+        inDir = str(evalObject.input_settings.datadir) + "/" + dataset["name"]
+        refNetwork_path = inDir + "/" + dataset["trueEdges"]
+
+        genes = None
+        algorithmNames = []
         for algorithmName, _ in tqdm(evalObject.input_settings.algorithms):
-            outDir = str(evalObject.output_settings.base_dir) + \
-                     str(evalObject.input_settings.datadir).split("inputs")[1] + \
-                     "/" + dataset["name"]
-            inDir = str(evalObject.input_settings.datadir) + "/" + dataset["name"]
             rank_path = outDir + "/" + algorithmName + "/rankedEdges.csv"
-            refNetwork_path = inDir + "/" + dataset["trueEdges"]
 
             if not os.path.isdir(outDir) or not os.path.isdir(inDir):
                 continue
             try:
-                df = pd.read_csv(rank_path, sep="\t", header=0, index_col=None)
-                refNetwork = pd.read_csv(refNetwork_path, header=0, index_col=None)
-                refNetwork['edge'] = refNetwork.apply(lambda x: '%s-%s' % (x.Gene1, x.Gene2), axis=1)
-                refNetwork = refNetwork[refNetwork.Gene1!=refNetwork.Gene2]
-                refNetwork['isReferenceEdge'] = 1
-                all_edges_df = pd.DataFrame(list(permutations(np.unique(refNetwork.loc[:,['Gene1','Gene2']]), r = 2)), columns=['Gene1','Gene2'])
-                ranked_edges = pd.merge(all_edges_df, df, on=['Gene1','Gene2'], how='left')
-                ranked_edges.EdgeWeight = ranked_edges.EdgeWeight.fillna(0)
-                ranked_edges['absEdgeWeight'] = ranked_edges['EdgeWeight'].abs()
-                ranked_edges['normEdgeWeight'] = pd.DataFrame(preprocessing.MinMaxScaler().fit_transform(ranked_edges[['absEdgeWeight']]))[0]
-                ranked_edges['dataset'] = dataset["name"]
-                ranked_edges['algo'] = algorithmName
-                ranked_edges['edge'] = ranked_edges.apply(lambda x: '%s-%s' % (x.Gene1, x.Gene2), axis=1)
-                edges.append(ranked_edges)
+                evalObject.cache.getRankedEdges(rank_path)
+                if genes is None:
+                    # All possible edges between the genes of the reference
+                    # network (excluding self loops), as integer ids
+                    refNetwork = evalObject.cache.getTrueEdges(refNetwork_path)
+                    refNetwork = refNetwork[refNetwork.Gene1!=refNetwork.Gene2]
+                    genes = getGeneIndex(refNetwork)
+                algorithmNames.append(algorithmName)
             except Exception as e:
                 print("\nSkipping Borda computation for ", algorithmName, "on path", outDir)
-                selectedAlgorithms.remove(algorithmName)
+                if selectedAlgorithms is not None and algorithmName in selectedAlgorithms:
+                    selectedAlgorithms.remove(algorithmName)
                 continue
-        rank_df = pd.pivot_table(pd.concat(edges), values='normEdgeWeight', index='edge', columns='algo')
-        rank_df['BORDA'] = __normalize__(rank_df.rank(ascending=True, method=aggregationMethod).mean(axis=1).values)
-        rank_df['mBORDA'] = __normalize__(rank_df.rank(ascending=False, method=aggregationMethod).apply(lambda x: 1.0/(x*x)).mean(axis=1).values)
-        rank_df['sBORDA'] = __normalize__(rank_df[selectedAlgorithms].rank(ascending=True, method=aggregationMethod).mean(axis=1).values)
-        rank_df['smBORDA'] = __normalize__(rank_df[selectedAlgorithms].rank(ascending=False, method=aggregationMethod).apply(lambda x: 1.0/(x*x)).mean(axis=1).values)
-        rank_df['Gene1'], rank_df['Gene2'] = rank_df.index.str.split('-', 1).str
-        rank_df[['Gene1','Gene2','BORDA','mBORDA','sBORDA','smBORDA']].to_csv(outDir+"/Borda.csv", index=False)
 
+        if len(algorithmNames) == 0:
+            print("\nSkipping Borda computation on path", outDir, "due to lack of predictions.")
+            continue
+
+        # Edges are in the order of their integer ids, i.e., sorted by
+        # Gene1 then Gene2, and algorithms in the order of their names
+        algorithmNames = sorted(algorithmNames)
+        src, dst = np.nonzero(~np.eye(len(genes), dtype = bool))
+        columns = {name:idx for idx, name in enumerate(algorithmNames)}
+        if selectedAlgorithms is None:
+            selectedColumns = list(range(len(algorithmNames)))
+        else:
+            selectedColumns = [columns[name] for name in selectedAlgorithms]
+
+        # One float32 column of normalized weights per algorithm
+        normWeights = np.empty((len(src), len(algorithmNames)), dtype = np.float32)
+        for col, algorithmName in enumerate(algorithmNames):
+            df = evalObject.cache.getRankedEdges(outDir + "/" + algorithmName + "/rankedEdges.csv")
+            normWeights[:, col] = getNormEdgeWeights(genes, df)
+
+        # The ranks of each column are added to the sums of the
+        # variants one column at a time, and are never stored
+        ascSum = np.zeros(len(src))
+        invSqSum = np.zeros(len(src))
+        selectedAscSum = np.zeros(len(src))
+        selectedInvSqSum = np.zeros(len(src))
+        for col in range(len(algorithmNames)):
+            ranks = __rank__(normWeights[:, col], aggregationMethod)
+            ascSum += ranks
+            if col in selectedColumns:
+                selectedAscSum += ranks
+            ranks = __rank__(-normWeights[:, col], aggregationMethod)
+            np.multiply(ranks, ranks, out = ranks)
+            np.reciprocal(ranks, out = ranks)
+            invSqSum += ranks
+            if col in selectedColumns:
+                selectedInvSqSum += ranks
+
+        BORDA = __normalize__(ascSum/len(algorithmNames))
+        # As in the previous pivot table based implementation,
+        # the BORDA column is also ranked for the modified Borda
+        BORDADescRanks = __rank__(-BORDA, aggregationMethod)
+        mBORDA = __normalize__((invSqSum + 1.0/(BORDADescRanks*BORDADescRanks))/
+                               (len(algorithmNames) + 1))
+        sBORDA = __normalize__(__mean__(selectedAscSum, len(selectedColumns)))
+        smBORDA = __normalize__(__mean__(selectedInvSqSum, len(selectedColumns)))
+
+        bordaDF = pd.DataFrame({'Gene1': genes[src], 'Gene2': genes[dst],
+                                'BORDA': BORDA, 'mBORDA': mBORDA,
+                                'sBORDA': sBORDA, 'smBORDA': smBORDA},
+                               columns = ['Gene1','Gene2','BORDA','mBORDA','sBORDA','smBORDA'])
+        bordaDF.to_csv(outDir+"/Borda.csv", index=False)
+
+
+def getNormEdgeWeights(genes, predDF):
+    """
+    Computes the normalized absolute weight of every possible edge
+    between the given genes (excluding self loops), in the order of
+    :func:`itertools.permutations`. Edges that are not predicted have
+    weight 0. Weights are min-max normalized over all the predictions,
+    as with :class:`sklearn.preprocessing.MinMaxScaler`, and an edge
+    that is predicted more than once gets the mean of its weights.
+
+    :param genes: An array of gene names, as returned by :func:`BLEval.edgeIndex.getGeneIndex`.
+    :type genes: numpy.ndarray
+
+    :param predDF: A dataframe containing the predicted edges.
+    :type predDF: DataFrame
+
+    :returns:
+        An array of normalized weights, one per possible edge
+    """
+    numGenes = len(genes)
+    numEdges = numGenes*(numGenes - 1)
+    src, dst = getEdgeIds(predDF, genes)
+    isEdge = (src >= 0) & (dst >= 0) & (src != dst)
+    src = src[isEdge]
+    dst = dst[isEdge]
+    absWeights = np.abs(np.nan_to_num(predDF.EdgeWeight.values[isEdge].astype(np.float64)))
+
+    # Position of each predicted edge in the permutations of the genes
+    edgeIds = src*(numGenes - 1) + dst - (dst > src)
+    counts = np.bincount(edgeIds, minlength = numEdges)
+
+    # Range of the weights, including the zeros of
+    # the edges that are not predicted
+    allWeights = absWeights
+    if (counts == 0).any():
+        allWeights = np.append(absWeights, 0.0)
+    dataMin = allWeights.min()
+    dataRange = allWeights.max() - dataMin
+    scale = 1.0/dataRange if dataRange != 0 else 1.0
+    offset = 0 - dataMin*scale
+
+    sums = np.bincount(edgeIds, weights = absWeights*scale + offset, minlength = numEdges)
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        return np.where(counts > 0, sums/counts, 0.0*scale + offset)
+
+
+def __rank__(arr, method):
+    # Rank as pandas.Series.rank, with method
+    # in {'average', 'min', 'max', 'first'}
+    return rankdata(arr, method = 'ordinal' if method == 'first' else method).astype(np.float64)
+
+
+def __mean__(total, count):
+    # Mean of a sum over count columns, undefined if there are none
+    return total/count if count > 0 else np.full(len(total), np.nan)
 
 
 def __normalize__(arr):
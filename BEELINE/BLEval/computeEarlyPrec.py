@@ -11,6 +11,8 @@ from collections import defaultdict
 from itertools import product, permutations
 from multiprocessing import Pool, cpu_count
 from networkx.convert_matrix import from_pandas_adjacency
+from BLEval.edgeIndex import getEdgeIds
+from BLEval.topkEdges import getTopkEdges
 
 def EarlyPrec(evalObject, algorithmName, TFEdges = True):
     '''
@@ -37,15 +39,14 @@ def EarlyPrec(evalObject, algorithmName, TFEdges = True):
         for a given algorithm for each dataset.
 
     '''
-    rankDict = {}
     Eprec = {}
     Erec = {}
     EPR = {}
     for dataset in tqdm(evalObject.input_settings.datasets):
-        trueEdgesDF = pd.read_csv(str(evalObject.input_settings.datadir)+'/'+ \
-                      dataset['name'] + '/' +\
-                      dataset['trueEdges'], sep = ',',
-                      header = 0, index_col = None)
+        trueEdgesPath = str(evalObject.input_settings.datadir)+'/'+ \
+                        dataset['name'] + '/' +\
+                        dataset['trueEdges']
+        trueEdgesDF = evalObject.cache.getTrueEdges(trueEdgesPath)
         trueEdgesDF = trueEdgesDF.loc[(trueEdgesDF['Gene1'] != trueEdgesDF['Gene2'])]
         trueEdgesDF.drop_duplicates(keep = 'first', inplace=True)
         trueEdgesDF.reset_index(drop=True, inplace=True)
@@ -58,87 +59,44 @@ def EarlyPrec(evalObject, algorithmName, TFEdges = True):
         #algos = evalObject.input_settings.algorithms
         rank_path = outDir + "/rankedEdges.csv"
         if not os.path.isdir(outDir):
-            rankDict[dataset["name"]] = set([])
             continue
         try:
-            predDF = pd.read_csv(rank_path, sep="\t", header=0, index_col=None)
+            genes, topkEdges = getTopkEdges(evalObject.cache, trueEdgesPath,
+                                            rank_path, TFEdges = TFEdges)
         except:
             print("\nSkipping early precision computation for ", algorithmName, "on path", outDir)
-            rankDict[dataset["name"]] = set([])
             continue
 
-        predDF = predDF.loc[(predDF['Gene1'] != predDF['Gene2'])]
-        predDF.drop_duplicates(keep = 'first', inplace=True)
-        predDF.reset_index(drop=True, inplace=True)
-        
-        
+        # Compare edges as integer ids
+        numGenes = len(genes)
+        trueSrc, trueDst = getEdgeIds(trueEdgesDF, genes)
+        trueEdgeIds = np.unique(trueSrc*numGenes + trueDst)
+        topkEdgeIds = np.unique(topkEdges[:,0]*numGenes + topkEdges[:,1])
+
+        uniqueNodes = np.unique(trueEdgesDF.loc[:,['Gene1','Gene2']])
         if TFEdges:
             # Consider only edges going out of TFs
-            
-            # Get a list of all possible TF to gene interactions 
-            uniqueNodes = np.unique(trueEdgesDF.loc[:,['Gene1','Gene2']])
-            possibleEdges_TF = set(product(set(trueEdgesDF.Gene1),set(uniqueNodes)))
-
-            # Get a list of all possible interactions 
-            possibleEdges_noSelf = set(permutations(uniqueNodes, r = 2))
-            
-            # Find intersection of above lists to ignore self edges
-            # TODO: is there a better way of doing this?
-            possibleEdges = possibleEdges_TF.intersection(possibleEdges_noSelf)
-            
-            TrueEdgeDict = {'|'.join(p):0 for p in possibleEdges}
 
-            trueEdges = trueEdgesDF['Gene1'] + "|" + trueEdgesDF['Gene2']
-            trueEdges = trueEdges[trueEdges.isin(TrueEdgeDict)]
-            # print("\nEdges considered ", len(trueEdges))
-            numEdges = len(trueEdges)
-        
-            predDF['Edges'] = predDF['Gene1'] + "|" + predDF['Gene2']
-            # limit the predicted edges to the genes that are in the ground truth
-            predDF = predDF[predDF['Edges'].isin(TrueEdgeDict)]
+            # Number of possible TF to gene interactions,
+            # ignoring self edges
+            numTFs = len(set(trueEdgesDF.Gene1))
+            numPossibleEdges = numTFs*(len(uniqueNodes) - 1)
 
+            # Every row of the ground truth is a TF to gene edge
+            numTrueEdges = trueEdgesDF.shape[0]
         else:
-            uniqueNodes = np.unique(trueEdgesDF.loc[:,['Gene1','Gene2']])
-            possibleEdges = set(permutations(uniqueNodes, r = 2))
-            trueEdges = trueEdgesDF['Gene1'] + "|" + trueEdgesDF['Gene2']
-            trueEdges = set(trueEdges.values)
-            numEdges = len(trueEdges)
-            
-        
-        # check if ranked edges list is empty
-        # if so, it is just set to an empty set
-
-        if not predDF.shape[0] == 0:
-
-            # we want to ensure that we do not include
-            # edges without any edge weight
-            # so check if the non-zero minimum is
-            # greater than the edge weight of the top-kth
-            # node, else use the non-zero minimum value.
-            predDF.EdgeWeight = predDF.EdgeWeight.round(6)
-            predDF.EdgeWeight = predDF.EdgeWeight.abs()
-
-            # Use num True edges or the number of
-            # edges in the dataframe, which ever is lower
-            maxk = min(predDF.shape[0], numEdges)
-            edgeWeightTopk = predDF.iloc[maxk-1].EdgeWeight
-
-            nonZeroMin = np.nanmin(predDF.EdgeWeight.replace(0, np.nan).values)
-            bestVal = max(nonZeroMin, edgeWeightTopk)
-
-            newDF = predDF.loc[(predDF['EdgeWeight'] >= bestVal)]
-            rankDict[dataset["name"]] = set(newDF['Gene1'] + "|" + newDF['Gene2'])
-        else:
-            print("\nSkipping early precision computation for on path ", rank_path,"due to lack of predictions.")
-            rankDict[dataset["name"]] = set([])
-
-        if len(rankDict[dataset["name"]]) != 0:
-            intersectionSet = rankDict[dataset["name"]].intersection(trueEdges)
-            Eprec[dataset["name"]] = len(intersectionSet)/len(rankDict[dataset["name"]])
-            Erec[dataset["name"]] = len(intersectionSet)/len(trueEdges)
-            randomEprc = len(trueEdges) / len(possibleEdges) 
+            numPossibleEdges = len(uniqueNodes)*(len(uniqueNodes) - 1)
+            numTrueEdges = len(trueEdgeIds)
+
+        if len(topkEdgeIds) != 0:
+            numIntersection = len(np.intersect1d(topkEdgeIds, trueEdgeIds,
+                                                 assume_unique = True))
+            Eprec[dataset["name"]] = numIntersection/len(topkEdgeIds)
+            Erec[dataset["name"]] = numIntersection/numTrueEdges
+            randomEprc = numTrueEdges / numPossibleEdges
             EPR[dataset["name"]] = Eprec[dataset["name"]]/randomEprc
         else:
+            print("\nSkipping early precision computation for on path ", rank_path,"due to lack of predictions.")
             Eprec[dataset["name"]] = 0
             Erec[dataset["name"]] = 0
             EPR[dataset["name"]] = 0
@@ -11,6 +11,10 @@ from itertools import permutations
 from collections import defaultdict
 from multiprocessing import Pool, cpu_count
 from networkx.convert_matrix import from_pandas_adjacency
+from BLEval.topkEdges import getTopkEdges, getTopkMatrix
+
+# Number of rows of the top-k matrix multiplied at once
+BlockSize = 256
 
 def Jaccard(evalObject, algorithmName):
     """
@@ -36,26 +40,9 @@ def Jaccard(evalObject, algorithmName):
     rankDict = {}
     sim_names = []
     for dataset in tqdm(evalObject.input_settings.datasets):
-        trueEdgesDF = pd.read_csv(str(evalObject.input_settings.datadir)+'/'+ \
-                      dataset['name'] + '/' +\
-                      dataset['trueEdges'], sep = ',',
-                      header = 0, index_col = None)
-
-        possibleEdges = list(permutations(np.unique(trueEdgesDF.loc[:,['Gene1','Gene2']]),
-                                     r = 2))
-
-        TrueEdgeDict = {'|'.join(p):0 for p in possibleEdges}
-        PredEdgeDict = {'|'.join(p):0 for p in possibleEdges}
-
-        # Compute TrueEdgeDict Dictionary
-        # 1 if edge is present in the ground-truth
-        # 0 if edge is not present in the ground-truth
-        numEdges = 0
-        for key in TrueEdgeDict.keys():
-            if len(trueEdgesDF.loc[(trueEdgesDF['Gene1'] == key.split('|')[0]) &
-                   (trueEdgesDF['Gene2'] == key.split('|')[1])])>0:
-                    TrueEdgeDict[key] = 1
-                    numEdges += 1
+        trueEdgesPath = str(evalObject.input_settings.datadir)+'/'+ \
+                        dataset['name'] + '/' +\
+                        dataset['trueEdges']
 
         outDir = str(evalObject.output_settings.base_dir) + \
                  str(evalObject.input_settings.datadir).split("inputs")[1] + \
@@ -66,45 +53,18 @@ def Jaccard(evalObject, algorithmName):
         if not os.path.isdir(outDir):
             continue
         try:
-            predDF = pd.read_csv(rank_path, sep="\t", header=0, index_col=None)
+            genes, topkEdges = getTopkEdges(evalObject.cache, trueEdgesPath, rank_path)
         except:
             print("Skipping Jaccard computation for ", algorithmName, "on path", outDir)
             continue
 
-        predDF = predDF.loc[(predDF['Gene1'] != predDF['Gene2'])]
-        predDF.drop_duplicates(keep = 'first', inplace=True)
-        predDF.reset_index(drop = True,  inplace= True)
-        # check if ranked edges list is empty
-        # if so, it is just set to an empty set
-
-        if not predDF.shape[0] == 0:
-
-            # we want to ensure that we do not include
-            # edges without any edge weight
-            # so check if the non-zero minimum is
-            # greater than the edge weight of the top-kth
-            # node, else use the non-zero minimum value.
-            predDF.EdgeWeight = predDF.EdgeWeight.round(6)
-            predDF.EdgeWeight = predDF.EdgeWeight.abs()
-
-            # Use num True edges or the number of
-            # edges in the dataframe, which ever is lower
-            maxk = min(predDF.shape[0], numEdges)
-            edgeWeightTopk = predDF.iloc[maxk-1].EdgeWeight
-
-            nonZeroMin = np.nanmin(predDF.EdgeWeight.replace(0, np.nan).values)
-            bestVal = max(nonZeroMin, edgeWeightTopk)
-
-            newDF = predDF.loc[(predDF['EdgeWeight'] >= bestVal)]
-            rankDict[dataset["name"]] = set(newDF['Gene1'] + "|" + newDF['Gene2'])
-        else:
-            rankDict[dataset["name"]] = set([])
+        rankDict[dataset["name"]] = (genes, topkEdges)
 
+    # Only the upper triangle is used, in row-major order
     Jdf = computePairwiseJacc(rankDict)
-    df = Jdf.where(np.triu(np.ones(Jdf.shape),  k = 1).astype(np.bool))
-    df = df.stack().reset_index()
-    df.columns = ['Row','Column','Value']
-    return(df.Value.median(),df.Value.mad())
+    rows, cols = np.triu_indices(Jdf.shape[0], k = 1)
+    values = pd.Series(Jdf.values[rows, cols])
+    return(values.median(),values.mad())
 
 
 def computePairwiseJacc(inDict):
@@ -112,22 +72,33 @@ def computePairwiseJacc(inDict):
     A helper function to compute all pairwise Jaccard similarity indices
     of predicted top-k edges for a given set of datasets (obtained from
     the same reference network). Here k is the number of edges in the
-    reference network (excluding self loops). 
-    
+    reference network (excluding self loops). The top-k edges are
+    encoded as a sparse boolean matrix with one row per dataset, and
+    only the intersections of distinct datasets are computed.
     
 
-    :param inDict:  A dictionary contaninig top-k predicted edges  for each dataset. Here, keys are the dataset name and the values are the set of top-k edges.
+    :param inDict:  A dictionary contaninig top-k predicted edges  for each dataset. Here, keys are the dataset name and the values are the (genes, edges) tuples returned by :func:`BLEval.topkEdges.getTopkEdges`.
     :type inDict: dict
     :returns:
         A dataframe containing pairwise Jaccard similarity index values
     """
-    jaccDF = {key:{key1:{} for key1 in inDict.keys()} for key in inDict.keys()}
-    for key_i in inDict.keys():
-        for key_j in inDict.keys():
-            num = len(inDict[key_i].intersection(inDict[key_j]))
-            den = len(inDict[key_i].union(inDict[key_j]))
-            if den != 0:
-                jaccDF[key_i][key_j] = num/den
-            else:
-                jaccDF[key_i][key_j] = 0
-    return pd.DataFrame(jaccDF)
+    names = list(inDict.keys())
+    topkMatrix = getTopkMatrix(list(inDict.values()))
+    numSets = topkMatrix.shape[0]
+
+    # The intersection sizes are given by sparse matrix products of
+    # blocks of rows with the later rows only, as the matrix is
+    # symmetric, and union sizes follow from the set sizes
+    numEdges = topkMatrix.getnnz(axis = 1)
+    numIntersection = np.zeros((numSets, numSets), dtype = np.int64)
+    for start in range(0, numSets, BlockSize):
+        stop = min(start + BlockSize, numSets)
+        block = topkMatrix[start:stop].dot(topkMatrix[start:].T).toarray()
+        numIntersection[start:stop, start:] = np.triu(block, k = 1)
+    numIntersection += numIntersection.T
+    np.fill_diagonal(numIntersection, numEdges)
+    numUnion = numEdges[:,None] + numEdges[None,:] - numIntersection
+
+    jacc = np.zeros(numIntersection.shape, dtype = np.float64)
+    np.divide(numIntersection, numUnion, out = jacc, where = numUnion != 0)
+    return pd.DataFrame(jacc, index = names, columns = names)
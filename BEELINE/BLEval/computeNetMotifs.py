@@ -9,8 +9,13 @@ from sklearn.metrics import precision_recall_curve, roc_curve, auc
 from itertools import product, permutations, combinations, combinations_with_replacement
 from tqdm import tqdm
 import networkx as nx
+from scipy import sparse
+from BLEval.dataCache import DataCache
+from BLEval.topkEdges import getTopkEdges
+from BLEval.edgeIndex import getGeneIndex, getEdgeIds, getDiGraph
+from BLRun.rankedEdges import findRankedEdges
 
-def Motifs(datasetDict, inputSettings):
+def Motifs(datasetDict, inputSettings, cache = None):
     '''
     Computes ratios of the counts of various network motifs
     for each algorithm for a given dataset. The ratios are 
@@ -25,6 +30,9 @@ def Motifs(datasetDict, inputSettings):
     :param inputSettings: An object of class :class:`BLEval.InputSettings`.
     :type inputSettings: :class:`BLEval.InputSettings`
 
+    :param cache:   A cache of parsed input files. If not provided, the files are parsed again.
+    :type cache: :class:`BLEval.dataCache.DataCache`
+
     :returns:
         - FBL: A dataframe containing ratios of three-node feedback loop motis
         - FFL: A dataframe containing ratios of three-node feedforward loop motis
@@ -32,26 +40,18 @@ def Motifs(datasetDict, inputSettings):
 
     '''
     
+    if cache is None:
+        cache = DataCache()
+
     # Read file for trueEdges
-    trueEdgesDF = pd.read_csv(str(inputSettings.datadir)+'/'+ datasetDict['name'] +
-                                '/' +datasetDict['trueEdges'],
-                                sep = ',', 
-                                header = 0, index_col = None)
+    trueEdgesPath = str(inputSettings.datadir)+'/'+ datasetDict['name'] + \
+                    '/' +datasetDict['trueEdges']
+    trueEdgesDF = cache.getTrueEdges(trueEdgesPath)
             
-    possibleEdges = list(permutations(np.unique(trueEdgesDF.loc[:,['Gene1','Gene2']]),
-                                 r = 2))        
-    EdgeDict = {'|'.join(p):0 for p in possibleEdges}
-
-    refGraph = nx.DiGraph()
-
-    for key in EdgeDict.keys():
-        u = key.split('|')[0]
-        v = key.split('|')[1]
-        if len(trueEdgesDF.loc[(trueEdgesDF['Gene1'] == u) &
-               (trueEdgesDF['Gene2'] == v)])>0:
-                refGraph.add_edge(u,v)
-
-    numEdges = len(refGraph.edges())
+    # Build the reference graph from integer edge arrays
+    refGenes = getGeneIndex(trueEdgesDF)
+    refSrc, refDst = getEdgeIds(trueEdgesDF, refGenes)
+    refGraph = getDiGraph(refGenes, refSrc, refDst)
 
     refFB, refFF, refMI = getNetProp(refGraph)
 
@@ -77,52 +77,21 @@ def Motifs(datasetDict, inputSettings):
 
     for algo in tqdm(inputSettings.algorithms, 
                      total = len(inputSettings.algorithms), unit = " Algorithms"):
-        if algo[0] == 'PPCOR' or algo[0] == 'PIDC':
+        if algo[0].split('/')[0] in ['PPCOR','PIDC']:
             continue
         # check if the output rankedEdges file exists
-        if Path(outDir + '/' +algo[0]+'/rankedEdges.csv').exists():
+        if findRankedEdges(outDir + '/' +algo[0]+'/rankedEdges.csv') is not None:
              # Initialize Precsion
 
-            predDF = pd.read_csv(outDir + '/' +algo[0]+'/rankedEdges.csv', \
-                                        sep = '\t', header =  0, index_col = None)
-
-
-            predDF = predDF.loc[(predDF['Gene1'] != predDF['Gene2'])]
-            predDF.drop_duplicates(keep = 'first', inplace=True)
-            predDF.reset_index(drop = True,  inplace= True)
-            # check if ranked edges list is empty
-            # if so, it is just set to an empty set
-
-            if not predDF.shape[0] == 0:
+            genes, topkEdges = getTopkEdges(cache, trueEdgesPath,
+                                            outDir + '/' +algo[0]+'/rankedEdges.csv')
 
-                # we want to ensure that we do not include
-                # edges without any edge weight
-                # so check if the non-zero minimum is
-                # greater than the edge weight of the top-kth
-                # node, else use the non-zero minimum value.
-                predDF.EdgeWeight = predDF.EdgeWeight.round(6)
-                predDF.EdgeWeight = predDF.EdgeWeight.abs()
+            # check if the top-k network is empty
+            if not topkEdges.shape[0] == 0:
 
-                # Use num True edges or the number of
-                # edges in the dataframe, which ever is lower
-                maxk = min(predDF.shape[0], numEdges)
-                edgeWeightTopk = predDF.iloc[maxk-1].EdgeWeight
-
-                nonZeroMin = np.nanmin(predDF.EdgeWeight.replace(0, np.nan).values)
-                bestVal = max(nonZeroMin, edgeWeightTopk)
-
-                newDF = predDF.loc[(predDF['EdgeWeight'] >= bestVal)]
-
-                
-                predGraph = nx.DiGraph()
-
-
-                for key in EdgeDict.keys():
-                    u = key.split('|')[0]
-                    v = key.split('|')[1]
-                    if len(newDF.loc[(newDF['Gene1'] == u) &
-                           (newDF['Gene2'] == v)])>0:
-                            predGraph.add_edge(u,v)
+                # Consider only edges between genes in the reference network
+                isRefEdge = (topkEdges < len(refGenes)).all(axis = 1)
+                predGraph = getDiGraph(genes, topkEdges[isRefEdge,0], topkEdges[isRefEdge,1])
 
                 # dataDict['Conn. Comp'][algo[0]], dataDict['FBL'][algo[0]], dataDict['FFL'][algo[0]], dataDict['Mutual'][algo[0]] = getNetProp(predGraph)
                 dataDict['FBL'][algo[0]], dataDict['FFL'][algo[0]], dataDict['Mutual'][algo[0]] = getNetProp(predGraph)
@@ -155,6 +124,11 @@ def getNetProp(inGraph):
     '''
     A helper function to compute
     counts of various network motifs.
+    The counts are computed from products of the sparse
+    adjacency matrix A of the graph, in polynomial time:
+    a set of three nodes is a feedback loop if it supports
+    a directed cycle, and a feedforward loop if it supports
+    a path u->w->v along with the edge u->v.
     
 
     :param inGraph: An graph object of class :class:`networkx.DiGraph`.
@@ -167,38 +141,43 @@ def getNetProp(inGraph):
 
 
     '''
+    def traceOfCube(X):
+        # trace(X^3), without computing X^3
+        return int(X.dot(X).multiply(X.T).sum())
+
+    nodeIndex = {node:idx for idx, node in enumerate(inGraph.nodes())}
+    numNodes = len(nodeIndex)
+    edges = np.array([(nodeIndex[u], nodeIndex[v]) for u,v in inGraph.edges()],
+                     dtype = np.int64).reshape(-1, 2)
+    isSelfLoop = edges[:,0] == edges[:,1]
+    edges = edges[~isSelfLoop]
+
+    # adjacency matrix, ignoring self loops
+    A = sparse.csr_matrix((np.ones(edges.shape[0], dtype = np.int64),
+                           (edges[:,0], edges[:,1])), shape = (numNodes, numNodes))
+    # mutual edges
+    M = A.multiply(A.T).tocsr()
+    # edges without a reverse edge
+    D = A - M
+    # edges of the undirected graph
+    U = A + A.T - M
 
-    # number of weakly connected components in 
-    # reference network
-    # numCC = len(list(nx.weakly_connected_components(inGraph)))
-    
     # number of feedback loop 
-    # in reference network
-    allCyc = nx.simple_cycles(inGraph)
-    cycSet = set()
-    for cyc in allCyc:
-        if len(cyc) == 3:
-            cycSet.add(frozenset(cyc))
-    
-    numFB = len(cycSet)
+    # in reference network:
+    # directed 3-cycles, counting only once the
+    # node sets that support both orientations, i.e.,
+    # triangles of mutual edges
+    numFB = traceOfCube(A)//3 - traceOfCube(M)//6
     
     # number of feedfwd loops
-    # in reference network
-    allPaths = []
-    allPathsSet = set()   
-    for u,v in inGraph.edges():
-        allPaths = nx.all_simple_paths(inGraph, u, v, cutoff=2)
-        for p in allPaths:
-            if len(p) > 2:
-                allPathsSet.add(frozenset(p))
-                
-    numFF= len(allPathsSet)
-    
+    # in reference network:
+    # every triangle of the undirected graph
+    # supports a feedforward loop, unless its edges
+    # only form a directed cycle
+    numFF = traceOfCube(U)//6 - traceOfCube(D)//3
     
-    # number of mutual interactions
-    numMI = 0.0
-    for u,v in inGraph.edges():
-        if (v,u) in inGraph.edges():
-            numMI += 0.5
+    # number of mutual interactions,
+    # where a self loop counts as half of one
+    numMI = float(M.sum() + isSelfLoop.sum())/2
 
     return numFB, numFF, numMI
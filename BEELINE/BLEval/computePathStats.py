@@ -10,31 +10,30 @@ from sklearn.metrics import precision_recall_curve, roc_curve, auc
 from itertools import product, permutations, combinations, combinations_with_replacement
 from tqdm import tqdm
 import networkx as nx
+from collections import defaultdict
+from BLEval.dataCache import DataCache
+from BLEval.topkEdges import getTopkEdges
+from BLEval.edgeIndex import getGeneIndex, getEdgeIds, getDiGraph
+from BLRun.rankedEdges import findRankedEdges
 
-def pathAnalysis(dataDict, inputSettings):
+def pathAnalysis(dataDict, inputSettings, cache = None):
     '''
     Computes "directed","feed-forward", 
     "cascade", and "mutual" motifs.
     '''
     
+    if cache is None:
+        cache = DataCache()
+
     # Read file for trueEdges
-    trueEdgesDF = pd.read_csv(str(inputSettings.datadir)+'/'+ dataDict['name'] +
-                                '/' +dataDict['trueEdges'],
-                                sep = ',', 
-                                header = 0, index_col = None)
+    trueEdgesPath = str(inputSettings.datadir)+'/'+ dataDict['name'] + \
+                    '/' +dataDict['trueEdges']
+    trueEdgesDF = cache.getTrueEdges(trueEdgesPath)
             
-    possibleEdges = list(permutations(np.unique(trueEdgesDF.loc[:,['Gene1','Gene2']]),
-                                 r = 2))        
-    EdgeDict = {'|'.join(p):0 for p in possibleEdges}
-
-    refGraph = nx.DiGraph()
-
-    for key in EdgeDict.keys():
-        u = key.split('|')[0]
-        v = key.split('|')[1]
-        if len(trueEdgesDF.loc[(trueEdgesDF['Gene1'] == u) &
-               (trueEdgesDF['Gene2'] == v)])>0:
-                refGraph.add_edge(u,v)
+    # Build the reference graph from integer edge arrays
+    refGenes = getGeneIndex(trueEdgesDF)
+    refSrc, refDst = getEdgeIds(trueEdgesDF, refGenes)
+    refGraph = getDiGraph(refGenes, refSrc, refDst)
 
     #refCC, refFB, refFF, refMI = getNetProp(refGraph)
 
@@ -50,36 +49,17 @@ def pathAnalysis(dataDict, inputSettings):
 
     for algo in inputSettings.algorithms:
         # check if the output rankedEdges file exists
-        if Path(outDir + '/' +algo[0]+'/rankedEdges.csv').exists() and algo[0] not in ['PPCOR','PIDC']:
+        if findRankedEdges(outDir + '/' +algo[0]+'/rankedEdges.csv') is not None and algo[0].split('/')[0] not in ['PPCOR','PIDC']:
             # Initialize Precsion
-            predDF = pd.read_csv(outDir + '/' +algo[0]+'/rankedEdges.csv', \
-                                        sep = '\t', header =  0, index_col = None)
-
-            predDF.EdgeWeight = predDF.EdgeWeight.round(6)
-            predDF.EdgeWeight = predDF.EdgeWeight.abs()
-            predDF = predDF.loc[(predDF['EdgeWeight'] > 0)]
-            predDF.drop_duplicates(keep = 'first', inplace=True)
-            predDF.reset_index(drop = True,  inplace= True)
-            predDF = predDF.loc[(predDF['Gene1'] != predDF['Gene2'])]
-            if predDF.shape[0] != 0:
-                maxk = min(predDF.shape[0], len(refGraph.edges()))
-                edgeWeightTopk = predDF.iloc[maxk-1].EdgeWeight            
-             
-            newDF = predDF.loc[(predDF['EdgeWeight'] >= edgeWeightTopk)]
-                
-            predGraph = nx.DiGraph()
-            
-
-            for key in EdgeDict.keys():
-                u = key.split('|')[0]
-                v = key.split('|')[1]
-                if len(newDF.loc[(newDF['Gene1'] == u) &
-                       (newDF['Gene2'] == v)])>0:
-                        predGraph.add_edge(u,v)
+            genes, topkEdges = getTopkEdges(cache, trueEdgesPath,
+                                            outDir + '/' +algo[0]+'/rankedEdges.csv')
+            # Consider only edges between genes in the reference network
+            isRefEdge = (topkEdges < len(refGenes)).all(axis = 1)
+            predGraph = getDiGraph(genes, topkEdges[isRefEdge,0], topkEdges[isRefEdge,1])
 
             dataDict = pathStats(predGraph, refGraph)
             collection[algo[0]] = dataDict
-            if algo[0] == 'PPCOR' or algo[0] == 'PIDC':
+            if algo[0].split('/')[0] in ['PPCOR','PIDC']:
                 collection[algo[0]] = {}
         else:
             print(outDir + '/' +algo[0]+'/rankedEdges.csv', \
@@ -143,21 +123,51 @@ def getNetProp(inGraph):
 
     return numCC, numFB, numFF, numMI
 
+def getPathLengths(refGraph, edges):
+    """
+    Computes the length of the shortest path in the reference
+    network between the two genes of each edge. One breadth-first
+    search is run per distinct source gene, and its distances are
+    reused for all the edges from that gene.
+
+    :param refGraph: The reference network.
+    :type refGraph: :obj:networkx.DiGraph
+
+    :param edges: An iterable of (u, v) edges.
+    :type edges: iterable
+
+    :returns:
+        A dictionary with the edges as keys and the path lengths as values,
+        or None if there is no path from u to v in the reference network
+    """
+    targets = defaultdict(list)
+    for u,v in edges:
+        targets[u].append(v)
+
+    pathLengths = {}
+    for u, vs in targets.items():
+        if u in refGraph:
+            distances = nx.single_source_shortest_path_length(refGraph, u)
+        else:
+            distances = {}
+        for v in vs:
+            pathLengths[(u,v)] = distances.get(v)
+    return pathLengths
+
 def getEdgeHistogram(inGraph, refGraph):
     falsePositives = set(inGraph.edges()).difference(refGraph.edges())
     edgeHistogramCounts = {0:0}
+    pathLengths = getPathLengths(refGraph, falsePositives)
     
     for fe in falsePositives:
-        u,v = fe
-        try:
-            path = nx.dijkstra_path(refGraph,u,v)
-            pathlength = len(path) -1 
+        pathlength = pathLengths[fe]
+        if pathlength is not None:
             if pathlength in edgeHistogramCounts.keys():
                 edgeHistogramCounts[pathlength] +=1
             else:
                 edgeHistogramCounts[pathlength] = 0
             
-        except nx.exception.NetworkXNoPath:
+        else:
             edgeHistogramCounts[0] +=1
     return edgeHistogramCounts
 
@@ -173,16 +183,15 @@ def pathStats(inGraph, refGraph):
     nopath = 0
     yespath = 0
     edgeCounts = {0:0,2:0,3:0,4:0,5:0}    
+    pathLengths = getPathLengths(refGraph, falsePositives)
     for fe in falsePositives:
-        u,v = fe
-        try:
-            path = nx.dijkstra_path(refGraph,u,v)
-            pathlength = len(path) -1
+        pathlength = pathLengths[fe]
+        if pathlength is not None:
             yespath +=1
             if pathlength in edgeCounts.keys():
                 edgeCounts[pathlength] +=1
             
-        except nx.exception.NetworkXNoPath:
+        else:
             nopath +=1
 
     edgeCounts['numPred'] = numPredictions
@@ -13,6 +13,8 @@ from itertools import permutations
 from collections import defaultdict
 from multiprocessing import Pool, cpu_count
 from networkx.convert_matrix import from_pandas_adjacency
+from BLEval.topkEdges import getTopkEdges
+from BLEval.edgeIndex import getEdgeIds
 
 def signedEPrec(evalObject, algorithmName):
     '''
@@ -43,38 +45,10 @@ def signedEPrec(evalObject, algorithmName):
     sim_names = []
     for sgn in ['+','-']:
         for dataset in tqdm(evalObject.input_settings.datasets):
-            trueEdgesDF = pd.read_csv(str(evalObject.input_settings.datadir)+'/'+ \
-                                      dataset['name'] + '/' +\
-                                      dataset['trueEdges'], sep = ',',
-                                      header = 0, index_col = None)
-
-            possibleEdges = list(permutations(np.unique(trueEdgesDF.loc[:,['Gene1','Gene2']]),
-                                         r = 2))
-
-
-            TrueEdgeDict = {'|'.join(p):0 for p in possibleEdges}
-            PredEdgeDict = {'|'.join(p):0 for p in possibleEdges}
-
-            # Compute TrueEdgeDict Dictionary
-            # 1 if edge is present in the ground-truth
-            # 0 if edge is not present in the ground-truth
-            numEdges = 0
-            trueEdges = set()
-            toRemove = []
-            for key in TrueEdgeDict.keys():
-                subDF = trueEdgesDF.loc[(trueEdgesDF['Gene1'] == key.split('|')[0]) &
-                       (trueEdgesDF['Gene2'] == key.split('|')[1])]
-
-                if subDF.shape[0] > 0:
-                    if  subDF['Type'].values[0] == sgn:
-                        TrueEdgeDict[key] = 1
-                        trueEdges.add(key)
-                        numEdges += 1
-                    else:
-                        toRemove.append(key)
-            for key in toRemove:
-                TrueEdgeDict.pop(key, None)
-
+            trueEdgesPath = str(evalObject.input_settings.datadir)+'/'+ \
+                            dataset['name'] + '/' +\
+                            dataset['trueEdges']
+            trueEdgesDF = evalObject.cache.getTrueEdges(trueEdgesPath)
 
             outDir = str(evalObject.output_settings.base_dir) + \
                      str(evalObject.input_settings.datadir).split("inputs")[1] + \
@@ -84,73 +58,47 @@ def signedEPrec(evalObject, algorithmName):
             rank_path = outDir + "/rankedEdges.csv"
             if not os.path.isdir(outDir):
                 print(outDir," not found")
-                rankDict[sgn][dataset["name"]] = set([])
+                rankDict[sgn][dataset["name"]] = None
                 continue
             try:
-                predDF = pd.read_csv(rank_path, sep="\t", header=0, index_col=None)
+                # Edges of the incorrect sign are removed from consideration
+                genes, topkEdges = getTopkEdges(evalObject.cache, trueEdgesPath,
+                                                rank_path, sign = sgn)
             except:
                 print("Skipping signed precision computation for ", algorithmName, "on path", outDir)
-                rankDict[sgn][dataset["name"]] = set([])
+                rankDict[sgn][dataset["name"]] = None
                 continue
 
-            predDF = predDF.loc[(predDF['Gene1'] != predDF['Gene2'])]
-            predDF.drop_duplicates(keep = 'first', inplace=True)
-            predDF.reset_index(drop = True,  inplace= True)
-
-            # Remove incorrect sign from consideration
-            for idx, row in predDF.iterrows():
-                if str(row['Gene1']) + '|' + str(row['Gene2']) not in TrueEdgeDict.keys():
-                    predDF.drop(idx, axis = 'index', inplace= True)
-            predDF.reset_index(drop = True,  inplace= True)
-            # check if ranked edges list is empty
-            # if so, it is just set to an empty set
-
-            if not predDF.shape[0] == 0:
-
-                # we want to ensure that we do not include
-                # edges without any edge weight
-                # so check if the non-zero minimum is
-                # greater than the edge weight of the top-kth
-                # node, else use the non-zero minimum value.
-                predDF.EdgeWeight = predDF.EdgeWeight.round(6)
-                predDF.EdgeWeight = predDF.EdgeWeight.abs()
-
-                # Use num True edges or the number of
-                # edges in the dataframe, which ever is lower
-                maxk = min(predDF.shape[0], numEdges)
-                edgeWeightTopk = predDF.iloc[maxk-1].EdgeWeight
-
-                nonZeroMin = np.nanmin(predDF.EdgeWeight.replace(0, np.nan).values)
-                bestVal = max(nonZeroMin, edgeWeightTopk)
-
-                newDF = predDF.loc[(predDF['EdgeWeight'] >= bestVal)]
-                rankDict[sgn][dataset["name"]] = set(newDF['Gene1'] + "|" + newDF['Gene2'])
+            # check if the top-k network is empty
+            # if so, it is just set to None
+            if not topkEdges.shape[0] == 0:
+                rankDict[sgn][dataset["name"]] = (genes, topkEdges)
             else:
                 print("\nSkipping signed early precision computation for file on path ", rank_path,"due to lack of predictions.")
-                rankDict[sgn][dataset["name"]] = set([])
+                rankDict[sgn][dataset["name"]] = None
 
     Pprec = {'+':{},'-':{}}
     for sgn in ['+','-']:
 
-        TrueEdgeDict = {'|'.join(p):0 for p in possibleEdges}
-
-        # Compute TrueEdgeDict Dictionary
-        # 1 if edge is present in the ground-truth
-        # 0 if edge is not present in the ground-truth
-        trueEdges = set()
-        for key in TrueEdgeDict.keys():
-            subDF = trueEdgesDF.loc[(trueEdgesDF['Gene1'] == key.split('|')[0]) &
-                   (trueEdgesDF['Gene2'] == key.split('|')[1])]
-
-            if subDF.shape[0] > 0:
-                if  subDF['Type'].values[0] == sgn:
-                    TrueEdgeDict[key] = 1
-                    trueEdges.add(key)
+        # Edges of the ground truth of this sign, i.e., whose first
+        # row has this Type, ignoring self loops. As before, the
+        # ground truth of the last dataset is used for all of them.
+        isFirst = ~trueEdgesDF.duplicated(subset = ['Gene1','Gene2'], keep = 'first')
+        trueSignDF = trueEdgesDF.loc[isFirst & (trueEdgesDF['Gene1'] != trueEdgesDF['Gene2']) &
+                                     (trueEdgesDF['Type'] == sgn)]
 
         for dataset in tqdm(evalObject.input_settings.datasets):
-            if len(rankDict[sgn][dataset["name"]]) != 0 and len(trueEdges) != 0:
-                intersectionSet = rankDict[sgn][dataset["name"]].intersection(trueEdges)
-                Pprec[sgn][dataset["name"]] = len(intersectionSet)/len(rankDict[sgn][dataset["name"]])
+            if rankDict[sgn][dataset["name"]] is not None and trueSignDF.shape[0] != 0:
+                # Compare edges as integer ids
+                genes, topkEdges = rankDict[sgn][dataset["name"]]
+                numGenes = len(genes)
+                trueSrc, trueDst = getEdgeIds(trueSignDF, genes)
+                isKnown = (trueSrc >= 0) & (trueDst >= 0)
+                trueEdgeIds = np.unique(trueSrc[isKnown]*numGenes + trueDst[isKnown])
+                topkEdgeIds = np.unique(topkEdges[:,0]*numGenes + topkEdges[:,1])
+                numIntersection = len(np.intersect1d(topkEdgeIds, trueEdgeIds,
+                                                     assume_unique = True))
+                Pprec[sgn][dataset["name"]] = numIntersection/len(topkEdgeIds)
             else:
                 Pprec[sgn][dataset["name"]] = 0
                 
@@ -13,6 +13,8 @@ from itertools import permutations
 from collections import defaultdict
 from multiprocessing import Pool, cpu_count
 from networkx.convert_matrix import from_pandas_adjacency
+from scipy.stats import rankdata
+from BLEval.edgeIndex import getGeneIndex, getEdgeScores
 
 def Spearman(evalObject, algorithmName):
     """
@@ -33,16 +35,12 @@ def Spearman(evalObject, algorithmName):
         - mad: Median Absolute Deviation of  the Spearman correlation values
     """
 
-    rankDict = {}
-    sim_names = []
+    refGenes = {}
+    predScores = {}
     for dataset in tqdm(evalObject.input_settings.datasets):
-        trueEdgesDF = pd.read_csv(str(evalObject.input_settings.datadir)+'/'+ \
+        trueEdgesDF = evalObject.cache.getTrueEdges(str(evalObject.input_settings.datadir)+'/'+ \
                       dataset['name'] + '/' +\
-                      dataset['trueEdges'], sep = ',',
-                      header = 0, index_col = None)
-        possibleEdges = list(permutations(np.unique(trueEdgesDF.loc[:,['Gene1','Gene2']]),
-                                     r = 2))
-        PredEdgeDict = {'|'.join(p):0 for p in possibleEdges}
+                      dataset['trueEdges'])
 
         outDir = str(evalObject.output_settings.base_dir) + \
                  str(evalObject.input_settings.datadir).split("inputs")[1] + \
@@ -52,25 +50,114 @@ def Spearman(evalObject, algorithmName):
         if not os.path.isdir(outDir):
             continue
         try:
-            predEdgeDF = pd.read_csv(rank_path, sep="\t", header=0, index_col=None)
+            predEdgeDF = evalObject.cache.getRankedEdges(rank_path)
         except:
             print("Skipping spearman computation for ", algorithmName, "on path", outDir)
             continue
 
-        for key in PredEdgeDict.keys():
-            subDF = predEdgeDF.loc[(predEdgeDF['Gene1'] == key.split('|')[0]) &
-                           (predEdgeDF['Gene2'] == key.split('|')[1])]
-            if len(subDF)>0:
-                PredEdgeDict[key] = np.abs(subDF.EdgeWeight.values[0])
-        rankDict[dataset["name"]] = PredEdgeDict
-        sim_names.append(dataset["name"])
-    df2 = pd.DataFrame.from_dict(rankDict)
-    spearmanDF = df2.corr(method='spearman')
+        # Absolute weight of the first prediction of every possible
+        # edge in the reference network, 0 if the edge is not predicted
+        refGenes[dataset["name"]] = getGeneIndex(trueEdgesDF)
+        predScores[dataset["name"]] = getEdgeScores(trueEdgesDF, predEdgeDF,
+                                                    directed = True,
+                                                    selfEdges = False).PredEdges.values
 
+    names = list(predScores.keys())
+    rankMatrix = getRankMatrix([refGenes[name] for name in names],
+                               [predScores[name] for name in names])
+    spearman = computePairwiseSpearman(rankMatrix)
 
-    df = spearmanDF.where(np.triu(np.ones(spearmanDF.shape),  k = 1).astype(np.bool))
+    # Only the upper triangle is used, ignoring undefined correlations
+    rows, cols = np.triu_indices(len(names), k = 1)
+    values = pd.Series(spearman[rows, cols]).dropna()
 
-    df = df.stack().reset_index()
-    df.columns = ['Row','Column','Value']
+    return(values.median(),values.mad())
 
-    return(df.Value.median(),df.Value.mad())
+
+def getRankMatrix(geneIndices, predScores):
+    """
+    A helper function to align the predicted edge scores of several
+    datasets on a shared gene index, and to rank them. Row i contains
+    the ranks of the scores of the i-th dataset, centered on their
+    mean, and is undefined (NaN) for edges between genes that are not
+    in the reference network of that dataset.
+
+
+    :param geneIndices:  A list of gene arrays, one per dataset, as returned by :func:`BLEval.edgeIndex.getGeneIndex`.
+    :type geneIndices: list
+
+    :param predScores:  A list of score arrays, one per dataset, over all the possible edges between its genes (excluding self loops), in the order of :func:`itertools.permutations`.
+    :type predScores: list
+
+    :returns:
+        A float32 matrix with one row per dataset and one column per
+        possible edge between the genes of all the datasets
+    """
+    if len(geneIndices) == 0:
+        return np.zeros((0, 0), dtype = np.float32)
+
+    genes = np.unique(np.concatenate(geneIndices))
+    numGenes = len(genes)
+
+    rankMatrix = np.full((len(geneIndices), numGenes*(numGenes - 1)), np.nan,
+                         dtype = np.float32)
+    for row, (geneIndex, scores) in enumerate(zip(geneIndices, predScores)):
+        geneIds = np.searchsorted(genes, geneIndex)
+        src, dst = np.nonzero(~np.eye(len(geneIndex), dtype = bool))
+        src = geneIds[src]
+        dst = geneIds[dst]
+
+        # Position of each edge in the permutations of all genes
+        cols = src*(numGenes - 1) + dst - (dst > src)
+        # Ties get their average rank, as in pandas
+        rankMatrix[row, cols] = rankdata(scores) - (len(scores) + 1)/2
+
+    return rankMatrix
+
+
+def computePairwiseSpearman(rankMatrix, blockSize = 2**20):
+    """
+    A helper function to compute all pairwise Spearman correlations
+    between the rows of a matrix returned by :func:`getRankMatrix`.
+    If every row is defined on all the edges, the correlations are
+    obtained from one matrix product of the centered ranks, accumulated
+    in float64 over blocks of columns. Otherwise, each pair of rows is
+    ranked again on the edges defined in both, as in
+    :meth:`pandas.DataFrame.corr`. In both cases, the correlations are
+    those of DataFrame.corr(method = 'spearman') up to rounding.
+
+
+    :param rankMatrix:  A matrix of centered ranks, with one row per dataset.
+    :type rankMatrix: numpy.ndarray
+
+    :param blockSize:  Number of columns multiplied at a time.
+    :type blockSize: int
+
+    :returns:
+        A symmetric matrix of Spearman correlations, with NaN for
+        pairs where a correlation is undefined
+    """
+    numRows = rankMatrix.shape[0]
+
+    if not np.isnan(rankMatrix).any():
+        cov = np.zeros((numRows, numRows))
+        for start in range(0, rankMatrix.shape[1], blockSize):
+            block = rankMatrix[:, start:start + blockSize].astype(np.float64)
+            cov += block.dot(block.T)
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            return cov/np.outer(std, std)
+
+    corr = np.full((numRows, numRows), np.nan)
+    for i in range(numRows):
+        for j in range(i, numRows):
+            isDefined = ~np.isnan(rankMatrix[i]) & ~np.isnan(rankMatrix[j])
+            if isDefined.sum() < 2:
+                continue
+            x = rankdata(rankMatrix[i, isDefined])
+            y = rankdata(rankMatrix[j, isDefined])
+            x -= x.mean()
+            y -= y.mean()
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                corr[i, j] = corr[j, i] = x.dot(y)/np.sqrt(x.dot(x)*y.dot(y))
+    return corr
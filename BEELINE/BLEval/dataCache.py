@@ -0,0 +1,186 @@
+import os
+import pandas as pd
+from collections import OrderedDict
+from BLRun.rankedEdges import findRankedEdges, readRankedEdges
+
+# The cache of this process, if it is a worker process of
+# :class:`BLEval.BLEval`, see :func:`initProcessCache`
+processCache = None
+
+
+class DataCache(object):
+    '''
+    A bounded least-recently-used cache of parsed input files, shared
+    by all the evaluation functions of a :class:`BLEval.BLEval` object,
+    so that each reference network and each rankedEdges.csv file is
+    parsed only once per evaluation. The binary versions of the ranked
+    edges, such as rankedEdges.feather, are read instead when they exist.
+
+    Entries are keyed by the absolute path of the file and the options
+    used to read it. An entry is re-read if the modification time or
+    the size of the file has changed since it was parsed. Values derived
+    from parsed files, such as top-k networks, can be cached the same way
+    with :meth:`getDerived`.
+
+    A cache is never copied between processes: it is pickled as a
+    reference to the cache of the process it is unpickled in, which is
+    created once per worker process by :func:`initProcessCache`, so that
+    each worker parses each file at most once, and keeps it for the
+    next units of work it runs.
+
+    :param maxsize: Maximum number of parsed files kept in memory.
+    :type maxsize: int
+    '''
+
+    def __init__(self, maxsize = 128) -> None:
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __reduce__(self):
+        return (getProcessCache, (self.maxsize,))
+
+    def readCSV(self, path, **kwargs):
+        '''
+        Reads a file using :func:`pandas.read_csv`, or returns
+        the cached dataframe if the file has not changed.
+
+        :param path: Path to the file.
+        :type path: str
+
+        :param kwargs: Keyword arguments passed to :func:`pandas.read_csv`.
+
+        :returns:
+            A copy of the parsed dataframe, which the caller may modify.
+        '''
+        return self.__read(path, pd.read_csv, kwargs)
+
+    def getDerived(self, function, paths, *args):
+        '''
+        Computes a value from one or more input files, or returns the
+        cached value if none of the files has changed. The value is
+        computed by calling function(cache, *paths, *args), where
+        function is expected to read the files through the cache.
+
+        :param function: A module-level function computing the value.
+        :type function: function
+
+        :param paths: Paths to the files the value is computed from.
+        :type paths: tuple
+
+        :param args: Additional hashable arguments passed to function.
+
+        :returns:
+            The computed value. It is shared by all the callers,
+            which must not modify it.
+        '''
+        paths = tuple(os.path.abspath(str(path)) for path in paths)
+        key = (function.__module__, function.__name__, paths, args)
+        stamp = tuple(self.__stamp(path) for path in paths)
+
+        entry = self.__lookup(key, stamp)
+        if entry is not None:
+            return entry
+
+        value = function(self, *paths, *args)
+        self.__store(key, stamp, value)
+        return value
+
+    def getTrueEdges(self, path):
+        '''
+        Reads a reference network file (comma-separated, with a header).
+
+        :param path: Path to the reference network, typically refNetwork.csv
+        :type path: str
+
+        :returns:
+            A dataframe containing the reference network.
+        '''
+        return self.readCSV(path, sep = ',', header = 0, index_col = None)
+
+    def getRankedEdges(self, path):
+        '''
+        Reads a predicted ranked edge list (tab-separated, with a header).
+        If a binary version of the file was written next to it, such as
+        rankedEdges.feather, and pyarrow is installed, the binary version
+        is read instead, see :func:`BLRun.rankedEdges.findRankedEdges`.
+
+        :param path: Path to the predictions, typically rankedEdges.csv
+        :type path: str
+
+        :returns:
+            A dataframe containing the predicted edges.
+        '''
+        binaryPath = findRankedEdges(path)
+        if binaryPath is None or binaryPath.endswith('.csv'):
+            return self.readCSV(path, sep = '\t', header = 0, index_col = None)
+        return self.__read(binaryPath, readRankedEdges, {})
+
+    def __read(self, path, reader, kwargs):
+        path = os.path.abspath(str(path))
+        key = (path, reader.__name__, tuple(sorted(kwargs.items())))
+        # Raises FileNotFoundError, like pandas.read_csv
+        stamp = self.__stamp(path)
+
+        entry = self.__lookup(key, stamp)
+        if entry is not None:
+            return entry.copy()
+
+        DF = reader(path, **kwargs)
+        self.__store(key, stamp, DF)
+        return DF.copy()
+
+    def __stamp(self, path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def __lookup(self, key, stamp):
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def __store(self, key, stamp, value):
+        self.entries[key] = (stamp, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last = False)
+
+    def clear(self):
+        '''
+        Removes all the cached entries.
+        '''
+        self.entries.clear()
+
+
+def initProcessCache(maxsize = 128):
+    '''
+    Creates the cache of a worker process, as the initializer of the
+    pool of worker processes of :class:`BLEval.BLEval`.
+
+    :param maxsize: Maximum number of parsed files kept in memory.
+    :type maxsize: int
+    '''
+    global processCache
+    processCache = DataCache(maxsize = maxsize)
+
+
+def getProcessCache(maxsize = 128):
+    '''
+    Returns the cache of this process, which every cache sent to it is
+    unpickled as, creating it if the process was not initialized with
+    :func:`initProcessCache`.
+
+    :param maxsize: Maximum number of parsed files kept in memory.
+    :type maxsize: int
+
+    :returns:
+        A :class:`DataCache`
+    '''
+    if processCache is None:
+        initProcessCache(maxsize)
+    return processCache
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+
+def getGeneIndex(trueEdgesDF):
+    '''
+    Returns the sorted array of unique genes in the reference network.
+    The position of a gene in this array is used as its integer id
+    by all the vectorized evaluation functions.
+
+    :param trueEdgesDF:   A pandas dataframe containing the reference network, with Gene1 and Gene2 columns.
+    :type trueEdgesDF: DataFrame
+
+    :returns:
+        A numpy array of gene names, sorted as in :func:`numpy.unique`.
+    '''
+    return np.unique(trueEdgesDF.loc[:,['Gene1','Gene2']])
+
+
+def getEdgeIds(edgeDF, geneIndex):
+    '''
+    Maps the Gene1 and Gene2 columns of an edge list to integer gene ids.
+
+    :param edgeDF:   A pandas dataframe with Gene1 and Gene2 columns.
+    :type edgeDF: DataFrame
+
+    :param geneIndex:   An array of gene names, as returned by :func:`getGeneIndex`.
+    :type geneIndex: numpy.ndarray
+
+    :returns:
+            - src: An integer array of ids of Gene1 (-1 if the gene is not in geneIndex)
+            - dst: An integer array of ids of Gene2 (-1 if the gene is not in geneIndex)
+    '''
+    index = pd.Index(geneIndex)
+    src = index.get_indexer(edgeDF['Gene1'])
+    dst = index.get_indexer(edgeDF['Gene2'])
+    return src, dst
+
+
+def getDiGraph(geneIndex, src, dst):
+    '''
+    Builds a directed graph from integer edge arrays, ignoring self loops
+    and duplicate edges. Edges are added in the same order as
+    :func:`itertools.permutations` over geneIndex, so the graph is the
+    same as one built by checking every possible edge in that order.
+
+    :param geneIndex:   An array of gene names, as returned by :func:`getGeneIndex`.
+    :type geneIndex: numpy.ndarray
+
+    :param src:   An integer array of ids of the source genes.
+    :type src: numpy.ndarray
+
+    :param dst:   An integer array of ids of the target genes.
+    :type dst: numpy.ndarray
+
+    :returns:
+        A graph object of class :class:`networkx.DiGraph`, with gene names as nodes.
+    '''
+    numGenes = len(geneIndex)
+    src = np.asarray(src, dtype = np.int64)
+    dst = np.asarray(dst, dtype = np.int64)
+    edgeIds = np.unique((src*numGenes + dst)[src != dst])
+    rows, cols = np.divmod(edgeIds, numGenes)
+
+    graph = nx.DiGraph()
+    graph.add_edges_from(zip(geneIndex[rows], geneIndex[cols]))
+    return graph
+
+
+def getEdgeScores(trueEdgesDF, predEdgeDF, directed = True, selfEdges = True):
+    '''
+    Computes the class label and the predicted score of every possible
+    edge in a graph formed using the genes in the reference network.
+    Gene names are mapped to integer ids once and edges are scattered into
+    dense matrices, instead of filtering the dataframes for every possible edge.
+    Edges are enumerated in the same order as :func:`itertools.product`,
+    :func:`itertools.permutations`, :func:`itertools.combinations_with_replacement`
+    or :func:`itertools.combinations` over the sorted genes.
+
+    :param trueEdgesDF:   A pandas dataframe containing the reference network, with Gene1 and Gene2 columns.
+    :type trueEdgesDF: DataFrame
+
+    :param predEdgeDF:   A pandas dataframe containing the predicted network, with Gene1, Gene2 and EdgeWeight columns.
+    :type predEdgeDF: DataFrame
+
+    :param directed:   A flag to indicate whether to treat predictions as directed edges (directed = True) or undirected edges (directed = False).
+    :type directed: bool
+
+    :param selfEdges:   A flag to indicate whether to include self-edges (selfEdges = True) or exclude self-edges (selfEdges = False) from evaluation.
+    :type selfEdges: bool
+
+    :returns:
+        A dataframe with one row per possible edge and two columns: TrueEdges,
+        the class label (1 if the edge is in the reference network, else 0), and
+        PredEdges, the absolute predicted edge weight (0 if the edge is not predicted).
+    '''
+    # Map gene names to integer ids once
+    geneIndex = getGeneIndex(trueEdgesDF)
+    numGenes = len(geneIndex)
+
+    trueSrc, trueDst = getEdgeIds(trueEdgesDF, geneIndex)
+    predSrc, predDst = getEdgeIds(predEdgeDF, geneIndex)
+
+    # Ignore predictions on genes absent from the reference network
+    isKnown = (predSrc >= 0) & (predDst >= 0)
+    predSrc = predSrc[isKnown]
+    predDst = predDst[isKnown]
+    predWeights = np.abs(predEdgeDF.EdgeWeight.values[isKnown])
+
+    # TrueEdges[i, j] is 1 if edge is present in the ground-truth
+    # 0 if edge is not present in the ground-truth
+    TrueEdges = np.zeros((numGenes, numGenes), dtype = np.int8)
+    PredEdges = np.zeros((numGenes, numGenes), dtype = np.float64)
+
+    if directed:
+        TrueEdges[trueSrc, trueDst] = 1
+
+        # Use the weight of the first occurrence of
+        # each predicted edge
+        _, firstIdx = np.unique(predSrc*numGenes + predDst, return_index = True)
+        PredEdges[predSrc[firstIdx], predDst[firstIdx]] = predWeights[firstIdx]
+
+        # All possible edges, in the same order as
+        # itertools.product or itertools.permutations
+        if selfEdges:
+            rows, cols = np.divmod(np.arange(numGenes*numGenes), numGenes)
+        else:
+            rows, cols = np.nonzero(~np.eye(numGenes, dtype = bool))
+
+    # if undirected
+    else:
+        # Store both orientations of an edge
+        # in the upper triangle
+        TrueEdges[np.minimum(trueSrc, trueDst), np.maximum(trueSrc, trueDst)] = 1
+
+        # Use the maximum absolute weight across both
+        # orientations of each predicted edge
+        np.maximum.at(PredEdges, (np.minimum(predSrc, predDst),
+                                  np.maximum(predSrc, predDst)), predWeights)
+
+        # All possible edges, in the same order as
+        # itertools.combinations_with_replacement or
+        # itertools.combinations
+        if selfEdges:
+            rows, cols = np.triu_indices(numGenes, k = 0)
+        else:
+            rows, cols = np.triu_indices(numGenes, k = 1)
+
+    # Both columns are float, as in the dictionary based
+    # dataframe that was passed to sklearn and PRROC before
+    outDF = pd.DataFrame({'TrueEdges': TrueEdges[rows, cols].astype(np.float64),
+                          'PredEdges': PredEdges[rows, cols]},
+                         columns = ['TrueEdges','PredEdges'])
+    return outDF
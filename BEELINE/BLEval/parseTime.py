@@ -8,10 +8,40 @@ import multiprocessing
 from pathlib import Path
 import concurrent.futures
 from itertools import permutations
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from multiprocessing import Pool, cpu_count
 from networkx.convert_matrix import from_pandas_adjacency
 
+# Columns of the telemetry tables for the fields of the output of
+# GNU time -v. Sizes are in kbytes and times in seconds.
+TimeFields = OrderedDict([
+    ('Command being timed', 'Command'),
+    ('User time (seconds)', 'UserTime'),
+    ('System time (seconds)', 'SystemTime'),
+    ('Percent of CPU this job got', 'CPUPercent'),
+    ('Elapsed (wall clock) time (h:mm:ss or m:ss)', 'WallClock'),
+    ('Average shared text size (kbytes)', 'AvgSharedText'),
+    ('Average unshared data size (kbytes)', 'AvgUnsharedData'),
+    ('Average stack size (kbytes)', 'AvgStack'),
+    ('Average total size (kbytes)', 'AvgTotal'),
+    ('Maximum resident set size (kbytes)', 'MaxRSS'),
+    ('Average resident set size (kbytes)', 'AvgRSS'),
+    ('Major (requiring I/O) page faults', 'MajorPageFaults'),
+    ('Minor (reclaiming a frame) page faults', 'MinorPageFaults'),
+    ('Voluntary context switches', 'VoluntaryContextSwitches'),
+    ('Involuntary context switches', 'InvoluntaryContextSwitches'),
+    ('Swaps', 'Swaps'),
+    ('File system inputs', 'FileSystemInputs'),
+    ('File system outputs', 'FileSystemOutputs'),
+    ('Socket messages sent', 'SocketMessagesSent'),
+    ('Socket messages received', 'SocketMessagesReceived'),
+    ('Signals delivered', 'SignalsDelivered'),
+    ('Page size (bytes)', 'PageSize'),
+    ('Exit status', 'ExitStatus')])
+
+# Columns identifying the time file of a row of the telemetry table
+TelemetryKeys = ['Dataset', 'Algorithm', 'Trajectory', 'File', 'Status']
+
 def getTime(evalObject, dataset):
     """
     Return time taken for each of the algorithms
@@ -30,80 +60,194 @@ def getTime(evalObject, dataset):
         value is the time taken (in sec.).
 
     """
+    # Initialize algorithm:time-taken dictionary
+    algo_dict = dict()
 
-    
+    rows = getTelemetry(evalObject, dataset)
+    for algo in evalObject.input_settings.algorithms:
+        algoRows = [row for row in rows if row['Algorithm'] == algo[0]]
+        # If a time file is missing, or the algorithm failed,
+        # skip reporting that algorithm
+        if any(row['Status'] != 'ok' for row in algoRows):
+            print("Skipping time computation for ", algo[0], "on dataset", dataset["name"], "\n")
+            continue
+
+        # If the algorithm was run on each trajectory separately,
+        # report the total time taken on all the trajectories
+        algo_dict[algo[0]] = sum(row['UserTime'] for row in algoRows)
+
+    return algo_dict
+
+
+def getTelemetry(evalObject, dataset):
+    """
+    Return all the fields of the time files of each of the algorithms
+    in the evalObject on the dataset specified, one row per time file,
+    i.e., per trajectory if the algorithm was run on each trajectory
+    separately (time0.txt, time1.txt, and so on).
+
+    :param evalObject:   An object of the class :class:`BLEval.BLEval`
+    :type evalObject: BLEval
+    :param dataset:   Dataset for which the time output must be parsed for each algorithm.
+    :type dataset: dict
+
+    :returns:
+        A list of dictionaries, one per time file, with the keys in
+        TelemetryKeys and the fields of the file, see :func:`parseTimeFile`.
+        The status of a row is 'ok', 'failed' if the algorithm exited
+        with a non-zero status, the time file cannot be parsed, or
+        BLRunner.py recorded the failure of the run to failure.json,
+        or 'missing' if the time file does not exist.
+    """
     # Set the output directory for a given dataset 
     # where the time.txt files are stored for each algorithm.
     outDir = str(evalObject.output_settings.base_dir) + \
              str(evalObject.input_settings.datadir).split("inputs")[1] + "/" + dataset["name"] + "/"
-    
-    # Initialize algorithm:time-taken dictionary
-    algo_dict = dict()
-    
-    # Obtain the list of algorithms for which the 
-    # time.txt files must be read in the outDir
-    algos = evalObject.input_settings.algorithms
-    
-    # Repeat for each algorithm
-    for algo in algos:
-        # Check if single time.txt file
-        path = outDir+algo[0]+"/time.txt"
-        if Path(path).exists():
-            # If so, parse the time.txt file
-            # to obtain CPU time taken to run the
-            # GRN algorithm on the given dataset
-            time = parse_time_files(path)
-        else:
-            # If the algorithm was run on each
-            # trajectory in the dataset separately, there
-            # will be multiple time files, namely, 
-            # time0.txt, time1.txt, and so on. 
-
-            # In order to report the total time taken,
-            # we sum up the time taken for running the alorithm
-            # on each trajectory.
-            
-            # First, obtain the number of trajectories
-            # by reading the 'cellData' file for the given
-            # dataset.
-            
-            # path to pseduotime file (or 'cellData' file)
-            PTFile = str(evalObject.input_settings.datadir.joinpath(dataset['name']+'/'+dataset['cellData']))
-         
-            # Read in the PTFile to obtain the number of trajectories
-            # Which is equal to the number of columns.           
-
-            PTData = pd.read_csv(PTFile, header = 0, index_col = 0)
-            
-            # TODO: Check if column names only correspond to PseudoTime for 
-            # each trajectory!
-            colNames = PTData.columns
-            
-            # Read each time_.txt file individually
-            # and report the total time taken.
-            timeTemp = 0
-            for idx in range(len(colNames)):
-                path = outDir+algo[0]+"/time"+str(idx)+".txt"
-                timeTemp += parse_time_files(path)
-
-            # If for some reason a time file is missing,
-            # the parse_time_files function returns a -1.
-            # We will ignore those algorithms with missing
-            # time values for now, as shown below.
-            if timeTemp >= 0:
-                time =  timeTemp
+
+    rows = []
+    numTrajectories = None
+    for algo in evalObject.input_settings.algorithms:
+        # e.g., a run that timed out, or that failed to produce its outputs
+        recordedFailure = Path(outDir+algo[0]+"/failure.json").exists()
+        paths = [(None, outDir+algo[0]+"/time.txt")]
+        if not Path(paths[0][1]).exists():
+            # The number of trajectories is the number
+            # of columns of the pseudotime file
+            if numTrajectories is None:
+                PTFile = str(evalObject.input_settings.datadir.joinpath(dataset['name']+'/'+dataset['cellData']))
+                PTData = evalObject.cache.readCSV(PTFile, header = 0, index_col = 0)
+                numTrajectories = len(PTData.columns)
+            trajectoryPaths = [(idx, outDir+algo[0]+"/time"+str(idx)+".txt")
+                               for idx in range(numTrajectories)]
+            if any(Path(path).exists() for idx, path in trajectoryPaths):
+                paths = trajectoryPaths
+
+        for trajectory, path in paths:
+            fields = parseTimeFile(path)
+            if fields is None:
+                status = 'missing'
+                fields = {}
+            elif fields.get('UserTime') is None or fields.get('ExitStatus', 0) != 0:
+                status = 'failed'
             else:
-                time = -1
-                
-        # If time files do not exist, skip reporting that algorithm
-        if time == -1:
-            print("Skipping time computation for ", algo[0], "on dataset", dataset["name"], "\n")
+                status = 'ok'
+            if recordedFailure:
+                status = 'failed'
+            row = OrderedDict([('Dataset', dataset['name']), ('Algorithm', algo[0]),
+                               ('Trajectory', trajectory), ('File', path), ('Status', status)])
+            row.update(fields)
+            rows.append(row)
+
+    return rows
+
+
+def summarizeTelemetry(telemetry):
+    """
+    Summarizes the time files of each run, i.e., of each algorithm
+    on each dataset, over its trajectories.
+
+    :param telemetry: A table of the fields of the time files, as returned by :meth:`BLEval.BLEval.parseTelemetry`.
+    :type telemetry: DataFrame
+
+    :returns:
+        A DataFrame with one row per run, and the columns Dataset,
+        Algorithm, Status ('ok', or 'failed' or 'missing' if any of its
+        time files is), CPUTime (user time, as reported by
+        :meth:`BLEval.BLEval.parseTime`), SystemTime and WallClock,
+        summed over the trajectories, MaxRSS, the peak resident set size
+        in kbytes over the trajectories, and Trajectories, the number of
+        time files. Times are also reported for failed runs, but not for
+        runs with missing time files, even if they also failed, as their
+        sums would be partial. MaxRSS is the peak over the time files
+        that exist.
+    """
+    columns = ['Dataset', 'Algorithm', 'Status', 'CPUTime', 'SystemTime',
+               'WallClock', 'MaxRSS', 'Trajectories']
+    rows = []
+    for (dataset, algorithm), runRows in telemetry.groupby(['Dataset', 'Algorithm'], sort = False):
+        statuses = set(runRows['Status'])
+        status = 'failed' if 'failed' in statuses else \
+                 'missing' if 'missing' in statuses else 'ok'
+
+        def total(column):
+            # Totals over some of the trajectories are not reported, but the
+            # times of failed runs are, e.g., to find the memory they ran out of
+            if 'missing' in statuses or column not in runRows:
+                return np.nan
+            return runRows[column].sum(min_count = 1)
+
+        rows.append([dataset, algorithm, status, total('UserTime'), total('SystemTime'),
+                     total('WallClock'),
+                     runRows['MaxRSS'].max() if 'MaxRSS' in runRows else np.nan,
+                     len(runRows)])
+    return pd.DataFrame(rows, columns = columns)
+
+
+def parseTimeFile(path):
+    """
+    Parses all the fields of the output of GNU time -v.
+
+    :param path: Path to the time.txt file, or timex.txt file where x corresponds to the trajectory ID for a given algorithm-dataset combination.
+    :type path: str
+
+    :returns:
+        None if the file does not exist, and a dictionary of the fields
+        otherwise, named as in TimeFields. Fields of unknown names are
+        kept under their own names. The elapsed wall clock time is
+        converted to seconds, and the percent of CPU to a number. If
+        the command failed, ExitStatus is its non-zero exit status, or
+        the number of the signal that terminated it, negated.
+    """
+    try:
+        with open(path, "r") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return None
+
+    fields = {}
+    for line in lines:
+        line = line.strip()
+        if line.startswith('Command exited with non-zero status'):
+            fields['ExitStatus'] = int(line.split()[-1])
+            continue
+        if line.startswith('Command terminated by signal'):
+            fields['ExitStatus'] = -int(line.split()[-1])
             continue
+        label, sep, value = line.partition(': ')
+        if not sep:
+            continue
+        name = TimeFields.get(label, label)
+        value = value.strip()
+        if name == 'Command':
+            fields[name] = value.strip('"')
+        elif name == 'WallClock':
+            fields[name] = parseWallClock(value)
+        else:
+            try:
+                fields[name] = float(value.rstrip('%'))
+            except ValueError:
+                fields[name] = value
+    return fields
 
-        # If time files do exist, add it to the dictionary
-        algo_dict[algo[0]] = time
 
-    return algo_dict
+def parseWallClock(value):
+    """
+    Converts an elapsed time of GNU time, h:mm:ss or m:ss.ss, to seconds.
+
+    :param value: The elapsed time
+    :type value: str
+
+    :returns:
+        A float value corresponding to the time in seconds, or None if it cannot be parsed.
+    """
+    seconds = 0.0
+    try:
+        for part in value.split(':'):
+            seconds = 60*seconds + float(part)
+    except ValueError:
+        return None
+    return seconds
+
 
 def parse_time_files(path):
     """
@@ -119,20 +263,16 @@ def parse_time_files(path):
         A float value corresponding to the time taken.
          
     """
-    try:
-        with open(path, "r") as f:
-            lines = f.readlines()
-            line = lines[1]
-            time_val = float(line.split()[-1])
-            
+    fields = parseTimeFile(path)
+
     # If file is not found, return -1.
-    except FileNotFoundError:
+    if fields is None:
         print("Time output " +path+" file not found, setting time value to -1\n")
-        time_val = -1
-        
-    # If file is present but the file is empty, return -1.
-    except ValueError:
+        return -1
+
+    # If the algorithm failed, or the file is empty, return -1.
+    if fields.get('UserTime') is None or fields.get('ExitStatus', 0) != 0:
         print("Algorithm running failed, setting time value to -1\n")
-        time_val = -1
+        return -1
 
-    return time_val
+    return fields['UserTime']
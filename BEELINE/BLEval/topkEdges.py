@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from BLEval.edgeIndex import getGeneIndex, getEdgeIds
+from BLRun.rankedEdges import findRankedEdges
+
+
+def getTopkEdges(cache, trueEdgesPath, rankedEdgesPath, TFEdges = False, sign = None):
+    '''
+    Returns the predicted top-k network of an algorithm on a dataset,
+    where k is the number of edges in the reference network (excluding
+    self loops). The network is extracted once per reference network,
+    predictions and options, and shared by all the metrics evaluated
+    with the same cache.
+
+    :param cache:   A cache of parsed input files.
+    :type cache: :class:`BLEval.dataCache.DataCache`
+
+    :param trueEdgesPath:   Path to the reference network, typically refNetwork.csv
+    :type trueEdgesPath: str
+
+    :param rankedEdgesPath:   Path to the predictions, typically rankedEdges.csv
+    :type rankedEdgesPath: str
+
+    :param TFEdges:   Whether to consider only edges going out of TFs in the reference network (TFEdges = True).
+    :type TFEdges: bool
+
+    :param sign:   If '+' or '-', consider only edges of this sign, as in :func:`computeTopkEdges`.
+    :type sign: str
+
+    :returns:
+            - genes: An array of gene names, starting with the genes of the reference network as returned by :func:`BLEval.edgeIndex.getGeneIndex`, followed by the other predicted genes
+            - edges: An integer array with one row (Gene1 id, Gene2 id) per top-k edge
+    '''
+    # The version of the predictions that is read, e.g. rankedEdges.feather,
+    # is the one whose changes invalidate the cached network
+    rankedEdgesPath = findRankedEdges(rankedEdgesPath) or rankedEdgesPath
+    return cache.getDerived(computeTopkEdges, (trueEdgesPath, rankedEdgesPath),
+                            TFEdges, sign)
+
+
+def computeTopkEdges(cache, trueEdgesPath, rankedEdgesPath, TFEdges = False, sign = None):
+    '''
+    Extracts the predicted top-k network in a single pass over the edge
+    weights. Self loops and duplicate rows are ignored, the absolute
+    weights are rounded to 6 decimals, and the top-k network contains
+    every edge whose weight is at least that of the top-kth edge, or the
+    smallest non-zero weight if it is larger. The top-kth weight is found
+    with :func:`numpy.partition`, so the predictions need not be sorted.
+
+    :param cache:   A cache of parsed input files.
+    :type cache: :class:`BLEval.dataCache.DataCache`
+
+    :param trueEdgesPath:   Path to the reference network, typically refNetwork.csv
+    :type trueEdgesPath: str
+
+    :param rankedEdgesPath:   Path to the predictions, typically rankedEdges.csv
+    :type rankedEdgesPath: str
+
+    :param TFEdges:   Whether to consider only edges going out of TFs in the reference network (TFEdges = True). Then, k is the number of distinct reference rows, as in :func:`BLEval.computeEarlyPrec.EarlyPrec`.
+    :type TFEdges: bool
+
+    :param sign:   If '+' or '-', k is the number of reference edges of this sign, and only edges between reference genes that are not reference edges of the other sign are considered. The sign of a reference edge is the Type of its first row.
+    :type sign: str
+
+    :returns:
+            - genes: An array of gene names, starting with the genes of the reference network, followed by the other predicted genes
+            - edges: An integer array with one row (Gene1 id, Gene2 id) per top-k edge
+    '''
+    trueEdgesDF = cache.getTrueEdges(trueEdgesPath)
+    predDF = cache.getRankedEdges(rankedEdgesPath)
+
+    # Genes in the reference network have the smallest ids,
+    # so that predicted edges between them are easy to select
+    refGenes = getGeneIndex(trueEdgesDF)
+    predGenes = np.unique(predDF.loc[:,['Gene1','Gene2']])
+    genes = np.concatenate((refGenes, np.setdiff1d(predGenes, refGenes)))
+    numRefGenes = len(refGenes)
+    numGenes = len(genes)
+
+    refSrc, refDst = getEdgeIds(trueEdgesDF, genes)
+    isRefEdge = refSrc != refDst
+    refEdgeIds = refSrc*numGenes + refDst
+
+    src, dst = getEdgeIds(predDF, genes)
+    keep = (src != dst) & ~predDF.duplicated(keep = 'first').values
+
+    if TFEdges:
+        # Consider only edges from TFs to genes in the
+        # reference network, ignoring self loops
+        numEdges = int((~trueEdgesDF.loc[isRefEdge].duplicated(keep = 'first')).sum())
+        isTF = np.zeros(numGenes, dtype = bool)
+        isTF[refSrc[isRefEdge]] = True
+        isNode = isTF.copy()
+        isNode[refDst[isRefEdge]] = True
+        keep &= isTF[src] & isNode[dst]
+
+    elif sign is not None:
+        # Remove incorrect sign from consideration
+        _, firstIdx = np.unique(refEdgeIds, return_index = True)
+        firstIdx = firstIdx[isRefEdge[firstIdx]]
+        hasSign = trueEdgesDF['Type'].values[firstIdx] == sign
+        numEdges = int(hasSign.sum())
+        keep &= (src < numRefGenes) & (dst < numRefGenes)
+        keep &= ~np.isin(src*numGenes + dst, refEdgeIds[firstIdx[~hasSign]])
+
+    else:
+        numEdges = len(np.unique(refEdgeIds[isRefEdge]))
+
+    src = src[keep]
+    dst = dst[keep]
+    weights = np.abs(np.round(predDF.EdgeWeight.values[keep].astype(np.float64), 6))
+
+    # we want to ensure that we do not include
+    # edges without any edge weight
+    # so check if the non-zero minimum is
+    # greater than the edge weight of the top-kth
+    # node, else use the non-zero minimum value.
+    nonZero = weights[weights > 0]
+    if len(nonZero) == 0:
+        isTopk = np.zeros(len(weights), dtype = bool)
+    else:
+        # Use num True edges or the number of
+        # edges in the dataframe, which ever is lower.
+        # If there are no true edges, use the last edge,
+        # as in a list sorted by decreasing weight.
+        maxk = min(len(weights), numEdges)
+        rank = maxk - 1 if maxk > 0 else len(weights) - 1
+        kth = len(weights) - 1 - rank
+        edgeWeightTopk = np.partition(weights, kth)[kth]
+
+        bestVal = max(nonZero.min(), edgeWeightTopk)
+        isTopk = weights >= bestVal
+
+    edges = np.column_stack((src[isTopk], dst[isTopk]))
+    return genes, edges
+
+
+def getTopkMatrix(topkNetworks):
+    '''
+    Encodes top-k networks as the rows of a sparse boolean matrix,
+    with one column per distinct edge across all the networks.
+    Networks extracted with different gene indices are aligned on
+    the sorted union of their genes.
+
+    :param topkNetworks:   A list of (genes, edges) tuples, as returned by :func:`getTopkEdges`.
+    :type topkNetworks: list
+
+    :returns:
+        A :class:`scipy.sparse.csr_matrix` with one row per network,
+        where entry (i, j) is 1 if edge j is in the i-th network.
+    '''
+    if len(topkNetworks) == 0:
+        return sparse.csr_matrix((0, 0), dtype = np.int32)
+
+    allGenes = np.unique(np.concatenate([genes for genes, _ in topkNetworks]))
+    numGenes = len(allGenes)
+
+    rows = []
+    edgeIds = []
+    for row, (genes, edges) in enumerate(topkNetworks):
+        geneIds = np.searchsorted(allGenes, genes).astype(np.int64)
+        ids = np.unique(geneIds[edges[:,0]]*numGenes + geneIds[edges[:,1]])
+        rows.append(np.full(len(ids), row, dtype = np.int64))
+        edgeIds.append(ids)
+
+    rows = np.concatenate(rows)
+    uniqueIds, cols = np.unique(np.concatenate(edgeIds), return_inverse = True)
+    return sparse.csr_matrix((np.ones(len(rows), dtype = np.int32), (rows, cols)),
+                             shape = (len(topkNetworks), len(uniqueIds)))
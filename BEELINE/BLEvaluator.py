@@ -62,6 +62,10 @@ def get_parser() -> argparse.ArgumentParser:
 
     parser.add_argument('-b','--borda', action="store_true", default=False,
       help="Compute edge ranked list using the various Borda aggregatio methods.")
+
+    parser.add_argument('--workers', type=int, default=1,
+      help="Number of worker processes used to evaluate dataset-algorithm "
+      "combinations in parallel.\n")
         
     return parser
 
@@ -85,11 +89,22 @@ def main():
         evalConfig = ev.ConfigParser.parse(conf)
         
     print('\nPost-run evaluation started...')
-    evalSummarizer = ev.BLEval(evalConfig.input_settings, evalConfig.output_settings)
+    evalSummarizer = ev.BLEval(evalConfig.input_settings, evalConfig.output_settings,
+                               workers = opts.workers)
     
     outDir = str(evalSummarizer.output_settings.base_dir) + \
             str(evalSummarizer.input_settings.datadir).split("inputs")[1] + "/"+\
             str(evalSummarizer.output_settings.output_prefix) + "-"
+
+    # Parameters of each algorithm, identifying the
+    # combinations of parameter sweeps in the results
+    evalSummarizer.getParams().to_csv(outDir + 'Params.csv')
+
+    # Runs that failed, as recorded by BLRunner.py
+    failures = evalSummarizer.getFailures()
+    failures.to_csv(outDir + 'Failures.csv', index = False)
+    if len(failures) > 0:
+        print('%d run(s) failed, see %sFailures.csv' % (len(failures), outDir))
     
     # Compute and plot ROC, PRC and report median AUROC, AUPRC    
     if (opts.auc):
@@ -119,6 +134,12 @@ def main():
 
         TimeDict = evalSummarizer.parseTime()
         pd.DataFrame(TimeDict).to_csv(outDir+'Times.csv')
+
+        # All the fields of the time files, per trajectory, and
+        # the CPU time, wall clock time and peak memory of each run
+        telemetry = evalSummarizer.parseTelemetry()
+        telemetry.to_csv(outDir+'Telemetry.csv', index = False)
+        evalSummarizer.summarizeTime(telemetry).to_csv(outDir+'TimesDetailed.csv', index = False)
     
     # Compute early precision
     if (opts.epr):
@@ -11,6 +11,7 @@ import pandas as pd
 import networkx as nx
 from tqdm import tqdm
 import multiprocessing
+from glob import glob
 from pathlib import Path
 import concurrent.futures
 from itertools import permutations
@@ -50,6 +51,10 @@ def get_parser() -> argparse.ArgumentParser:
     parser.add_argument('-v', '--overview', action="store_true", default=False,
       help="Generate plot of AUPRC and early precision ratios relative to a random predictor.\n")
     
+    parser.add_argument('-u', '--usage', action="store_true", default=False,
+      help="Generate line plots of the CPU usage and memory of each algorithm over time, "
+           "from the samples written by BLRunner.py --sample.\n")
+
     parser.add_argument('-o', '--output', default='.',
       help="Output directory for generated plots.\n")
 
@@ -125,6 +130,57 @@ def boxplot(opts, evalConfigs, datasets, randValue, resTypeFile, resTypeName):
     print("Boxplot saved to " + file)
     plt.savefig(file, dpi = 300)
 
+def usageplot(opts, evalConfigs):
+    '''
+    Plots the CPU usage and memory over time of each algorithm, with one
+    line per dataset and trajectory, from the resources*.csv files
+    written next to the time files by BLRunner.py --sample.
+    '''
+    # Set plot variables
+    plt.rcParams.update({'font.size': 14})
+
+    DFs = []
+    for evalConfig in evalConfigs:
+        outDir = str(evalConfig.output_settings.base_dir) + \
+                 str(evalConfig.input_settings.datadir).split("inputs")[1] + '/'
+        for dataset in evalConfig.input_settings.datasets:
+            for algo in evalConfig.input_settings.algorithms:
+                for path in sorted(glob(outDir + dataset['name'] + '/' + algo[0] + '/resources*.csv')):
+                    DF = pd.read_csv(path, header = 0)
+                    DF['Algorithm'] = algo[0]
+                    # resources<trajectory>.csv
+                    trajectory = os.path.basename(path)[len('resources'):-len('.csv')]
+                    DF['Run'] = dataset['name'] + (' ' + trajectory if trajectory else '')
+                    DFs.append(DF)
+
+    if len(DFs) == 0:
+        print("No resource samples found, run BLRunner.py with --sample first.")
+        return
+    samplesDF = pd.concat(DFs)
+    algos = list(pd.unique(samplesDF['Algorithm']))
+
+    # One row of plots per algorithm, CPU usage on the left and memory on the right
+    f, axes = plt.subplots(len(algos), 2, figsize = (14, 4*len(algos)), squeeze = False)
+    for i, algo in enumerate(algos):
+        algoDF = samplesDF[samplesDF['Algorithm'] == algo]
+        for run, runDF in algoDF.groupby('Run', sort = False):
+            axes[i, 0].plot(runDF['Time'], runDF['CPUPercent'], label = run)
+            axes[i, 1].plot(runDF['Time'], runDF['Memory']/1024., label = run)
+        axes[i, 0].set_ylabel('CPU (%)', fontsize = 18)
+        axes[i, 1].set_ylabel('Memory (MB)', fontsize = 18)
+        axes[i, 0].set_title('CPU usage of ' + algo, fontsize = 18)
+        axes[i, 1].set_title('Memory of ' + algo, fontsize = 18)
+        if algoDF['Run'].nunique() <= 10:
+            axes[i, 1].legend(fontsize = 10)
+    axes[-1, 0].set_xlabel('Time (s)', fontsize = 18)
+    axes[-1, 1].set_xlabel('Time (s)', fontsize = 18)
+    plt.tight_layout()
+
+    file = opts.output + '/' \
+            + '-'.join([str(c.output_settings.output_prefix) for c in evalConfigs]) + '-usage.pdf'
+    print("Usage plot saved to " + file)
+    plt.savefig(file)
+
 def COplot(inputDF, width = 12, height = 7, randValues = [], shape = [], 
             palettes = [], levels = [], rotation = [], switch = []):
 
@@ -432,6 +488,11 @@ def main():
         print('\n\nGenerating Early Precision boxplot...')
         boxplot(opts, evalConfigs, datasets, randPredictor[dataset], 'EPr', 'Early Precision')
 
+    # Generate CPU usage and memory plots
+    if (opts.usage):
+        print('\n\nGenerating usage plots...')
+        usageplot(opts, evalConfigs)
+
     # Generate overview plot     
     if (opts.overview):
         print('\n\nGenerating overview plot...')
@@ -29,7 +29,10 @@ import multiprocessing
 from multiprocessing import Pool, cpu_count
 import concurrent.futures
 from typing import Dict, List
-from BLRun.runner import Runner
+from BLRun.outputNames import getOutputNames
+from BLRun.scheduler import JobScheduler
+from BLRun.executors import Executors
+from BLRun.rankedEdges import hasArrow
 import os
 import pandas as pd
 
@@ -69,14 +72,18 @@ class BLRun(object):
         self.runners: Dict[int, Runner] = self.__create_runners()
 
 
-    def __create_runners(self) -> Dict[int, List[Runner]]:
+    def __create_runners(self) -> Dict[int, List['Runner']]:
         '''
         Instantiate the set of runners based on parameters provided via the
         configuration file. Each runner is supplied an interactome, collection,
         the set of algorithms to be run, and graphspace credentials, in
         addition to the custom parameters each runner may or may not define.
         '''
-        
+        # Imported here, so that BLEval can import the modules of BLRun
+        # it shares, e.g., BLRun.outputNames, without importing the
+        # runners of all the algorithms
+        from BLRun.runner import Runner
+
         runners: Dict[int, Runner] = defaultdict(list)
         order = 0
         for dataset in self.input_settings.datasets:
@@ -88,6 +95,9 @@ class BLRun(object):
                 data['exprData'] = dataset['exprData']
                 data['cellData'] = dataset['cellData']
                 data['trueEdges'] = dataset['trueEdges']
+                data['resources'] = runner[2]
+                data['outputName'] = runner[3]
+                data['policy'] = runner[4]
 
                 if 'should_run' in data['params'] and \
                         data['params']['should_run'] is False:
@@ -99,29 +109,61 @@ class BLRun(object):
         return runners
 
 
-    def execute_runners(self, parallel=False, num_threads=1):
-        '''
-        Run each of the algorithms
+    def execute_runners(self, cores=None, memory=None, force=False, executor='docker',
+                        sampleInterval=None, edgeFormats=None):
         '''
+        Run each of the algorithms. Each runner generates its inputs,
+        runs its algorithm and parses its outputs independently of the
+        others, and the algorithms are run concurrently within a budget
+        of cores and memory, see :class:`BLRun.scheduler.JobScheduler`.
+        Runs whose inputs, parameters and Docker image did not change
+        since they last completed are skipped, and their outputs are
+        restored from a cache under the output directory, see
+        :class:`BLRun.resultCache.ResultCache`.
+
+        :param cores: Number of cores available to the containers. Defaults to the number of cores of the machine.
+        :type cores: float
+
+        :param memory: Memory available to the containers in GB. Defaults to the physical memory of the machine.
+        :type memory: float
+
+        :param force: Whether to run all the algorithms again, even if their outputs are in the cache.
+        :type force: bool
 
-        base_output_dir = self.output_settings.base_dir
-
-        batches =  self.runners.keys()
-
-        for batch in batches:
-            if parallel==True:
-                executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
-                futures = [executor.submit(runner.run, base_output_dir)
-                    for runner in self.runners[batch]]
-                
-                # https://stackoverflow.com/questions/35711160/detect-failed-tasks-in-concurrent-futures
-                # Re-raise exception if produced
-                for future in concurrent.futures.as_completed(futures):
-                    future.result()
-                executor.shutdown(wait=True)
-            else:
-                for runner in self.runners[batch]:
-                    runner.run(output_dir=base_output_dir)
+        :param executor: How the containers are run: 'docker' starts a new container for every command, 'warm' keeps worker containers for later commands, 'local' runs the commands on the host, and 'native' runs the Python algorithms in a local process pool, see :mod:`BLRun.executors`.
+        :type executor: str
+
+        :param sampleInterval: If set, the CPU and memory usage of each command is sampled every sampleInterval seconds, and written next to its time file, e.g. to resources.csv for time.txt, see :mod:`BLRun.sampler`.
+        :type sampleInterval: float
+
+        :param edgeFormats: Formats in which the ranked edges of each run are written, among 'csv', 'feather' and 'parquet'. Defaults to a rankedEdges.csv file and a rankedEdges.feather file, which is read instead of it by BLEval if pyarrow is installed, see :mod:`BLRun.rankedEdges`.
+        :type edgeFormats: list
+
+        :returns:
+            A list of the records of the runs that failed, which are also written
+            to failure.json in their output folders, see :func:`BLRun.runner.Runner.writeFailure`
+        '''
+        from BLRun.resultCache import ResultCache
+
+        runners = [self.runners[idx] for idx in range(len(self.runners))]
+        cache = ResultCache(Path(self.output_settings.base_dir, '.cache'), force=force)
+        containerExecutor = Executors[executor](sampleInterval=sampleInterval)
+        if edgeFormats is not None and set(edgeFormats) != {'csv'} and not hasArrow():
+            print("pyarrow is not installed, writing the ranked edges to rankedEdges.csv only")
+            edgeFormats = ['csv']
+        for runner in runners:
+            runner.executor = containerExecutor
+            if edgeFormats is not None:
+                runner.edgeFormats = edgeFormats
+        try:
+            failures = JobScheduler(cores, memory, cache=cache).run(runners)
+        finally:
+            containerExecutor.close()
+
+        for failure in failures:
+            print("Failed: %s on %s (%s: %s)" % (failure['outputName'], failure['inputDir'],
+                                                 failure['error'], failure['message']))
+        return failures
                     
                     
 class ConfigParser(object):
@@ -178,8 +220,11 @@ class ConfigParser(object):
                     for val in itertools.product(
                         *(algorithm['params'][param]
                             for param in algorithm['params']))]
-                for combo in combos:
-                    algorithms.append([algorithm['name'],combo])
+                outputNames = getOutputNames(algorithm['name'], combos)
+                for combo, outputName in zip(combos, outputNames):
+                    algorithms.append([algorithm['name'],combo,
+                                       algorithm.get('resources'),outputName,
+                                       algorithm.get('policy')])
             
 
         return algorithms
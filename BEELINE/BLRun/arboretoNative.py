@@ -0,0 +1,133 @@
+import os
+import importlib
+import numpy as np
+from BLRun.rankedEdges import writeRankedEdges
+from BLRun.expressionStore import getExpressionStore
+
+# Names of the functions of arboreto.algo, by algorithm
+AlgoMapper = {'GENIE3':'genie3',
+              'GRNBOOST2':'grnboost2'}
+
+# Parameters of the runners that set the Dask cluster
+ClusterParams = ['workers', 'threads', 'memoryLimit', 'scheduler']
+
+
+def runNative(RunnerObj, algorithm):
+    '''
+    Function to run GENIE3 or GRNBOOST2 in-process with the executor of
+    the runner, see :class:`BLRun.executors.NativeExecutor`. The
+    expression data is memory-mapped from its store, see
+    :mod:`BLRun.expressionStore`, and the ranked edges are written directly.
+
+    :param RunnerObj: An instance of the :class:`BLRun`
+
+    :param algorithm: Name of the algorithm, GENIE3 or GRNBOOST2
+    :type algorithm: str
+    '''
+    # make output dirs if they do not exist:
+    outDir = RunnerObj.getOutputDir()
+    os.makedirs(outDir, exist_ok = True)
+
+    cluster = getClusterParams(RunnerObj)
+    # The store of the expression data is passed by path, and mapped by
+    # the process of the pool, which also starts the Dask cluster, if any
+    network = RunnerObj.executor.call(inferNetwork,
+                                      (algorithm, getExpressionStore(RunnerObj), cluster),
+                                      outDir + 'time.txt',
+                                      timeout = RunnerObj.getTimeout())
+    writeRankedEdges(network, outDir + 'rankedEdges.csv',
+                     columns = ['TF','target','importance'],
+                     formats = RunnerObj.edgeFormats)
+
+
+def getClusterParams(RunnerObj):
+    '''
+    Function to get the settings of the Dask cluster of GENIE3 or
+    GRNBOOST2 from the parameters of the runner: the number of worker
+    processes of a local cluster (workers, 0 by default to learn the
+    trees in threads of a single process), the number of threads of each
+    worker (threads), the memory limit of each worker (memoryLimit, e.g.,
+    4GB), and the address of a running Dask scheduler to use instead
+    (scheduler). Unless they are set, the threads and memory of the
+    workers are the cores and memory of the runner, shared among the workers.
+
+    :param RunnerObj: An instance of the :class:`BLRun`
+
+    :returns:
+        A dictionary with the keys workers, threads, memoryLimit and scheduler
+    '''
+    workers = int(RunnerObj.params.get('workers', 0))
+    threads = RunnerObj.params.get('threads')
+    memoryLimit = RunnerObj.params.get('memoryLimit')
+    if threads is None:
+        threads = max(1, int(RunnerObj.resources['cpus']) // max(1, workers))
+    if memoryLimit is None and workers > 0:
+        memoryLimit = '%dMB' % (1024*RunnerObj.resources['memory'] / workers)
+    return {'workers': workers, 'threads': int(threads),
+            'memoryLimit': memoryLimit, 'scheduler': RunnerObj.params.get('scheduler')}
+
+
+def getClusterOptions(RunnerObj):
+    '''
+    Function to get the options of runArboreto.py that
+    set the Dask cluster, see :func:`getClusterParams`. The options
+    are only set if one of the parameters of the cluster is, as the
+    runArboreto.py of the published grnbeeline/arboreto:base image
+    does not know them, and its default is to learn the trees in
+    threads of a single process, on all the cores.
+
+    :param RunnerObj: An instance of the :class:`BLRun`
+
+    :returns:
+        A list of command line options, empty if no parameter of the cluster is set
+    '''
+    if not any(param in RunnerObj.params for param in ClusterParams):
+        return []
+    cluster = getClusterParams(RunnerObj)
+    options = ['--workers='+str(cluster['workers']), '--threads='+str(cluster['threads'])]
+    if cluster['memoryLimit'] is not None:
+        options.append('--memoryLimit='+str(cluster['memoryLimit']))
+    if cluster['scheduler']:
+        options.append('--scheduler='+str(cluster['scheduler']))
+    return options
+
+
+def inferNetwork(algorithm, store, cluster):
+    '''
+    Function to infer a network with GENIE3 or GRNBOOST2, as in
+    runArboreto.py, with a Dask cluster set by :func:`getClusterParams`.
+
+    :param algorithm: Name of the algorithm, GENIE3 or GRNBOOST2
+    :type algorithm: str
+
+    :param store: The store of the expression data
+    :type store: :class:`BLRun.expressionStore.ExpressionStore`
+
+    :param cluster: Settings of the Dask cluster, as returned by :func:`getClusterParams`
+    :type cluster: dict
+
+    :returns:
+        A DataFrame with the columns TF, target and importance
+    '''
+    # Imported here, as arboreto is only needed on the host
+    # when the algorithm is not run in its container
+    infer = getattr(importlib.import_module('arboreto.algo'), AlgoMapper[algorithm])
+    from distributed import Client, LocalCluster
+
+    if cluster['scheduler']:
+        client = Client(cluster['scheduler'])
+    elif cluster['workers'] > 0:
+        client = Client(LocalCluster(n_workers = cluster['workers'],
+                                     threads_per_worker = cluster['threads'],
+                                     memory_limit = cluster['memoryLimit'] or 'auto',
+                                     processes = True))
+    else:
+        client = Client(processes = False, n_workers = 1, threads_per_worker = cluster['threads'])
+    try:
+        # arboreto expects a cells x genes array
+        return infer(np.array(store.values.T), client_or_address = client,
+                     gene_names = list(store.genes))
+    finally:
+        if cluster['workers'] > 0 and not cluster['scheduler']:
+            client.cluster.close()
+        client.close()
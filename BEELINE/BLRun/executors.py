@@ -0,0 +1,461 @@
+import os
+import time
+import uuid
+import signal
+import resource
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+from pathlib import Path
+from collections import defaultdict
+from BLRun.sampler import ResourceSampler, DockerStatsProbe, ProcessProbe, getSamplesPath
+
+
+class DockerExecutor(object):
+    '''
+    Runs each command in a new container, which is
+    removed once the command exits.
+
+    :param sampleInterval: If set, the CPU and memory usage of each container is sampled every sampleInterval seconds, see :class:`BLRun.sampler.ResourceSampler`.
+    :type sampleInterval: float
+    '''
+
+    def __init__(self, sampleInterval = None) -> None:
+        self.sampleInterval = sampleInterval
+
+    def run(self, runner, image, mountDir, command, options = '', samplesFile = None, timeout = None):
+        '''
+        Runs a shell command in a container of an image.
+
+        :param runner: The runner issuing the command, whose resources limit the container.
+        :type runner: :class:`BLRun.runner.Runner`
+
+        :param image: Name of the Docker image
+        :type image: str
+
+        :param mountDir: Folder of the container in which the current working directory is mounted.
+        :type mountDir: str
+
+        :param command: The shell command, which may contain escaped double quotes.
+        :type command: str
+
+        :param options: Additional options of docker run.
+        :type options: str
+
+        :param samplesFile: Path of the file to write the samples of the usage of the command to, if they are sampled.
+        :type samplesFile: str
+
+        :param timeout: Time in seconds after which the container is removed, and :class:`subprocess.TimeoutExpired` is raised. Not limited if None.
+        :type timeout: float
+
+        :returns:
+            The exit status of the command
+        '''
+        # Name the container, so that its usage can be sampled
+        name = 'beeline-' + uuid.uuid4().hex[:12]
+        cmdToRun = ' '.join(['docker run --rm --name', name, runner.dockerLimits(), options,
+                             '--entrypoint /bin/sh -v', str(Path.cwd())+':'+mountDir,
+                             image, '-c \"' + command + '\"'])
+        print(cmdToRun)
+        return callSampled(cmdToRun, lambda process: DockerStatsProbe(name),
+                           samplesFile, self.sampleInterval, timeout,
+                           lambda process: removeContainers([name]))
+
+    def close(self):
+        '''
+        Releases the resources of the executor.
+        '''
+        pass
+
+
+class WarmDockerExecutor(object):
+    '''
+    Runs the commands in long-lived worker containers, with docker exec,
+    so that the containers are not started again for every command.
+    A worker runs one command at a time: commands issued concurrently
+    for the same image start more workers, which are then kept idle
+    for later commands. The workers are removed by :func:`close`.
+    Since files written outside the mounted folder persist from one
+    command to the next, commands should only write to the mounted
+    folder, or overwrite their own files.
+
+    :param sampleInterval: If set, the CPU and memory usage of the worker running each command is sampled every sampleInterval seconds.
+    :type sampleInterval: float
+    '''
+
+    def __init__(self, sampleInterval = None) -> None:
+        self.sampleInterval = sampleInterval
+        self.__lock = threading.Lock()
+        self.__idle = defaultdict(list)
+        self.__workers = []
+
+    def run(self, runner, image, mountDir, command, options = '', samplesFile = None, timeout = None):
+        '''
+        Runs a shell command in an idle worker of an image, or in
+        a new worker if none is idle. See :func:`DockerExecutor.run`.
+        '''
+        # Workers are limited to the resources of their first runner,
+        # so they are only shared by runners with the same limits
+        key = (image, mountDir, options, runner.dockerLimits())
+        with self.__lock:
+            name = self.__idle[key].pop() if self.__idle[key] else None
+        if name is None:
+            name = self.__startWorker(*key)
+
+        cmdToRun = ' '.join(['docker exec', name, '/bin/sh -c \"' + command + '\"'])
+        print(cmdToRun)
+        try:
+            return callSampled(cmdToRun, lambda process: DockerStatsProbe(name),
+                               samplesFile, self.sampleInterval, timeout,
+                               lambda process: self.__removeWorker(name))
+        except subprocess.TimeoutExpired:
+            # The command was stopped with its worker
+            name = None
+            raise
+        finally:
+            if name is not None:
+                with self.__lock:
+                    self.__idle[key].append(name)
+
+    def close(self):
+        '''
+        Removes all the workers.
+        '''
+        with self.__lock:
+            workers = self.__workers
+            self.__workers = []
+            self.__idle.clear()
+        removeContainers(workers)
+
+    def __removeWorker(self, name):
+        '''
+        Removes a worker, e.g., to stop a command that timed out,
+        since stopping docker exec does not stop the command.
+        '''
+        with self.__lock:
+            if name in self.__workers:
+                self.__workers.remove(name)
+        removeContainers([name])
+
+    def __startWorker(self, image, mountDir, options, limits):
+        '''
+        Starts a worker container that waits for commands.
+        '''
+        name = 'beeline-' + uuid.uuid4().hex[:12]
+        cmdToRun = ' '.join(['docker run -d --rm --name', name, limits, options,
+                             '--entrypoint /bin/sh -v', str(Path.cwd())+':'+mountDir,
+                             image, '-c \"while true; do sleep 3600; done\"'])
+        print(cmdToRun)
+        subprocess.check_call(cmdToRun, shell = True, stdout = subprocess.DEVNULL)
+        with self.__lock:
+            self.__workers.append(name)
+        return name
+
+
+class LocalExecutor(object):
+    '''
+    A stand-in for Docker, which runs the commands on the host, e.g., to
+    test the pipeline with mock algorithms, or on hosts where the
+    algorithms are installed. Each command runs in a temporary folder,
+    in which the data folder links to the current working directory,
+    as in the containers. The programs called by the commands must be
+    found from this folder, e.g., on the PATH.
+
+    :param sampleInterval: If set, the CPU and memory usage of the processes of each command is sampled every sampleInterval seconds, from /proc.
+    :type sampleInterval: float
+    '''
+
+    def __init__(self, sampleInterval = None) -> None:
+        self.sampleInterval = sampleInterval
+
+    def run(self, runner, image, mountDir, command, options = '', samplesFile = None, timeout = None):
+        '''
+        Runs a shell command on the host. See :func:`DockerExecutor.run`.
+        '''
+        with tempfile.TemporaryDirectory() as workDir:
+            os.symlink(str(Path.cwd()), os.path.join(workDir, 'data'))
+            cmdToRun = '/bin/sh -c \"' + command + '\"'
+            print(cmdToRun)
+            # The command runs in a session of its own, so
+            # that all its processes can be killed on timeout
+            return callSampled(cmdToRun, lambda process: ProcessProbe(process.pid),
+                               samplesFile, self.sampleInterval, timeout,
+                               lambda process: os.killpg(process.pid, signal.SIGKILL),
+                               cwd = workDir, start_new_session = True)
+
+    def close(self):
+        '''
+        Releases the resources of the executor.
+        '''
+        pass
+
+
+def removeContainers(names):
+    '''
+    Removes Docker containers, stopping them if they are running.
+
+    :param names: Names of the containers
+    :type names: list
+    '''
+    if names:
+        subprocess.call(['docker', 'rm', '-f'] + list(names),
+                        stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+
+
+def callSampled(cmdToRun, probe, samplesFile, sampleInterval, timeout = None, kill = None, **kwargs):
+    '''
+    Runs a shell command, and samples its usage while it runs if
+    both samplesFile and sampleInterval are set.
+
+    :param cmdToRun: The shell command
+    :type cmdToRun: str
+
+    :param probe: A function returning the probe of the usage of the process of the command, see :class:`BLRun.sampler.ResourceSampler`.
+    :type probe: function
+
+    :param samplesFile: Path of the file of samples
+    :type samplesFile: str
+
+    :param sampleInterval: Time between two samples in seconds
+    :type sampleInterval: float
+
+    :param timeout: Time in seconds after which the command is killed, and :class:`subprocess.TimeoutExpired` is raised. Not limited if None.
+    :type timeout: float
+
+    :param kill: A function that kills the process of the command, and everything it started. Defaults to killing the process.
+    :type kill: function
+
+    :param kwargs: Keyword arguments passed to :class:`subprocess.Popen`.
+
+    :returns:
+        The exit status of the command
+    '''
+    process = subprocess.Popen(cmdToRun, shell = True, **kwargs)
+    sampler = None
+    if samplesFile is not None and sampleInterval:
+        sampler = ResourceSampler(samplesFile, probe(process), sampleInterval)
+        sampler.start()
+    try:
+        return process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        print("Stopping the command after %g seconds: %s" % (timeout, cmdToRun))
+        (kill or (lambda process: process.kill()))(process)
+        process.wait()
+        raise
+    finally:
+        if sampler is not None:
+            sampler.stop()
+
+
+class NativeExecutor(object):
+    '''
+    Runs the algorithms that are implemented in Python, i.e., those with a
+    native implementation in NativeMapper of :mod:`BLRun.runner`, in a
+    local process pool instead of a container. Their inputs are mapped
+    from the store of the expression data, see :mod:`BLRun.expressionStore`,
+    and their outputs returned as DataFrames, so that neither the inputs
+    nor the outputs are written to text files and parsed again. The Python packages of the algorithms must be installed
+    on the host. The commands of the other algorithms are run with a
+    fallback executor.
+
+    :param processes: Maximum number of processes of the pool. Defaults to the number of cores. If 0, the algorithms are run in the threads of the scheduler, in the current process.
+    :type processes: int
+
+    :param fallback: The executor of the commands of the other algorithms. Defaults to a :class:`DockerExecutor`.
+    :type fallback: object
+
+    :param sampleInterval: If set, the CPU and memory usage of the process of each call is sampled every sampleInterval seconds, from /proc. Calls run in the current process, if processes is 0, are not sampled.
+    :type sampleInterval: float
+    '''
+
+    native = True
+
+    def __init__(self, processes = None, fallback = None, sampleInterval = None) -> None:
+        self.processes = processes
+        self.sampleInterval = sampleInterval
+        self.fallback = fallback if fallback is not None else DockerExecutor(sampleInterval)
+        self.__slots = threading.BoundedSemaphore(processes or multiprocessing.cpu_count())
+        self.__context = multiprocessing.get_context('spawn')
+
+    def run(self, runner, image, mountDir, command, options = '', samplesFile = None, timeout = None):
+        '''
+        Runs a shell command with the fallback executor.
+        See :func:`DockerExecutor.run`.
+        '''
+        return self.fallback.run(runner, image, mountDir, command, options, samplesFile, timeout)
+
+    def call(self, func, args, timeFile, timeout = None):
+        '''
+        Calls a function in a process of the pool, and writes the time
+        it took to a file, in the format of the output of time -v. If
+        sampled, the usage of the process is written next to the time
+        file, e.g. to resources.csv for time.txt, unless the function
+        is called in the current process. The process is not
+        daemonic, so that the function can start processes of its own,
+        e.g., the workers of a local Dask cluster, and it leads a process
+        group of its own, so that these processes are killed with it.
+
+        :param func: The function, defined at the top level of a module.
+        :type func: function
+
+        :param args: The arguments of the function, which must be picklable.
+        :type args: tuple
+
+        :param timeFile: Path of the time file
+        :type timeFile: str
+
+        :param timeout: Time in seconds after which the process and its descendants are killed, and :class:`subprocess.TimeoutExpired` is raised. Not limited if None, or if the function is called in the current process, i.e., if the pool has 0 processes.
+        :type timeout: float
+
+        :returns:
+            The value returned by the function
+        '''
+        samplesFile = getSamplesPath(timeFile) if self.sampleInterval else None
+        if self.processes == 0:
+            # The usage of the current process is that of the whole
+            # pipeline, e.g., of the other algorithms running
+            # concurrently, so it is not sampled
+            return timeCall(func, args, timeFile)
+
+        # A new process is started for every call, so that its peak
+        # memory is that of the call, so that it does not inherit the
+        # threads of the scheduler, and so that it can be killed
+        with self.__slots:
+            receiver, sender = self.__context.Pipe(duplex = False)
+            process = self.__context.Process(target = sendCall, daemon = False,
+                                             args = (sender, func, args, timeFile,
+                                                     samplesFile, self.sampleInterval))
+            process.start()
+            sender.close()
+            try:
+                if not receiver.poll(timeout):
+                    print("Stopping %s.%s after %g seconds" % (func.__module__, func.__name__, timeout))
+                    killProcessGroup(process.pid)
+                    # in case the process did not start its group yet
+                    process.kill()
+                    raise subprocess.TimeoutExpired(func.__module__ + '.' + func.__name__, timeout)
+                try:
+                    succeeded, result = receiver.recv()
+                except EOFError:
+                    # The process died without sending its result, e.g., killed
+                    # by the kernel for running out of memory
+                    succeeded, result = False, RuntimeError('%s.%s exited unexpectedly' %
+                                                            (func.__module__, func.__name__))
+            finally:
+                receiver.close()
+                process.join()
+        if not succeeded:
+            raise result
+        return result
+
+    def close(self):
+        '''
+        Closes the fallback executor.
+        '''
+        self.fallback.close()
+
+
+def sendCall(sender, func, args, timeFile, samplesFile = None, sampleInterval = None):
+    '''
+    Calls a function with :func:`timeCall`, and sends a pair of whether
+    it succeeded and of its value or exception through a connection.
+    The calling process first starts a process group of its own, which
+    the processes it starts join, see :func:`killProcessGroup`.
+    '''
+    os.setpgrp()
+    try:
+        result = (True, timeCall(func, args, timeFile, samplesFile, sampleInterval))
+    except Exception as e:
+        result = (False, e)
+    try:
+        sender.send(result)
+    except Exception as e:
+        # e.g., an exception that cannot be pickled
+        sender.send((False, RuntimeError(repr(result[1]))))
+    sender.close()
+
+
+def killProcessGroup(pid):
+    '''
+    Kills a process started by :func:`sendCall`, and the processes it
+    started, which are in its process group.
+    '''
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def timeCall(func, args, timeFile, samplesFile = None, sampleInterval = None):
+    '''
+    Calls a function and writes the time it took to a file, in the
+    format of the output of time -v. The CPU time and peak memory are
+    those of the whole process, so they include the other threads of
+    the process if the function is not called in a process of its own.
+    The CPU time of the child processes that the function waited for,
+    e.g., the workers of a local Dask cluster, is included.
+    If the function raises an exception, the time file reports a
+    non-zero exit status, and the exception is raised again.
+
+    :param func: The function to call
+    :type func: function
+
+    :param args: The arguments of the function
+    :type args: tuple
+
+    :param timeFile: Path of the time file
+    :type timeFile: str
+
+    :param samplesFile: If set, the usage of the process and its descendants is sampled to this file while the function runs. It should only be set if the function is called in a process of its own, see :func:`sendCall`.
+    :type samplesFile: str
+
+    :param sampleInterval: Time between two samples in seconds
+    :type sampleInterval: float
+
+    :returns:
+        The value returned by the function
+    '''
+    sampler = None
+    if samplesFile is not None and sampleInterval:
+        sampler = ResourceSampler(samplesFile, ProcessProbe(os.getpid()), sampleInterval)
+        sampler.start()
+    start = time.time()
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    beforeChildren = resource.getrusage(resource.RUSAGE_CHILDREN)
+    status = 1
+    try:
+        result = func(*args)
+        status = 0
+        return result
+    finally:
+        if sampler is not None:
+            sampler.stop()
+        after = resource.getrusage(resource.RUSAGE_SELF)
+        afterChildren = resource.getrusage(resource.RUSAGE_CHILDREN)
+        elapsed = time.time() - start
+        userTime = after.ru_utime - before.ru_utime + \
+            afterChildren.ru_utime - beforeChildren.ru_utime
+        systemTime = after.ru_stime - before.ru_stime + \
+            afterChildren.ru_stime - beforeChildren.ru_stime
+        if elapsed >= 3600:
+            wallClock = '%d:%02d:%02d' % (elapsed//3600, elapsed%3600//60, elapsed%60)
+        else:
+            wallClock = '%d:%05.2f' % (elapsed//60, elapsed%60)
+        lines = ['Command being timed: "%s.%s"' % (func.__module__, func.__name__),
+                 'User time (seconds): %.2f' % userTime,
+                 'System time (seconds): %.2f' % systemTime,
+                 'Percent of CPU this job got: %d%%' % (100*(userTime + systemTime)/max(elapsed, 0.01)),
+                 'Elapsed (wall clock) time (h:mm:ss or m:ss): ' + wallClock,
+                 'Maximum resident set size (kbytes): %d' % after.ru_maxrss,
+                 'Exit status: %d' % status]
+        if status != 0:
+            lines.insert(0, 'Command exited with non-zero status %d' % status)
+        with open(timeFile, 'w') as outFile:
+            outFile.write(''.join('\t' + line + '\n' for line in lines))
+
+
+Executors = {'docker': DockerExecutor,
+             'warm': WarmDockerExecutor,
+             'local': LocalExecutor,
+             'native': NativeExecutor}
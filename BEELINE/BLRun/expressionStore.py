@@ -0,0 +1,211 @@
+import os
+import json
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+
+# Folder of the stores, under the folder of each dataset
+StoreDir = '.store'
+
+# Stores opened in this process, by the path of their expression data
+_stores = {}
+_storesLock = threading.Lock()
+
+
+class ExpressionStore(object):
+    '''
+    A binary copy of the expression data of a dataset, i.e., its
+    genes x cells matrix in a .npy file, and its gene and cell names in a
+    JSON index next to it. The store is created once per dataset, the
+    first time it is needed, under <inputDir>/.store/, and is created
+    again if the expression data changes. The matrix is memory-mapped,
+    so that the generateInputs functions of all the algorithms share the
+    pages of a single copy of it, and slice it without parsing the text
+    file again.
+
+    A store is pickled as the path of its expression data, and is
+    opened again when unpickled, e.g., by a process of the pool of
+    :class:`BLRun.executors.NativeExecutor`, so that the matrix is never
+    copied between processes.
+
+    :param exprPath: Path of the expression data, e.g., <inputDir>/ExpressionData.csv
+    :type exprPath: str
+    '''
+
+    def __init__(self, exprPath) -> None:
+        self.exprPath = str(exprPath)
+        self.__open()
+
+
+    def __open(self):
+        '''
+        Creates the store if it is missing or older than the expression
+        data, and memory-maps it.
+        '''
+        valuesPath, indexPath = getStorePaths(self.exprPath)
+        index = readIndex(indexPath)
+        if index is None or index['source'] != getSourceStamp(self.exprPath) or \
+                not os.path.exists(valuesPath):
+            index = createStore(self.exprPath)
+        self.stamp = index['source']
+        self.genes = pd.Index(index['genes'])
+        self.cells = pd.Index(index['cells'])
+        self.values = np.load(valuesPath, mmap_mode = 'r')
+
+
+    def __getstate__(self):
+        return {'exprPath': self.exprPath}
+
+
+    def __setstate__(self, state):
+        self.exprPath = state['exprPath']
+        self.__open()
+
+
+    def isStale(self):
+        '''
+        Checks whether the expression data changed since the store was opened.
+        '''
+        return getSourceStamp(self.exprPath) != self.stamp
+
+
+    def getFrame(self):
+        '''
+        Returns the expression data, as pd.read_csv(exprPath, header = 0,
+        index_col = 0) would. The matrix is not copied, so the returned
+        DataFrame is read-only, and only the cells or genes selected
+        from it, e.g., with .loc, are copied.
+
+        :returns:
+            A genes x cells DataFrame
+        '''
+        return pd.DataFrame(self.values, index = self.genes, columns = self.cells,
+                            copy = False)
+
+
+def getStorePaths(exprPath):
+    '''
+    Returns the paths of the matrix and of the index of the store of an expression data file.
+
+    :param exprPath: Path of the expression data, e.g., <inputDir>/ExpressionData.csv
+    :type exprPath: str
+
+    :returns:
+        - The path of the matrix, e.g., <inputDir>/.store/ExpressionData.npy
+        - The path of the index, e.g., <inputDir>/.store/ExpressionData.json
+    '''
+    folder, name = os.path.split(str(exprPath))
+    stem = os.path.join(folder, StoreDir, os.path.splitext(name)[0])
+    return stem + '.npy', stem + '.json'
+
+
+def getSourceStamp(exprPath):
+    '''
+    Returns the size and modification time of an expression data file,
+    which identify the version of the file a store was created from.
+    '''
+    stat = os.stat(str(exprPath))
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def readIndex(indexPath):
+    '''
+    Reads the index of a store, or returns None if it is missing or unreadable.
+    '''
+    try:
+        with open(indexPath, 'r') as indexFile:
+            return json.load(indexFile)
+    except (OSError, ValueError):
+        return None
+
+
+def createStore(exprPath):
+    '''
+    Parses an expression data file once, and writes its store. Both files
+    are written to temporary files first, and the index last, so that a
+    partial store is never read.
+
+    :param exprPath: Path of the expression data, e.g., <inputDir>/ExpressionData.csv
+    :type exprPath: str
+
+    :returns:
+        The index of the store, a dictionary with the keys source, genes and cells
+    '''
+    stamp = getSourceStamp(exprPath)
+    ExpressionData = pd.read_csv(exprPath, header = 0, index_col = 0)
+    values = ExpressionData.values
+    if values.dtype == object:
+        raise ValueError(str(exprPath) + ' has non-numeric expression values')
+
+    valuesPath, indexPath = getStorePaths(exprPath)
+    os.makedirs(os.path.dirname(valuesPath), exist_ok = True)
+    index = {'source': stamp,
+             'genes': ExpressionData.index.tolist(),
+             'cells': ExpressionData.columns.tolist()}
+    # The temporary files are unique to the process and thread, as
+    # several runners may create the store of a dataset at once
+    suffix = '.%d.%d.tmp' % (os.getpid(), threading.get_ident())
+    with open(valuesPath + suffix, 'wb') as valuesFile:
+        np.save(valuesFile, np.ascontiguousarray(values))
+    os.replace(valuesPath + suffix, valuesPath)
+    with open(indexPath + suffix, 'w') as indexFile:
+        json.dump(index, indexFile)
+    os.replace(indexPath + suffix, indexPath)
+    return index
+
+
+def getExpressionStore(RunnerObj):
+    '''
+    Returns the store of the expression data of a runner, creating it if
+    needed. Stores are opened once per process, and shared by all the
+    runners of a dataset.
+
+    :param RunnerObj: An instance of the :class:`BLRun`
+
+    :returns:
+        An :class:`ExpressionStore`
+    '''
+    exprPath = str(RunnerObj.inputDir.joinpath(RunnerObj.exprData))
+    with _storesLock:
+        store = _stores.get(exprPath)
+        if store is None or store.isStale():
+            store = ExpressionStore(exprPath)
+            _stores[exprPath] = store
+    return store
+
+
+def getExpressionData(RunnerObj):
+    '''
+    Returns the expression data of a runner from its store, in place of
+    pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.exprData), header = 0, index_col = 0).
+    See :meth:`ExpressionStore.getFrame`.
+
+    :param RunnerObj: An instance of the :class:`BLRun`
+
+    :returns:
+        A genes x cells DataFrame
+    '''
+    return getExpressionStore(RunnerObj).getFrame()
+
+
+def linkExpressionData(RunnerObj, target):
+    '''
+    Provides the expression data of a runner, unchanged, to an algorithm
+    whose container reads it in its original format: the file is hard
+    linked to the target path, or copied if it cannot be linked, e.g.,
+    across file systems.
+
+    :param RunnerObj: An instance of the :class:`BLRun`
+
+    :param target: Path of the file read by the algorithm, e.g., <inputDir>/PPCOR/ExpressionData.csv
+    :type target: str
+    '''
+    source = str(RunnerObj.inputDir.joinpath(RunnerObj.exprData))
+    target = str(target)
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
@@ -2,12 +2,15 @@ import os
 import pandas as pd
 from pathlib import Path
 import numpy as np
+from BLRun.rankedEdges import writeRankedEdges
+from BLRun.expressionStore import getExpressionData
+import BLRun.arboretoNative as arboretoNative
 
 def generateInputs(RunnerObj):
     '''
     Function to generate desired inputs for GENIE3.
-    If the folder/files under RunnerObj.datadir exist, 
-    this function will not do anything.
+    It is only called when the inputs are out of date,
+    see :meth:`BLRun.runner.Runner.generateInputs`.
 
     :param RunnerObj: An instance of the :class:`BLRun`
     '''
@@ -15,14 +18,12 @@ def generateInputs(RunnerObj):
         print("Input folder for GENIE3 does not exist, creating input folder...")
         RunnerObj.inputDir.joinpath("GENIE3").mkdir(exist_ok = False)
         
-    if not RunnerObj.inputDir.joinpath("GENIE3/ExpressionData.csv").exists():
-        # input data
-        ExpressionData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.exprData),
-                                     header = 0, index_col = 0)
+    # input data
+    ExpressionData = getExpressionData(RunnerObj)
 
-        # Write .csv file
-        ExpressionData.T.to_csv(RunnerObj.inputDir.joinpath("GENIE3/ExpressionData.csv"),
-                             sep = '\t', header  = True, index = True)
+    # Write .csv file
+    ExpressionData.T.to_csv(RunnerObj.inputDir.joinpath("GENIE3/ExpressionData.csv"),
+                         sep = '\t', header  = True, index = True)
     
 def run(RunnerObj):
     '''
@@ -33,16 +34,15 @@ def run(RunnerObj):
     inputPath = "data" + str(RunnerObj.inputDir).split(str(Path.cwd()))[1] + \
                     "/GENIE3/ExpressionData.csv"
     # make output dirs if they do not exist:
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/GENIE3/"
+    outDir = RunnerObj.getOutputDir()
     os.makedirs(outDir, exist_ok = True)
     
     outPath = "data/" +  str(outDir) + 'outFile.txt'
-    cmdToRun = ' '.join(['docker run --rm -v', str(Path.cwd())+':/data/ --expose=41269', 
-                         'grnbeeline/arboreto:base /bin/sh -c \"time -v -o', "data/" + str(outDir) + 'time.txt', 'python runArboreto.py --algo=GENIE3',
-                         '--inFile='+inputPath, '--outFile='+outPath, '\"'])
+    cmdToRun = ' '.join(['time -v -o', "data/" + str(outDir) + 'time.txt', 'python runArboreto.py --algo=GENIE3',
+                         '--inFile='+inputPath, '--outFile='+outPath] +
+                        arboretoNative.getClusterOptions(RunnerObj))
 
-    print(cmdToRun)
-    os.system(cmdToRun)
+    RunnerObj.runContainer('/data/', cmdToRun, '--expose=41269')
 
 
 
@@ -53,20 +53,23 @@ def parseOutput(RunnerObj):
     :param RunnerObj: An instance of the :class:`BLRun`
     '''
     # Quit if output directory does not exist
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/GENIE3/"
-
-        
-    # Read output
-    OutDF = pd.read_csv(outDir+'outFile.txt', sep = '\t', header = 0)
-    
+    outDir = RunnerObj.getOutputDir()
     if not Path(outDir+'outFile.txt').exists():
         print(outDir+'outFile.txt'+'does not exist, skipping...')
         return
-    
-    outFile = open(outDir + 'rankedEdges.csv','w')
-    outFile.write('Gene1'+'\t'+'Gene2'+'\t'+'EdgeWeight'+'\n')
 
-    for idx, row in OutDF.iterrows():
-        outFile.write('\t'.join([row['TF'],row['target'],str(row['importance'])])+'\n')
-    outFile.close()
-    
+    # Read output
+    OutDF = pd.read_csv(outDir+'outFile.txt', sep = '\t', header = 0)
+    writeRankedEdges(OutDF, outDir + 'rankedEdges.csv',
+                     columns = ['TF','target','importance'],
+                     formats = RunnerObj.edgeFormats)
+
+
+def runNative(RunnerObj):
+    '''
+    Function to run GENIE3 in-process with the executor of the runner,
+    see :func:`BLRun.arboretoNative.runNative`.
+
+    :param RunnerObj: An instance of the :class:`BLRun`
+    '''
+    arboretoNative.runNative(RunnerObj, 'GENIE3')
@@ -2,19 +2,20 @@ import os
 import pandas as pd
 from pathlib import Path
 import numpy as np
+from BLRun.rankedEdges import writeRankedEdges, rankMatrix, EdgeMerger
+from BLRun.expressionStore import getExpressionData
 
 def generateInputs(RunnerObj):
     '''
     Function to generate desired inputs for GRISLI.
-    If the folder/files under RunnerObj.datadir exist, 
-    this function will not do anything.
+    It is only called when the inputs are out of date,
+    see :meth:`BLRun.runner.Runner.generateInputs`.
     '''
     if not RunnerObj.inputDir.joinpath("GRISLI").exists():
         print("Input folder for GRISLI does not exist, creating input folder...")
         RunnerObj.inputDir.joinpath("GRISLI").mkdir(exist_ok = False)
             
-    ExpressionData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.exprData),
-                                     header = 0, index_col = 0)
+    ExpressionData = getExpressionData(RunnerObj)
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
                              header = 0, index_col = 0)
 
@@ -47,7 +48,7 @@ def run(RunnerObj):
     alphaMin = str(RunnerObj.params['alphaMin'])
     
     # make output dirs if they do not exist:
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/GRISLI/"
+    outDir = RunnerObj.getOutputDir()
     os.makedirs(outDir, exist_ok = True)
     
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
@@ -60,10 +61,9 @@ def run(RunnerObj):
 
         outFile = "data/" +  str(outDir) +str(idx)+"/outFile.txt"
 
-        cmdToRun = ' '.join(['docker run --rm -v', str(Path.cwd())+':/runGRISLI/data/ grnbeeline/grisli:base /bin/sh -c \"time -v -o', "data/" + str(outDir) + 'time'+str(idx)+'.txt', './GRISLI ',inputPath, outFile, L, R, alphaMin,'\"'])
+        cmdToRun = ' '.join(['time -v -o', "data/" + str(outDir) + 'time'+str(idx)+'.txt', './GRISLI ',inputPath, outFile, L, R, alphaMin])
     
-        print(cmdToRun)
-        os.system(cmdToRun)
+        RunnerObj.runContainer('/runGRISLI/data/', cmdToRun)
 
 
 
@@ -72,13 +72,17 @@ def parseOutput(RunnerObj):
     Function to parse outputs from GRISLI.
     '''
     
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/GRISLI/"
+    outDir = RunnerObj.getOutputDir()
 
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
                              header = 0, index_col = 0)
     colNames = PTData.columns
-    OutSubDF = [0]*len(colNames)
-    
+    # read input file for list of gene names
+    ExpressionData = getExpressionData(RunnerObj)
+    GeneList = list(ExpressionData.index)
+    # Merge the trajectories by taking the maximum weight of each edge
+    merger = EdgeMerger(GeneList)
+
     for indx in range(len(colNames)):
         # Read output
         outFile = str(indx)+'/outFile.txt'
@@ -87,34 +91,11 @@ def parseOutput(RunnerObj):
             print(outDir+outFile+' does not exist, skipping...')
             return
         OutDF = pd.read_csv(outDir+outFile, sep = ',', header = None)    
-        # Sort values in a matrix using code from:
-        # https://stackoverflow.com/questions/21922806/sort-values-of-matrix-in-python
-        OutMatrix = OutDF.values
-        idx = np.argsort(OutMatrix, axis = None)
-        rows, cols = np.unravel_index(idx, OutDF.shape)    
-        DFSorted = OutMatrix[rows, cols]
+        # GRISLI outputs the rank of each edge, 1 being the best,
+        # which is turned into a decreasing weight
+        weights = len(GeneList)*len(GeneList) - OutDF.values
+        writeRankedEdges(rankMatrix(weights, GeneList), outDir + str(indx)+ '/rankedEdges.csv')
+        merger.addMatrix(np.abs(weights))
 
-        # read input file for list of gene names
-        ExpressionData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.exprData),
-                                         header = 0, index_col = 0)
-        GeneList = list(ExpressionData.index)
-        outFileName = outDir + str(indx)+ '/rankedEdges.csv'
-        outFile = open(outFileName,'w')
-        outFile.write('Gene1'+'\t'+'Gene2'+'\t'+'EdgeWeight'+'\n')
-
-        for row, col, val in zip(rows, cols, DFSorted):
-            outFile.write('\t'.join([GeneList[row],GeneList[col],str((len(GeneList)*len(GeneList))-val)])+'\n')
-        outFile.close()
-        
-        OutSubDF[indx] = pd.read_csv(outFileName, sep = '\t', header = 0)
-
-        # megre the dataframe by taking the maximum value from each DF
-        # From here: https://stackoverflow.com/questions/20383647/pandas-selecting-by-label-sometimes-return-series-sometimes-returns-dataframe
-    outDF = pd.concat(OutSubDF)
-
-    res = outDF.groupby(['Gene1','Gene2'],as_index=False).max()
-    #print(res.head())
-    # Sort values in the dataframe   
-    finalDF = res.sort_values('EdgeWeight',ascending=False)  
-    
-    finalDF.to_csv(outDir+'rankedEdges.csv',sep='\t', index = False)
+    writeRankedEdges(merger.getRankedEdges(), outDir + 'rankedEdges.csv',
+                     formats = RunnerObj.edgeFormats)
@@ -2,24 +2,25 @@ import os
 import pandas as pd
 from pathlib import Path
 import numpy as np
+from BLRun.rankedEdges import writeRankedEdges
+from BLRun.expressionStore import getExpressionData
+import BLRun.arboretoNative as arboretoNative
 
 def generateInputs(RunnerObj):
     '''
     Function to generate desired inputs for GRNBoost2.
-    If the folder/files under RunnerObj.datadir exist, 
-    this function will not do anything.
+    It is only called when the inputs are out of date,
+    see :meth:`BLRun.runner.Runner.generateInputs`.
     '''
     if not RunnerObj.inputDir.joinpath("GRNBOOST2").exists():
         print("Input folder for GRNBOOST2 does not exist, creating input folder...")
         RunnerObj.inputDir.joinpath("GRNBOOST2").mkdir(exist_ok = False)
         
-    if not RunnerObj.inputDir.joinpath("GRNBOOST2/ExpressionData.csv").exists():
-        ExpressionData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.exprData),
-                                     header = 0, index_col = 0)
+    ExpressionData = getExpressionData(RunnerObj)
 
-        # Write .csv file
-        ExpressionData.T.to_csv(RunnerObj.inputDir.joinpath("GRNBOOST2/ExpressionData.csv"),
-                             sep = '\t', header  = True, index = True)
+    # Write .csv file
+    ExpressionData.T.to_csv(RunnerObj.inputDir.joinpath("GRNBOOST2/ExpressionData.csv"),
+                         sep = '\t', header  = True, index = True)
     
 def run(RunnerObj):
     '''
@@ -28,17 +29,16 @@ def run(RunnerObj):
     inputPath = "data" + str(RunnerObj.inputDir).split(str(Path.cwd()))[1] + \
                     "/GRNBOOST2/ExpressionData.csv"
     # make output dirs if they do not exist:
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/GRNBOOST2/"
+    outDir = RunnerObj.getOutputDir()
     os.makedirs(outDir, exist_ok = True)
 
     
     outPath = "data/" +  str(outDir) + 'outFile.txt'
-    cmdToRun = ' '.join(['docker run --rm -v', str(Path.cwd())+':/data/ --expose=41269', 
-                         'grnbeeline/arboreto:base /bin/sh -c \"time -v -o', "data/" + str(outDir) + 'time.txt', 
+    cmdToRun = ' '.join(['time -v -o', "data/" + str(outDir) + 'time.txt', 
                          'python runArboreto.py --algo=GRNBoost2',
-                         '--inFile='+inputPath, '--outFile='+outPath, '\"'])
-    print(cmdToRun)
-    os.system(cmdToRun)
+                         '--inFile='+inputPath, '--outFile='+outPath] +
+                        arboretoNative.getClusterOptions(RunnerObj))
+    RunnerObj.runContainer('/data/', cmdToRun, '--expose=41269')
 
 
 def parseOutput(RunnerObj):
@@ -46,7 +46,7 @@ def parseOutput(RunnerObj):
     Function to parse outputs from GRNBOOST2.
     '''
     # Quit if output directory does not exist
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/GRNBOOST2/"
+    outDir = RunnerObj.getOutputDir()
     
     if not Path(outDir+'outFile.txt').exists():
         print(outDir+'outFile.txt'+'does not exist, skipping...')
@@ -54,10 +54,16 @@ def parseOutput(RunnerObj):
     # Read output
     OutDF = pd.read_csv(outDir+'outFile.txt', sep = '\t', header = 0)
     
-    outFile = open(outDir + 'rankedEdges.csv','w')
-    outFile.write('Gene1'+'\t'+'Gene2'+'\t'+'EdgeWeight'+'\n')
+    writeRankedEdges(OutDF, outDir + 'rankedEdges.csv',
+                     columns = ['TF','target','importance'],
+                     formats = RunnerObj.edgeFormats)
 
-    for idx, row in OutDF.iterrows():
-        outFile.write('\t'.join([row['TF'],row['target'],str(row['importance'])])+'\n')
-    outFile.close()
-    
+
+def runNative(RunnerObj):
+    '''
+    Function to run GRNBOOST2 in-process with the executor of the runner,
+    see :func:`BLRun.arboretoNative.runNative`.
+
+    :param RunnerObj: An instance of the :class:`BLRun`
+    '''
+    arboretoNative.runNative(RunnerObj, 'GRNBOOST2')
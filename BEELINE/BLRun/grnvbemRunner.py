@@ -2,6 +2,8 @@ import os
 import pandas as pd
 from pathlib import Path
 import numpy as np
+from BLRun.rankedEdges import writeRankedEdges, EdgeMerger
+from BLRun.expressionStore import getExpressionData
 
 def generateInputs(RunnerObj):
     '''
@@ -16,8 +18,7 @@ def generateInputs(RunnerObj):
         print("Input folder for GRNVBEM does not exist, creating input folder...")
         RunnerObj.inputDir.joinpath("GRNVBEM").mkdir(exist_ok = False)
         
-    ExpressionData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.exprData),
-                                     header = 0, index_col = 0)
+    ExpressionData = getExpressionData(RunnerObj)
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
                              header = 0, index_col = 0)
 
@@ -48,7 +49,7 @@ def run(RunnerObj):
     
     inputPath = "data" + str(RunnerObj.inputDir).split(str(Path.cwd()))[1]
     # make output dirs if they do not exist:
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/GRNVBEM/"
+    outDir = RunnerObj.getOutputDir()
     os.makedirs(outDir, exist_ok = True)
     
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
@@ -59,12 +60,10 @@ def run(RunnerObj):
         exprName = "/GRNVBEM/ExpressionData"+str(idx)+".csv"
         outPath = 'data/' +  str(outDir) + 'outFile'+str(idx)+'.txt'
 
-        cmdToRun = ' '.join(['docker run --rm -v', 
-                             str(Path.cwd())+':/VBEM/data/ grnbeeline/grnvbem:base /bin/sh -c \"time -v -o', 
+        cmdToRun = ' '.join(['time -v -o', 
                              "data/" + str(outDir) + 'time'+str(idx)+'.txt', 
-                             './GRNVBEM', inputPath+exprName, outPath, '\"'])
-        print(cmdToRun)
-        os.system(cmdToRun)
+                             './GRNVBEM', inputPath+exprName, outPath])
+        RunnerObj.runContainer('/VBEM/data/', cmdToRun)
 
 
 
@@ -72,14 +71,14 @@ def parseOutput(RunnerObj):
     '''
     Function to parse outputs from GRNVBEM.
     '''
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/GRNVBEM/"
+    outDir = RunnerObj.getOutputDir()
 
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
                              header = 0, index_col = 0)
 
     colNames = PTData.columns
-    OutSubDF = [0]*len(colNames)
-
+    # Merge the trajectories by taking the maximum weight of each edge
+    merger = EdgeMerger()
     for indx in range(len(colNames)):
         outFileName = 'outFile'+str(indx)+'.txt'
         # Quit if output file does not exist
@@ -88,15 +87,9 @@ def parseOutput(RunnerObj):
             return
         
         # Read output
-        OutSubDF[indx] = pd.read_csv(outDir+outFileName, sep = '\t', header = 0)
-        
-    outDF = pd.concat(OutSubDF)
-    FinalDF = outDF[outDF['Probability'] == outDF.groupby(['Parent','Child'])['Probability'].transform('max')]
-
-    outFile = open(outDir + 'rankedEdges.csv','w')
-    outFile.write('Gene1'+'\t'+'Gene2'+'\t'+'EdgeWeight'+'\n')
+        OutDF = pd.read_csv(outDir+outFileName, sep = '\t', header = 0)
+        merger.addEdges(OutDF, columns = ['Parent','Child','Probability'])
 
-    for idx, row in FinalDF.sort_values(['Probability'], ascending = False).iterrows():
-        outFile.write('\t'.join([row['Parent'],row['Child'],str(row['Probability'])])+'\n')
-    outFile.close()
+    writeRankedEdges(merger.getRankedEdges(), outDir + 'rankedEdges.csv',
+                     formats = RunnerObj.edgeFormats)
     
@@ -0,0 +1,145 @@
+import os
+import json
+import hashlib
+
+# File in the input folder of an algorithm recording its dependencies
+RecordFile = '.dependencies.json'
+
+
+class InputDependencies(object):
+    '''
+    Tracks the dependencies of the inputs generated for an algorithm, as
+    make does: the files of the dataset they are generated from, and the
+    parameters of the algorithm they depend on. Once the inputs are
+    generated, the size, modification time and SHA-256 digest of each
+    source file, the parameters and the size and modification time of
+    each generated file are recorded to .dependencies.json in the input
+    folder. The inputs are out of date, and must be generated again, if
+    a source file changed, a parameter differs, or a generated file was
+    removed or modified since. A source file whose modification time
+    changed but whose contents did not, e.g., a copy, is not a change.
+
+    The sources are stamped when this object is created, so it should
+    be created before the inputs are generated: a source that changes
+    while they are generated leaves them out of date.
+
+    :param inputFolder: The folder the inputs are generated in, e.g., <inputDir>/SCODE
+    :type inputFolder: str
+
+    :param sources: Paths of the files the inputs are generated from
+    :type sources: list
+
+    :param params: The parameters the inputs depend on, e.g., {'nBins': 10} for SINCERITIES
+    :type params: dict
+    '''
+
+    def __init__(self, inputFolder, sources, params = None) -> None:
+        self.inputFolder = str(inputFolder)
+        self.recordPath = os.path.join(self.inputFolder, RecordFile)
+        self.params = params or {}
+        self.sources = {str(source): getFileStamp(source)
+                        for source in sources if os.path.exists(str(source))}
+
+
+    def isFresh(self):
+        '''
+        Checks whether the inputs are up to date. The record is
+        updated if only the modification times of the sources changed.
+
+        :returns:
+            True if the inputs need not be generated again
+        '''
+        record = self.__read()
+        if record is None or record['params'] != json.loads(json.dumps(self.params, default = str)):
+            return False
+        if sorted(record['sources']) != sorted(self.sources):
+            return False
+        for path, stamp in record['targets'].items():
+            fullPath = os.path.join(self.inputFolder, path)
+            if not os.path.exists(fullPath) or getFileStamp(fullPath) != stamp:
+                return False
+
+        touched = False
+        for path, stamp in self.sources.items():
+            recorded = record['sources'][path]
+            if stamp == recorded['stamp']:
+                continue
+            if stamp[0] != recorded['stamp'][0] or getFileHash(path) != recorded['sha256']:
+                return False
+            recorded['stamp'] = stamp
+            touched = True
+        if touched:
+            self.__write(record)
+        return True
+
+
+    def clear(self):
+        '''
+        Removes the record and the files generated with it, which
+        are out of date, before the inputs are generated again.
+        '''
+        record = self.__read()
+        if os.path.exists(self.recordPath):
+            os.remove(self.recordPath)
+        if record is None:
+            return
+        for path in record['targets']:
+            fullPath = os.path.join(self.inputFolder, path)
+            if os.path.isfile(fullPath):
+                os.remove(fullPath)
+
+
+    def record(self):
+        '''
+        Records the dependencies of the inputs, and the files in the
+        input folder, once the inputs are generated.
+        '''
+        targets = {}
+        for folder, _, fileNames in os.walk(self.inputFolder):
+            for fileName in fileNames:
+                fullPath = os.path.join(folder, fileName)
+                if fullPath != self.recordPath:
+                    targets[os.path.relpath(fullPath, self.inputFolder)] = getFileStamp(fullPath)
+        self.__write({'sources': {path: {'stamp': stamp, 'sha256': getFileHash(path)}
+                                  for path, stamp in self.sources.items()},
+                      'params': self.params,
+                      'targets': targets})
+
+
+    def __read(self):
+        '''
+        Reads the record, or returns None if it is missing or unreadable.
+        '''
+        try:
+            with open(self.recordPath, 'r') as recordFile:
+                return json.load(recordFile)
+        except (OSError, ValueError):
+            return None
+
+
+    def __write(self, record):
+        '''
+        Writes the record to a temporary file first, so that a partial record is never read.
+        '''
+        with open(self.recordPath + '.tmp', 'w') as recordFile:
+            json.dump(record, recordFile, sort_keys = True, indent = 2, default = str)
+        os.replace(self.recordPath + '.tmp', self.recordPath)
+
+
+def getFileStamp(path):
+    '''
+    Returns the size and modification time of a file, in nanoseconds.
+    '''
+    stat = os.stat(str(path))
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def getFileHash(path):
+    '''
+    Returns the SHA-256 digest of the contents of a file.
+    '''
+    digest = hashlib.sha256()
+    with open(str(path), 'rb') as inFile:
+        for block in iter(lambda: inFile.read(2**20), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -2,18 +2,19 @@ import os
 import pandas as pd
 from pathlib import Path
 import numpy as np
+from BLRun.rankedEdges import writeRankedEdges, EdgeMerger
+from BLRun.expressionStore import getExpressionData
 
 def generateInputs(RunnerObj):
     '''
-    If the folder/files under RunnerObj.datadir exist, 
-    this function will not do anything.
+    It is only called when the inputs are out of date,
+    see :meth:`BLRun.runner.Runner.generateInputs`.
     '''
     if not RunnerObj.inputDir.joinpath("LEAP").exists():
         print("Input folder for LEAP does not exist, creating input folder...")
         RunnerObj.inputDir.joinpath("LEAP").mkdir(exist_ok = False)
         
-    ExpressionData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.exprData),
-                                     header = 0, index_col = 0)
+    ExpressionData = getExpressionData(RunnerObj)
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
                              header = 0, index_col = 0)
 
@@ -49,7 +50,7 @@ def run(RunnerObj):
     maxLag = str(RunnerObj.params['maxLag'])
     
     # make output dirs if they do not exist:
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/LEAP/"
+    outDir = RunnerObj.getOutputDir()
     os.makedirs(outDir, exist_ok = True)
     
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
@@ -61,12 +62,10 @@ def run(RunnerObj):
         outPath = 'data/' +  str(outDir) + 'outFile'+str(idx)+'.txt'
 
        
-        cmdToRun = ' '.join(['docker run --rm -v', 
-                             str(Path.cwd())+':/data/ grnbeeline/leap:base /bin/sh -c \"time -v -o', 
+        cmdToRun = ' '.join(['time -v -o', 
                              'data/' + str(outDir) + 'time'+str(idx)+'.txt', 'Rscript runLeap.R',
-                             inputPath+exprName, maxLag, outPath, '\"'])
-        print(cmdToRun)
-        os.system(cmdToRun)
+                             inputPath+exprName, maxLag, outPath])
+        RunnerObj.runContainer('/data/', cmdToRun)
 
 
 
@@ -74,14 +73,14 @@ def parseOutput(RunnerObj):
     '''
     Function to parse outputs from LEAP.
     '''
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/LEAP/"
+    outDir = RunnerObj.getOutputDir()
 
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
                              header = 0, index_col = 0)
 
     colNames = PTData.columns
-    OutSubDF = [0]*len(colNames)
-
+    # Merge the trajectories by taking the maximum weight of each edge
+    merger = EdgeMerger()
     for indx in range(len(colNames)):
         outFileName = 'outFile'+str(indx)+'.txt'
         # Quit if output file does not exist
@@ -90,15 +89,10 @@ def parseOutput(RunnerObj):
             return
         
         # Read output
-        OutSubDF[indx] = pd.read_csv(outDir+outFileName, sep = '\t', header = 0)
-        OutSubDF[indx].Score = np.abs(OutSubDF[indx].Score)
-    outDF = pd.concat(OutSubDF)
-    FinalDF = outDF[outDF['Score'] == outDF.groupby(['Gene1','Gene2'])['Score'].transform('max')]
-
-    outFile = open(outDir + 'rankedEdges.csv','w')
-    outFile.write('Gene1'+'\t'+'Gene2'+'\t'+'EdgeWeight'+'\n')
+        OutDF = pd.read_csv(outDir+outFileName, sep = '\t', header = 0)
+        OutDF.Score = np.abs(OutDF.Score)
+        merger.addEdges(OutDF, columns = ['Gene1','Gene2','Score'])
 
-    for idx, row in FinalDF.sort_values(['Score'], ascending = False).iterrows():
-        outFile.write('\t'.join([row['Gene1'],row['Gene2'],str(row['Score'])])+'\n')
-    outFile.close()
+    writeRankedEdges(merger.getRankedEdges(), outDir + 'rankedEdges.csv',
+                     formats = RunnerObj.edgeFormats)
     
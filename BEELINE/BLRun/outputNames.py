@@ -0,0 +1,41 @@
+import json
+import hashlib
+
+
+def getParamsHash(params):
+    '''
+    Returns a short hash of a combination of parameters, which does
+    not depend on the order of the parameters nor on should_run.
+
+    :param params: A combination of parameters of an algorithm.
+    :type params: dict
+
+    :returns:
+        A string of 10 hexadecimal digits
+    '''
+    params = {param: val for param, val in params.items() if param != 'should_run'}
+    return hashlib.sha1(json.dumps(params, sort_keys = True,
+                                   default = str).encode()).hexdigest()[:10]
+
+
+def getOutputNames(name, combos):
+    '''
+    Returns the path of the output folder of each combination of
+    parameters of an algorithm, relative to the output folder of a
+    dataset. An algorithm run with a single combination of parameters
+    writes to <name>/, and the combinations of a parameter sweep
+    write to <name>/<hash of the parameters>/.
+
+    :param name: Name of the algorithm
+    :type name: str
+
+    :param combos: The combinations of parameters of the algorithm.
+    :type combos: list
+
+    :returns:
+        A list with the path of each combination
+    '''
+    hashes = [getParamsHash(combo) for combo in combos]
+    if len(set(hashes)) <= 1:
+        return [name]*len(combos)
+    return [name + '/' + paramsHash for paramsHash in hashes]
@@ -2,22 +2,22 @@ import os
 import pandas as pd
 from pathlib import Path
 import numpy as np
+from BLRun.rankedEdges import writeRankedEdges
+from BLRun.expressionStore import getExpressionData
 
 def generateInputs(RunnerObj):
     '''
     Function to generate desired inputs for SCODE.
-    If the folder/files under RunnerObj.datadir exist, 
-    this function will not do anything.
+    It is only called when the inputs are out of date,
+    see :meth:`BLRun.runner.Runner.generateInputs`.
     '''
     if not RunnerObj.inputDir.joinpath("PIDC").exists():
         print("Input folder for PIDC does not exist, creating input folder...")
         RunnerObj.inputDir.joinpath("PIDC").mkdir(exist_ok = False)
         
-    if not RunnerObj.inputDir.joinpath("PIDC/ExpressionData.csv").exists():
-        ExpressionData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.exprData),
-                                     header = 0, index_col = 0)
-        ExpressionData.to_csv(RunnerObj.inputDir.joinpath("PIDC/ExpressionData.csv"),
-                             sep = '\t', header  = True, index = True)
+    ExpressionData = getExpressionData(RunnerObj)
+    ExpressionData.to_csv(RunnerObj.inputDir.joinpath("PIDC/ExpressionData.csv"),
+                         sep = '\t', header  = True, index = True)
     
 def run(RunnerObj):
     '''
@@ -27,14 +27,13 @@ def run(RunnerObj):
                     "/PIDC/ExpressionData.csv"
     
     # make output dirs if they do not exist:
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/PIDC/"
+    outDir = RunnerObj.getOutputDir()
     os.makedirs(outDir, exist_ok = True)
     
     outPath = 'data/'+ str(outDir) + 'outFile.txt'
-    cmdToRun = ' '.join(['docker run --rm -v', str(Path.cwd())+':/data grnbeeline/pidc:base /bin/sh -c \"time -v -o', "data/" + str(outDir) + 'time.txt', 'julia runPIDC.jl',
-                         inputPath, outPath, '\"'])
-    print(cmdToRun)
-    os.system(cmdToRun)
+    cmdToRun = ' '.join(['time -v -o', "data/" + str(outDir) + 'time.txt', 'julia runPIDC.jl',
+                         inputPath, outPath])
+    RunnerObj.runContainer('/data', cmdToRun)
 
 
 
@@ -43,17 +42,13 @@ def parseOutput(RunnerObj):
     Function to parse outputs from SCODE.
     '''
     # Quit if output directory does not exist
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/PIDC/"
+    outDir = RunnerObj.getOutputDir()
     if not Path(outDir+'outFile.txt').exists():
         print(outDir+'outFile.txt'+'does not exist, skipping...')
         return
         
     # Read output
     OutDF = pd.read_csv(outDir+'outFile.txt', sep = '\t', header = None)
-    outFile = open(outDir + 'rankedEdges.csv','w')
-    outFile.write('Gene1'+'\t'+'Gene2'+'\t'+'EdgeWeight'+'\n')
-
-    for idx, row in OutDF.iterrows():
-        outFile.write('\t'.join([row[0],row[1],str(row[2])])+'\n')
-    outFile.close()
+    writeRankedEdges(OutDF, outDir + 'rankedEdges.csv', columns = [0,1,2],
+                     formats = RunnerObj.edgeFormats)
     
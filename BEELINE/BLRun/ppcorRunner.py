@@ -2,26 +2,22 @@ import os
 import pandas as pd
 from pathlib import Path
 import numpy as np
+from BLRun.rankedEdges import writeRankedEdges
+from BLRun.expressionStore import linkExpressionData
 
 def generateInputs(RunnerObj):
     '''
     Function to generate desired inputs for PPCOR.
-    If the folder/files under RunnerObj.datadir exist, 
-    this function will not do anything.
+    It is only called when the inputs are out of date,
+    see :meth:`BLRun.runner.Runner.generateInputs`.
     '''
     if not RunnerObj.inputDir.joinpath("PPCOR").exists():
         print("Input folder for PPCOR does not exist, creating input folder...")
         RunnerObj.inputDir.joinpath("PPCOR").mkdir(exist_ok = False)
         
-    if not RunnerObj.inputDir.joinpath("PPCOR/ExpressionData.csv").exists():
-        ExpressionData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.exprData),
-                                     header = 0, index_col = 0)
-        
-        newExpressionData = ExpressionData.copy()
-        
-        # Write .csv file
-        newExpressionData.to_csv(RunnerObj.inputDir.joinpath("PPCOR/ExpressionData.csv"),
-                             sep = ',', header  = True, index = True)
+    # PPCOR reads the expression data in its original format,
+    # so the file is linked instead of parsed and written again
+    linkExpressionData(RunnerObj, RunnerObj.inputDir.joinpath("PPCOR/ExpressionData.csv"))
     
 def run(RunnerObj):
     '''
@@ -31,14 +27,13 @@ def run(RunnerObj):
                     "/PPCOR/ExpressionData.csv"
     
     # make output dirs if they do not exist:
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/PPCOR/"
+    outDir = RunnerObj.getOutputDir()
     os.makedirs(outDir, exist_ok = True)
     
     outPath = "data/" +  str(outDir) + 'outFile.txt'
-    cmdToRun = ' '.join(['docker run --rm -v', str(Path.cwd())+':/data/ grnbeeline/ppcor:base /bin/sh -c \"time -v -o', "data/" + str(outDir) + 'time.txt', 'Rscript runPPCOR.R',
-                         inputPath, outPath, '\"'])
-    print(cmdToRun)
-    os.system(cmdToRun)
+    cmdToRun = ' '.join(['time -v -o', "data/" + str(outDir) + 'time.txt', 'Rscript runPPCOR.R',
+                         inputPath, outPath])
+    RunnerObj.runContainer('/data/', cmdToRun)
 
 
 
@@ -47,7 +42,7 @@ def parseOutput(RunnerObj):
     Function to parse outputs from PPCOR.
     '''
     # Quit if output directory does not exist
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/PPCOR/"
+    outDir = RunnerObj.getOutputDir()
     if not Path(outDir+'outFile.txt').exists():
         print(outDir+'outFile.txt'+'does not exist, skipping...')
         return
@@ -57,16 +52,11 @@ def parseOutput(RunnerObj):
     # edges with significant p-value
     part1 = OutDF.loc[OutDF['pValue'] <= float(RunnerObj.params['pVal'])]
     part1 = part1.assign(absCorVal = part1['corVal'].abs())
-    # edges without significant p-value
+    # edges without significant p-value, ranked last with a weight of 0
     part2 = OutDF.loc[OutDF['pValue'] > float(RunnerObj.params['pVal'])]
-    
-    outFile = open(outDir + 'rankedEdges.csv','w')
-    outFile.write('Gene1'+'\t'+'Gene2'+'\t'+'EdgeWeight'+'\n')
+    part2 = part2.assign(corVal = 0.0, absCorVal = -1.0)
 
-    for idx, row in part1.sort_values('absCorVal', ascending = False).iterrows():
-        outFile.write('\t'.join([row['Gene1'],row['Gene2'],str(row['corVal'])])+'\n')
-    
-    for idx, row in part2.iterrows():
-        outFile.write('\t'.join([row['Gene1'],row['Gene2'],str(0)])+'\n')
-    outFile.close()
+    writeRankedEdges(pd.concat([part1, part2]), outDir + 'rankedEdges.csv',
+                     columns = ['Gene1','Gene2','corVal'], sortBy = 'absCorVal',
+                     formats = RunnerObj.edgeFormats)
     
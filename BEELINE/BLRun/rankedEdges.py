@@ -0,0 +1,400 @@
+import os
+import importlib.util
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+
+# Columns of rankedEdges.csv, in order
+RankedEdgesColumns = ['Gene1', 'Gene2', 'EdgeWeight']
+
+# Number of edges formatted and written at a time
+ChunkSize = 1000000
+
+# Formats in which the ranked edges can be written, and the suffixes of
+# their files. The binary formats need pyarrow, and are read in this
+# order of preference, before the tab-separated text file.
+RankedEdgesFormats = OrderedDict([('feather', '.feather'),
+                                  ('parquet', '.parquet'),
+                                  ('csv', '.csv')])
+
+# Formats written by BLRunner.py by default
+DefaultFormats = ['csv', 'feather']
+
+
+def getFloatFormat(precision = None):
+    '''
+    Returns the format of the edge weights in the text file, as the
+    float_format of :meth:`pandas.DataFrame.to_csv`. By default, the
+    weights are formatted in bulk by numpy as their shortest
+    representation that reads back to the same float, which is what
+    repr() writes, so that no ties are introduced in the ranking.
+
+    :param precision: If set, the number of significant digits of the weights, which shortens the file at the cost of precision.
+    :type precision: int
+
+    :returns:
+        None for the shortest representation, or a printf-style format
+    '''
+    if precision is None:
+        return None
+    return '%.' + str(int(precision)) + 'g'
+
+
+def writeRankedEdges(edges, outFile, columns = None, sortBy = None, precision = None,
+                     formats = None):
+    '''
+    Writes a ranked edge list, i.e., a tab-separated file with the
+    columns Gene1, Gene2 and EdgeWeight, one line per edge. The columns
+    are sorted, formatted and written in bulk, a chunk of ChunkSize
+    edges at a time with :meth:`pandas.DataFrame.to_csv`, instead of row by row.
+
+    The same edges can also be written, alongside or instead of the
+    text file, in the binary formats of RankedEdgesFormats, to a file
+    with the same name and the suffix of the format, e.g.,
+    rankedEdges.feather. The gene names are dictionary-encoded, and the
+    weights are kept as 64-bit floats so that the ranking is unchanged.
+    Versions of the file in formats that are not written are removed,
+    so that they are never read in place of the new one.
+
+    :param edges: The edges, in the order they are ranked unless sortBy is set.
+    :type edges: pandas.DataFrame
+
+    :param outFile: Path of the file, usually <outDir>/rankedEdges.csv
+    :type outFile: str
+
+    :param columns: The columns of edges holding the first gene, the second gene and the weight of each edge, in that order. Defaults to Gene1, Gene2 and EdgeWeight.
+    :type columns: list
+
+    :param sortBy: If set, the column of edges by which the edges are ranked, in decreasing order, e.g., the weight or its absolute value. Edges with equal values keep their order.
+    :type sortBy: str
+
+    :param precision: If set, the number of significant digits of the weights in the text file, see :func:`getFloatFormat`.
+    :type precision: int
+
+    :param formats: The formats to write, among the keys of RankedEdgesFormats. Defaults to the text file only. If pyarrow is not installed, the binary formats are skipped, and the text file is written instead.
+    :type formats: list
+    '''
+    if columns is None:
+        columns = RankedEdgesColumns
+    gene1 = edges[columns[0]].values
+    gene2 = edges[columns[1]].values
+    weights = edges[columns[2]].values
+    if sortBy is not None:
+        # A stable sort of the negated keys ranks equal values in the
+        # order of the edges, and NaN keys last
+        order = np.argsort(-edges[sortBy].values.astype(float), kind = 'mergesort')
+        gene1 = gene1[order]
+        gene2 = gene2[order]
+        weights = weights[order]
+
+    formats = list(formats or ['csv'])
+    binaryFormats = [fmt for fmt in formats if fmt != 'csv']
+    if binaryFormats and not hasArrow():
+        print('pyarrow is not installed, writing ' + outFile + ' instead of the ' +
+              ', '.join(binaryFormats) + ' ranked edges')
+        binaryFormats = []
+    writeText = 'csv' in formats or not binaryFormats
+
+    # Remove the versions of the file that are not written
+    for fmt in RankedEdgesFormats:
+        path = getRankedEdgesPath(outFile, fmt)
+        if fmt not in binaryFormats and not (fmt == 'csv' and writeText) and \
+                os.path.exists(path):
+            os.remove(path)
+
+    # The text file is written first, as the binary versions
+    # are only read if they are not older than it
+    if writeText:
+        floatFormat = getFloatFormat(precision)
+        if weights.dtype.kind == 'f':
+            # Formatted as the 64-bit floats they are ranked as
+            weights = weights.astype(np.float64, copy = False)
+        with open(outFile, 'w') as out:
+            out.write('\t'.join(RankedEdgesColumns) + '\n')
+            for start in range(0, len(weights), ChunkSize):
+                end = start + ChunkSize
+                chunk = pd.DataFrame(OrderedDict(zip(RankedEdgesColumns,
+                                                     [gene1[start:end], gene2[start:end],
+                                                      weights[start:end]])))
+                chunk.to_csv(out, sep = '\t', header = False, index = False,
+                             float_format = floatFormat, na_rep = 'nan')
+    if binaryFormats:
+        writeBinaryEdges(gene1, gene2, weights, outFile, binaryFormats)
+
+
+def rankMatrix(matrix, geneNames):
+    '''
+    Ranks the edges of a weighted adjacency matrix by the absolute value
+    of their weights, in decreasing order.
+
+    :param matrix: A genes x genes matrix, where entry (i, j) is the weight of the edge from gene i to gene j
+    :type matrix: numpy.ndarray
+
+    :param geneNames: Names of the genes of the rows and columns of matrix
+    :type geneNames: list
+
+    :returns:
+        A DataFrame with the columns Gene1, Gene2 and EdgeWeight, where the weight is the absolute value of the entry
+    '''
+    absMatrix = np.abs(np.asarray(matrix, dtype = float))
+    order = np.argsort(-absMatrix, axis = None, kind = 'mergesort')
+    rows, cols = np.unravel_index(order, absMatrix.shape)
+    geneNames = np.asarray(geneNames, dtype = object)
+    return pd.DataFrame({'Gene1': geneNames[rows], 'Gene2': geneNames[cols],
+                         'EdgeWeight': absMatrix[rows, cols]},
+                        columns = RankedEdgesColumns)
+
+
+class EdgeMerger(object):
+    '''
+    Merges the edges predicted on several trajectories into a single
+    network, in which the weight of each edge is its maximum weight
+    across the trajectories. The trajectories are folded in one at a
+    time into a running maximum, a dense genes x genes array indexed by
+    the integer id of each edge (gene1 id * number of genes + gene2 id),
+    so that the memory used is that of this array however many
+    trajectories are merged. Ranking the merged edges takes, in
+    addition, a 32-bit id, a weight and a sort index per edge, see
+    :meth:`getRankedEdges`. Edges that are never predicted, or only
+    with missing weights, are left out.
+
+    :param geneNames: Names of the genes, if known, e.g., those of the rows and columns of the matrices passed to :meth:`addMatrix`. Other genes are added as they are found.
+    :type geneNames: list
+    '''
+
+    def __init__(self, geneNames = None) -> None:
+        self.genes = pd.Index([])
+        self.weights = np.empty((0, 0))
+        if geneNames is not None:
+            self.__addGenes(pd.unique(np.asarray(geneNames, dtype = object)))
+
+
+    def addEdges(self, edges, columns = None):
+        '''
+        Folds the edges of a trajectory into the running maximum.
+
+        :param edges: The edges of the trajectory
+        :type edges: pandas.DataFrame
+
+        :param columns: The columns of edges holding the first gene, the second gene and the weight of each edge, in that order. Defaults to Gene1, Gene2 and EdgeWeight.
+        :type columns: list
+        '''
+        if columns is None:
+            columns = RankedEdgesColumns
+        gene1 = np.asarray(edges[columns[0]].values, dtype = object)
+        gene2 = np.asarray(edges[columns[1]].values, dtype = object)
+        weights = edges[columns[2]].values.astype(float)
+
+        allGenes = np.concatenate((gene1, gene2))
+        newGenes = pd.unique(allGenes[self.genes.get_indexer(allGenes) < 0])
+        if len(newGenes) > 0:
+            self.__addGenes(newGenes)
+
+        ids = self.genes.get_indexer(gene1)*len(self.genes) + self.genes.get_indexer(gene2)
+        flat = self.weights.reshape(-1)
+        # np.fmax keeps the weights that are not missing. An edge that is
+        # repeated keeps the last of its weights, so the larger weights of
+        # repeated edges are folded in again, with the slower np.fmax.at
+        flat[ids] = np.fmax(flat[ids], weights)
+        lost = ~np.isnan(weights) & ~(weights <= flat[ids])
+        if lost.any():
+            np.fmax.at(flat, ids[lost], weights[lost])
+
+
+    def addMatrix(self, matrix):
+        '''
+        Folds the edges of a trajectory, given as a weighted adjacency
+        matrix over the genes passed when the merger was created.
+
+        :param matrix: A genes x genes matrix, where entry (i, j) is the weight of the edge from gene i to gene j
+        :type matrix: numpy.ndarray
+        '''
+        matrix = np.asarray(matrix, dtype = float)
+        n = matrix.shape[0]
+        np.fmax(self.weights[:n, :n], matrix, out = self.weights[:n, :n])
+
+
+    def getRankedEdges(self):
+        '''
+        Returns the merged edges, ranked by decreasing weight. Edges
+        with equal weights are ranked by the name of their first gene,
+        and then by that of their second gene, so that the ranking does
+        not depend on the order of the trajectories, nor on the order in
+        which their genes were found.
+
+        :returns:
+            A DataFrame with the columns Gene1, Gene2 and EdgeWeight, with one row per edge
+        '''
+        genes = np.asarray(self.genes, dtype = object)
+        numGenes = len(genes)
+        # The genes in the order of their names, which are
+        # compared as strings as they may not all be strings
+        byName = np.argsort(genes.astype(str), kind = 'mergesort')
+        idType = np.int32 if numGenes*numGenes <= np.iinfo(np.int32).max else np.int64
+
+        # The merged edges are listed one gene at a time, in the order of
+        # the names, so that their ids, the positions of their genes in
+        # that order, are increasing. A stable sort by weight then ranks
+        # edges with equal weights by the names of their genes.
+        numEdges = np.count_nonzero(~np.isnan(self.weights))
+        ids = np.empty(numEdges, dtype = idType)
+        weights = np.empty(numEdges)
+        start = 0
+        for rank, gene in enumerate(byName):
+            row = self.weights[gene, byName]
+            cols = np.flatnonzero(~np.isnan(row))
+            end = start + len(cols)
+            ids[start:end] = cols
+            ids[start:end] += rank*numGenes
+            weights[start:end] = row[cols]
+            start = end
+
+        order = np.argsort(-weights, kind = 'mergesort')
+        weights = weights[order]
+        ids = ids[order]
+        del order
+        genes = genes[byName]
+        return pd.DataFrame({'Gene1': genes[ids // numGenes], 'Gene2': genes[ids % numGenes],
+                             'EdgeWeight': weights},
+                            columns = RankedEdgesColumns)
+
+
+    def __addGenes(self, newGenes):
+        '''
+        Adds genes to the index, and grows the array of weights to match.
+        '''
+        numGenes = len(self.genes)
+        self.genes = self.genes.append(pd.Index(newGenes))
+        weights = np.full((len(self.genes), len(self.genes)), np.nan)
+        weights[:numGenes, :numGenes] = self.weights
+        self.weights = weights
+
+
+def writeBinaryEdges(gene1, gene2, weights, outFile, formats):
+    '''
+    Writes ranked edges in binary formats, see :func:`writeRankedEdges`.
+
+    :param gene1: First gene of each edge, in the order they are ranked
+    :type gene1: numpy.ndarray
+
+    :param gene2: Second gene of each edge
+    :type gene2: numpy.ndarray
+
+    :param weights: Weight of each edge
+    :type weights: numpy.ndarray
+
+    :param outFile: Path of the text file, whose suffix is replaced by that of each format
+    :type outFile: str
+
+    :param formats: The binary formats to write, e.g., ['feather']
+    :type formats: list
+    '''
+    import pyarrow
+
+    # The genes are stored once per file, and referred to by their codes
+    frame = pd.DataFrame({'Gene1': pd.Categorical(gene1), 'Gene2': pd.Categorical(gene2),
+                          'EdgeWeight': np.asarray(weights, dtype = float)},
+                         columns = RankedEdgesColumns)
+    for fmt in formats:
+        path = getRankedEdgesPath(outFile, fmt)
+        # Write to a temporary file first, so that a partial file is never read
+        tmpPath = path + '.tmp'
+        if fmt == 'feather':
+            import pyarrow.feather
+            pyarrow.feather.write_feather(frame, tmpPath)
+        elif fmt == 'parquet':
+            import pyarrow.parquet
+            pyarrow.parquet.write_table(pyarrow.Table.from_pandas(frame, preserve_index = False),
+                                        tmpPath)
+        else:
+            raise ValueError('Unknown ranked edges format: ' + str(fmt))
+        os.replace(tmpPath, path)
+
+
+def hasArrow():
+    '''
+    Checks whether pyarrow, needed by the binary formats, is installed.
+    '''
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def getRankedEdgesPath(path, fmt):
+    '''
+    Returns the path of the version of a ranked edges file in a format.
+
+    :param path: Path of any version of the file, e.g., <outDir>/rankedEdges.csv
+    :type path: str
+
+    :param fmt: A key of RankedEdgesFormats
+    :type fmt: str
+
+    :returns:
+        The path with the suffix of the format, e.g., <outDir>/rankedEdges.feather
+    '''
+    return os.path.splitext(str(path))[0] + RankedEdgesFormats[fmt]
+
+
+def getRankedEdgesFiles(path):
+    '''
+    Returns the paths of the existing versions of a ranked edges file.
+
+    :param path: Path of any version of the file, e.g., <outDir>/rankedEdges.csv
+    :type path: str
+
+    :returns:
+        A list of paths, in the order of RankedEdgesFormats
+    '''
+    return [getRankedEdgesPath(path, fmt) for fmt in RankedEdgesFormats
+            if os.path.exists(getRankedEdgesPath(path, fmt))]
+
+
+def findRankedEdges(path):
+    '''
+    Finds the version of a ranked edges file to read: the first binary
+    version in RankedEdgesFormats that exists and is not older than the
+    text file, if pyarrow is installed, and the text file otherwise.
+
+    :param path: Path of any version of the file, e.g., <outDir>/rankedEdges.csv
+    :type path: str
+
+    :returns:
+        The path of the version to read, or None if no version exists
+    '''
+    textPath = getRankedEdgesPath(path, 'csv')
+    textTime = os.path.getmtime(textPath) if os.path.exists(textPath) else None
+    if hasArrow():
+        for fmt in RankedEdgesFormats:
+            binaryPath = getRankedEdgesPath(path, fmt)
+            if fmt != 'csv' and os.path.exists(binaryPath) and \
+                    (textTime is None or os.path.getmtime(binaryPath) >= textTime):
+                return binaryPath
+    return textPath if textTime is not None else None
+
+
+def readRankedEdges(path):
+    '''
+    Reads a ranked edges file in the format given by its suffix.
+
+    :param path: Path of the file, e.g., <outDir>/rankedEdges.feather
+    :type path: str
+
+    :returns:
+        A DataFrame with the columns Gene1, Gene2 and EdgeWeight, where the genes are strings
+    '''
+    suffix = os.path.splitext(str(path))[1]
+    if suffix == RankedEdgesFormats['feather']:
+        import pyarrow.feather
+        DF = pyarrow.feather.read_feather(str(path))
+    elif suffix == RankedEdgesFormats['parquet']:
+        import pyarrow.parquet
+        DF = pyarrow.parquet.read_table(str(path)).to_pandas()
+    else:
+        return pd.read_csv(path, sep = '\t', header = 0, index_col = None)
+    # The evaluation functions expect the genes as strings, not as the
+    # categories they are stored as, which are looked up by their codes.
+    # Missing genes have the code -1, i.e. the NaN appended last.
+    for column in RankedEdgesColumns[:2]:
+        if hasattr(DF[column], 'cat'):
+            categories = np.append(np.asarray(DF[column].cat.categories, dtype = object), np.nan)
+            DF[column] = categories.take(DF[column].cat.codes.values)
+    return DF
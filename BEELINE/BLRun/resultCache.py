@@ -0,0 +1,157 @@
+import os
+import json
+import glob
+import shutil
+import hashlib
+import subprocess
+from pathlib import Path
+from BLRun.runner import ImageMapper
+from BLRun.rankedEdges import findRankedEdges, getRankedEdgesFiles
+
+
+class ResultCache(object):
+    '''
+    A content-addressed cache of the outputs of the algorithms. A run is
+    identified by a hash of its input files, the name of the algorithm,
+    its parameters and the digest of its Docker image, and the cache
+    stores the ranked edges and time files of every completed run under
+    this hash. A run whose hash is in the cache need not be repeated:
+    its outputs are copied back to the output folder of the runner.
+
+    :param cacheDir: Folder in which the outputs are stored.
+    :type cacheDir: str
+
+    :param force: If True, the outputs are never restored from the cache, but the outputs of new runs are still stored.
+    :type force: bool
+    '''
+
+    def __init__(self, cacheDir, force = False) -> None:
+        self.cacheDir = Path(cacheDir)
+        self.force = force
+        self.__fileHashes = {}
+        self.__imageDigests = {}
+
+    def getKey(self, runner):
+        '''
+        Returns the hash identifying the run of a runner.
+
+        :param runner: The runner to identify.
+        :type runner: :class:`BLRun.runner.Runner`
+
+        :returns:
+            A hexadecimal SHA-256 digest
+        '''
+        description = {'algorithm': runner.name,
+                       'params': runner.params,
+                       'image': self.__getImageDigest(ImageMapper.get(runner.name)),
+                       'inputs': [self.__getFileHash(runner.inputDir.joinpath(fileName))
+                                  for fileName in (runner.exprData, runner.cellData)]}
+        if runner.isNative():
+            # The Docker image is not used
+            description['native'] = True
+        return hashlib.sha256(json.dumps(description, sort_keys = True,
+                                         default = str).encode()).hexdigest()
+
+    def restore(self, runner, key):
+        '''
+        Copies the outputs of a completed run to the output folder
+        of the runner, if they are in the cache.
+
+        :param runner: The runner whose outputs are restored.
+        :type runner: :class:`BLRun.runner.Runner`
+
+        :param key: The hash of the run, as returned by :func:`getKey`.
+        :type key: str
+
+        :returns:
+            True if the outputs were restored, False otherwise
+        '''
+        entryDir = self.cacheDir.joinpath(key)
+        if self.force or not self.__isComplete(str(entryDir) + '/'):
+            return False
+
+        outDir = runner.getOutputDir()
+        os.makedirs(outDir, exist_ok = True)
+        # Remove the ranked edges of earlier runs, which may be in
+        # other formats than the restored ones, and newer than them
+        for filePath in getRankedEdgesFiles(outDir + 'rankedEdges.csv'):
+            os.remove(filePath)
+        for fileName in os.listdir(str(entryDir)):
+            if fileName != 'key.json':
+                shutil.copy2(str(entryDir.joinpath(fileName)), outDir + fileName)
+        return True
+
+    def store(self, runner, key, since = None):
+        '''
+        Copies the outputs of a completed run to the cache. Nothing is
+        stored if the run did not write its ranked edges and time files.
+
+        :param runner: The runner whose outputs are stored.
+        :type runner: :class:`BLRun.runner.Runner`
+
+        :param key: The hash of the run, as returned by :func:`getKey`.
+        :type key: str
+
+        :param since: Time at which the run started. Ranked edges written before, by an earlier run, are not stored.
+        :type since: float
+        '''
+        outDir = runner.getOutputDir()
+        if not self.__isComplete(outDir):
+            return
+        if since is not None and os.path.getmtime(findRankedEdges(outDir + 'rankedEdges.csv')) < since:
+            return
+
+        # Write the entry to a temporary folder first, so that
+        # an interrupted copy is never mistaken for a complete entry
+        entryDir = self.cacheDir.joinpath(key)
+        tmpDir = self.cacheDir.joinpath(key + '.tmp')
+        shutil.rmtree(str(tmpDir), ignore_errors = True)
+        os.makedirs(str(tmpDir))
+        for filePath in getRankedEdgesFiles(outDir + 'rankedEdges.csv') + glob.glob(outDir + 'time*.txt'):
+            shutil.copy2(filePath, str(tmpDir))
+        with open(str(tmpDir.joinpath('key.json')), 'w') as keyFile:
+            json.dump({'algorithm': runner.name, 'params': runner.params,
+                       'inputDir': str(runner.inputDir)},
+                      keyFile, sort_keys = True, indent = 2, default = str)
+        shutil.rmtree(str(entryDir), ignore_errors = True)
+        os.rename(str(tmpDir), str(entryDir))
+
+    @staticmethod
+    def __isComplete(outDir):
+        '''
+        Checks whether a folder contains ranked edges, in any format,
+        and time files.
+        '''
+        return findRankedEdges(outDir + 'rankedEdges.csv') is not None and \
+            len(glob.glob(outDir + 'time*.txt')) > 0
+
+    def __getFileHash(self, filePath):
+        '''
+        Returns the SHA-256 digest of the contents of a file, computed
+        once per version of the file.
+        '''
+        stat = os.stat(str(filePath))
+        stamp = (str(filePath), stat.st_mtime, stat.st_size)
+        if stamp not in self.__fileHashes:
+            digest = hashlib.sha256()
+            with open(str(filePath), 'rb') as inFile:
+                for block in iter(lambda: inFile.read(2**20), b''):
+                    digest.update(block)
+            self.__fileHashes[stamp] = digest.hexdigest()
+        return self.__fileHashes[stamp]
+
+    def __getImageDigest(self, image):
+        '''
+        Returns the id of a local Docker image, or None
+        if it cannot be inspected.
+        '''
+        if image is None:
+            return None
+        if image not in self.__imageDigests:
+            try:
+                self.__imageDigests[image] = subprocess.check_output(
+                    ['docker', 'image', 'inspect', '--format', '{{.Id}}', image],
+                    stderr = subprocess.DEVNULL).decode().strip()
+            except (OSError, subprocess.CalledProcessError):
+                self.__imageDigests[image] = None
+        return self.__imageDigests[image]
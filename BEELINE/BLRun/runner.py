@@ -13,7 +13,18 @@ import BLRun.singeRunner as SINGE
 import BLRun.scribeRunner as SCRIBE
 import BLRun.scsglRunner as SCSGL
 
+import os
+import json
+import time
+import datetime
+import traceback
+import subprocess
 from pathlib import Path
+from BLRun.scheduler import getResources, getPolicy
+from BLRun.executors import DockerExecutor
+from BLRun.sampler import getSamplesFile
+from BLRun.rankedEdges import DefaultFormats
+from BLRun.inputDependencies import InputDependencies
 
 InputMapper = {'SCODE':SCODE.generateInputs,
                'SINCERITIES':SINCERITIES.generateInputs,
@@ -66,6 +77,35 @@ OutputParser = {'SCODE':SCODE.parseOutput,
             'SCSGL':SCSGL.parseOutput}
 
 
+# Parameters the inputs of an algorithm are generated from, if any. The
+# inputs are generated again when they change (see BLRun.inputDependencies).
+InputParams = {'SINCERITIES': ['nBins']}
+
+
+# Algorithms that can be run in-process, from arrays, by a native
+# executor (see BLRun.executors.NativeExecutor). Their run function
+# writes the ranked edges, so their inputs and outputs are not converted.
+NativeMapper = {'GENIE3':GENIE3.runNative,
+            'GRNBOOST2':GRNBOOST2.runNative,
+            'SCSGL':SCSGL.runNative}
+
+
+ImageMapper = {'SCODE':'grnbeeline/scode:base',
+            'SINCERITIES':'grnbeeline/sincerities:base',
+            'SCNS':'grnbeeline/scns:base',
+            'PIDC':'grnbeeline/pidc:base',
+            'GRNVBEM':'grnbeeline/grnvbem:base',
+            'GENIE3':'grnbeeline/arboreto:base',
+            'GRNBOOST2':'grnbeeline/arboreto:base',
+            'LEAP':'grnbeeline/leap:base',
+            'JUMP3':'jump3:base',
+            'PPCOR':'grnbeeline/ppcor:base',
+            'GRISLI':'grnbeeline/grisli:base',
+            'SINGE':'grnbeeline/singe:0.4.1',
+            'SCRIBE':'grnbeeline/scribe:base',
+            'SCSGL':'scsgl:base'}
+
+
 class Runner(object):
     '''
     A runnable analysis to be incorporated into the pipeline
@@ -78,13 +118,170 @@ class Runner(object):
         self.exprData = params['exprData']
         self.cellData = params['cellData']
         self.trueEdges = params['trueEdges'] #used for evaluation
+        # path of the output folder, relative to that of the dataset
+        self.outputName = params.get('outputName', self.name)
+        # runs the containers, see BLRun.executors
+        self.executor = params.get('executor', DockerExecutor())
+        # formats of the ranked edges, see BLRun.rankedEdges
+        self.edgeFormats = params.get('edgeFormats', DefaultFormats)
+        # cores and memory (in GB) of the containers
+        self.resources = getResources(self.name, params.get('resources'))
+        # timeout and retries of the runs, see BLRun.scheduler
+        self.policy = getPolicy(params.get('policy'))
+        # time by which the current attempt must end, if any
+        self.deadline = None
         
     def generateInputs(self):
+        '''
+        Generates the inputs of the algorithm in <inputDir>/<name>/,
+        unless they are up to date, see :meth:`getInputDependencies`.
+        '''
+        if self.isNative():
+            return
+        dependencies = self.getInputDependencies()
+        if dependencies.isFresh():
+            print("Inputs of %s on %s are up to date, skipping..." % (self.name, self.inputDir))
+            return
+        dependencies.clear()
         InputMapper[self.name](self)
+        dependencies.record()
+
+    def getInputDependencies(self):
+        '''
+        Returns the dependencies of the inputs of the algorithm: the
+        expression data, pseudotime and reference network of the
+        dataset, and the parameters of the algorithm in InputParams.
+
+        :returns:
+            An instance of :class:`BLRun.inputDependencies.InputDependencies`
+        '''
+        return InputDependencies(self.inputDir.joinpath(self.name),
+                                 [self.inputDir.joinpath(fileName)
+                                  for fileName in (self.exprData, self.cellData, self.trueEdges)],
+                                 {param: self.params.get(param)
+                                  for param in InputParams.get(self.name, [])})
         
         
     def run(self):
-        AlgorithmMapper[self.name](self)
+        if self.isNative():
+            NativeMapper[self.name](self)
+        else:
+            AlgorithmMapper[self.name](self)
 
     def parseOutput(self):
-        OutputParser[self.name](self)
+        if not self.isNative():
+            OutputParser[self.name](self)
+
+    def isNative(self):
+        '''
+        Returns whether the algorithm of this runner is run in-process
+        by its executor, instead of in a container.
+        '''
+        return self.name in NativeMapper and getattr(self.executor, 'native', False)
+
+    def getOutputDir(self):
+        '''
+        Returns the folder the outputs of this runner are written to,
+        relative to the current working directory.
+        '''
+        return "outputs/"+str(self.inputDir).split("inputs/")[1]+"/"+self.outputName+"/"
+
+    def writeManifest(self):
+        '''
+        Writes the algorithm and parameters of this runner
+        to params.json in its output folder.
+        '''
+        outDir = self.getOutputDir()
+        os.makedirs(outDir, exist_ok = True)
+        with open(outDir + 'params.json', 'w') as manifest:
+            json.dump({'algorithm': self.name, 'params': self.params},
+                      manifest, sort_keys = True, indent = 2, default = str)
+
+    def writeFailure(self, stage, error, attempts):
+        '''
+        Writes a record of the failure of this runner to failure.json
+        in its output folder.
+
+        :param stage: The stage that failed: 'inputs', 'run' or 'outputs'.
+        :type stage: str
+
+        :param error: The exception raised by the stage
+        :type error: Exception
+
+        :param attempts: Number of times the stage was attempted
+        :type attempts: int
+
+        :returns:
+            The record, as a dictionary
+        '''
+        record = {'algorithm': self.name, 'outputName': self.outputName,
+                  'params': self.params, 'inputDir': str(self.inputDir),
+                  'stage': stage, 'attempts': attempts,
+                  'error': type(error).__name__, 'message': str(error),
+                  'timedOut': isinstance(error, subprocess.TimeoutExpired),
+                  'time': datetime.datetime.now().isoformat(),
+                  'traceback': ''.join(traceback.format_exception(type(error), error,
+                                                                  error.__traceback__))}
+        outDir = self.getOutputDir()
+        os.makedirs(outDir, exist_ok = True)
+        with open(outDir + 'failure.json', 'w') as failureFile:
+            json.dump(record, failureFile, sort_keys = True, indent = 2, default = str)
+        return record
+
+    def clearFailure(self):
+        '''
+        Removes the record of an earlier failure of this runner.
+        '''
+        failureFile = Path(self.getOutputDir() + 'failure.json')
+        if failureFile.exists():
+            failureFile.unlink()
+
+    def getTimeout(self):
+        '''
+        Returns the time left in seconds to the deadline of the
+        current attempt, or None if it has no deadline.
+        '''
+        if self.deadline is None:
+            return None
+        return max(0, self.deadline - time.time())
+
+    def runContainer(self, mountDir, command, options = ''):
+        '''
+        Runs a shell command in a container of the Docker image of this
+        runner, limited to its resources, with the executor of the runner.
+        If the executor samples the usage of the container, the samples
+        are written next to the time file of the command.
+
+        :param mountDir: Folder of the container in which the current working directory is mounted.
+        :type mountDir: str
+
+        :param command: The shell command. Double quotes must be escaped.
+        :type command: str
+
+        :param options: Additional options of docker run, e.g., '--expose=41269'.
+        :type options: str
+
+        :returns:
+            The exit status of the command, which is 0, since
+            :class:`subprocess.CalledProcessError` is raised otherwise.
+            :class:`subprocess.TimeoutExpired` is raised if the command
+            is still running at the deadline of the runner.
+        '''
+        status = self.executor.run(self, ImageMapper[self.name], mountDir, command, options,
+                                   getSamplesFile(command), self.getTimeout())
+        if status != 0:
+            raise subprocess.CalledProcessError(status, command)
+        return status
+
+    def dockerLimits(self):
+        '''
+        Returns the options of the docker run command that limit
+        a container to the resources of this runner,
+        e.g. '--cpus=4 --memory=8g'.
+        '''
+        limits = []
+        if self.resources.get('cpus'):
+            limits.append('--cpus=%g' % self.resources['cpus'])
+        if self.resources.get('memory'):
+            limits.append('--memory=%gg' % self.resources['memory'])
+        return ' '.join(limits)
@@ -0,0 +1,194 @@
+import os
+import re
+import time
+import threading
+import subprocess
+
+# Columns of the files of samples. Time is in seconds since the command
+# started, CPUPercent is relative to one core, and Memory is in kbytes.
+SampleColumns = ['Time', 'CPUPercent', 'Memory']
+
+# Multipliers of the memory units of docker stats, to kbytes
+MemoryUnits = {'B': 1/1024., 'kB': 1000/1024., 'KiB': 1., 'MB': 1000.**2/1024, 'MiB': 1024.,
+               'GB': 1000.**3/1024, 'GiB': 1024.**2, 'TB': 1000.**4/1024, 'TiB': 1024.**3}
+
+
+def getSamplesFile(command):
+    '''
+    Returns the path of the file of samples of a command, next to its time
+    file, e.g. outputs/<dataset>/<algorithm>/resources0.csv for a command
+    timed to data/outputs/<dataset>/<algorithm>/time0.txt.
+
+    :param command: The shell command, run with time -v -o data/<path>.
+    :type command: str
+
+    :returns:
+        The path of the file relative to the current working directory,
+        or None if the command is not timed.
+    '''
+    match = re.search(r'time -v -o data/(\S+)', command)
+    if match is None:
+        return None
+    return getSamplesPath(match.group(1))
+
+
+def getSamplesPath(timeFile):
+    '''
+    Returns the path of the file of samples next to a time file,
+    e.g. resources0.csv for time0.txt.
+
+    :param timeFile: Path of the time file
+    :type timeFile: str
+
+    :returns:
+        The path of the file of samples
+    '''
+    dirName, fileName = os.path.split(timeFile)
+    return os.path.join(dirName, re.sub(r'^time(.*)\.txt$', r'resources\1.csv', fileName))
+
+
+class DockerStatsProbe(object):
+    '''
+    Measures the usage of a running container with docker stats,
+    which reads the cgroup statistics of the container.
+
+    :param container: Name of the container
+    :type container: str
+    '''
+
+    def __init__(self, container) -> None:
+        self.container = container
+
+    def __call__(self):
+        '''
+        Returns the CPU percent and memory in kbytes of the
+        container, or None if it is not running.
+        '''
+        try:
+            stats = subprocess.check_output(['docker', 'stats', '--no-stream', '--format',
+                                             '{{.CPUPerc}}\t{{.MemUsage}}', self.container],
+                                            stderr = subprocess.DEVNULL).decode().strip()
+            cpuPercent, memUsage = stats.split('\t')
+            match = re.match(r'([\d.]+)\s*([A-Za-z]+)', memUsage)
+            return float(cpuPercent.rstrip('%')), float(match.group(1))*MemoryUnits[match.group(2)]
+        except (OSError, subprocess.CalledProcessError, ValueError, KeyError, AttributeError):
+            return None
+
+
+class ProcessProbe(object):
+    '''
+    Measures the usage of a process and all its descendants, from /proc,
+    as a stand-in for docker stats when the commands run on the host.
+
+    :param pid: Id of the process
+    :type pid: int
+    '''
+
+    def __init__(self, pid) -> None:
+        self.pid = pid
+        self.__lastTime = None
+        self.__lastTicks = None
+
+    def __call__(self):
+        '''
+        Returns the CPU percent and memory in kbytes of the process
+        and its descendants since the last call, or None if the
+        process is not running.
+        '''
+        # Map every process to its parent, CPU ticks and resident pages
+        children = {}
+        usage = {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open('/proc/' + entry + '/stat') as statFile:
+                    # The name of the command, in parentheses, may contain spaces
+                    fields = statFile.read().rsplit(')', 1)[1].split()
+            except (OSError, IndexError):
+                continue
+            children.setdefault(int(fields[1]), []).append(int(entry))
+            usage[int(entry)] = (int(fields[11]) + int(fields[12]), int(fields[21]))
+        if self.pid not in usage:
+            return None
+
+        ticks = 0
+        pages = 0
+        stack = [self.pid]
+        while stack:
+            pid = stack.pop()
+            if pid in usage:
+                ticks += usage[pid][0]
+                pages += usage[pid][1]
+            stack.extend(children.get(pid, []))
+
+        now = time.time()
+        cpuPercent = 0.0
+        if self.__lastTime is not None and now > self.__lastTime:
+            cpuPercent = 100.*max(0, ticks - self.__lastTicks)/os.sysconf('SC_CLK_TCK')/(now - self.__lastTime)
+        self.__lastTime = now
+        self.__lastTicks = ticks
+        return cpuPercent, pages*os.sysconf('SC_PAGE_SIZE')/1024.
+
+
+class ResourceSampler(object):
+    '''
+    Samples the CPU and memory usage of a running command at a fixed
+    interval, in a background thread, and appends each sample to a CSV
+    file with the columns in SampleColumns, so that the usage of a long
+    run can be followed while it runs. Samples are skipped while the
+    probe cannot measure the command, e.g., before its container starts.
+
+    :param samplesFile: Path of the file of samples, which is overwritten.
+    :type samplesFile: str
+
+    :param probe: A function returning the CPU percent and memory in kbytes of the command, or None.
+    :type probe: function
+
+    :param interval: Time between two samples in seconds
+    :type interval: float
+    '''
+
+    def __init__(self, samplesFile, probe, interval = 5) -> None:
+        self.samplesFile = samplesFile
+        self.probe = probe
+        self.interval = interval
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        '''
+        Starts sampling.
+        '''
+        self.__thread = threading.Thread(target = self.__sample, daemon = True)
+        self.__thread.start()
+
+    def stop(self):
+        '''
+        Stops sampling, and waits for the last sample to be written.
+        '''
+        self.__stopped.set()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def __sample(self):
+        '''
+        Writes samples until the sampler is stopped.
+        '''
+        start = time.time()
+        with open(self.samplesFile, 'w') as outFile:
+            outFile.write(','.join(SampleColumns) + '\n')
+            while True:
+                sample = self.probe()
+                if sample is not None:
+                    outFile.write('%.1f,%.1f,%d\n' % ((time.time() - start,) + tuple(sample)))
+                    outFile.flush()
+                if self.__stopped.wait(self.interval):
+                    break
@@ -0,0 +1,317 @@
+import os
+import math
+import time
+import multiprocessing
+import concurrent.futures
+
+# Resources (number of cores, memory in GB) reserved for a single
+# container of each algorithm, unless they are set in the config file
+DefaultResources = {'cpus': 1, 'memory': 2}
+
+ResourceHints = {'SCODE': {'cpus': 1, 'memory': 2},
+                 'SINCERITIES': {'cpus': 1, 'memory': 2},
+                 'SCNS': {'cpus': 1, 'memory': 4},
+                 'PIDC': {'cpus': 1, 'memory': 4},
+                 'GRNVBEM': {'cpus': 1, 'memory': 4},
+                 'GENIE3': {'cpus': 4, 'memory': 4},
+                 'GRNBOOST2': {'cpus': 4, 'memory': 4},
+                 'LEAP': {'cpus': 1, 'memory': 2},
+                 'JUMP3': {'cpus': 1, 'memory': 4},
+                 'PPCOR': {'cpus': 1, 'memory': 2},
+                 'GRISLI': {'cpus': 1, 'memory': 4},
+                 'SINGE': {'cpus': 1, 'memory': 8},
+                 'SCRIBE': {'cpus': 1, 'memory': 4},
+                 'SCSGL': {'cpus': 1, 'memory': 2}}
+
+
+# Timeout of a run in seconds (None for no timeout), number of times a
+# failed run is retried, and delay in seconds before the first retry,
+# doubled for every later one, unless they are set in the config file
+DefaultPolicy = {'timeout': None, 'retries': 0, 'backoff': 60}
+
+
+def getResources(name, resources = None):
+    '''
+    Returns the resources to reserve for a container of an algorithm.
+
+    :param name: Name of the algorithm
+    :type name: str
+
+    :param resources: Resources set in the config file for this algorithm, which override the default hints.
+    :type resources: dict
+
+    :returns:
+        A dictionary with the number of cores ('cpus') and the memory
+        in GB ('memory') of a container
+    '''
+    hints = dict(DefaultResources)
+    hints.update(ResourceHints.get(name, {}))
+    if resources is not None:
+        hints.update(resources)
+    return hints
+
+
+def getPolicy(policy = None):
+    '''
+    Returns the timeout and retries of the runs of an algorithm.
+
+    :param policy: Policy set in the config file for this algorithm, which overrides the defaults.
+    :type policy: dict
+
+    :returns:
+        A dictionary with the timeout of a run in seconds ('timeout'),
+        the number of retries of a failed run ('retries'), and the
+        delay in seconds before the first retry ('backoff')
+    '''
+    settings = dict(DefaultPolicy)
+    if policy is not None:
+        settings.update(policy)
+    return settings
+
+
+def getTotalMemory():
+    '''
+    Returns the physical memory of the machine in GB,
+    or None if it cannot be determined.
+    '''
+    try:
+        return os.sysconf('SC_PAGE_SIZE')*os.sysconf('SC_PHYS_PAGES')/1024.**3
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class JobScheduler(object):
+    '''
+    Runs the jobs of a list of runners as independent pipelines, in which
+    each runner generates its inputs, runs its algorithm and parses its
+    outputs, so that the outputs of fast algorithms are parsed while slow
+    ones are still running. The inputs are generated and the outputs are
+    parsed one job at a time, and the algorithms are run concurrently
+    within a global budget of cores and memory: each job reserves the
+    resources of its runner for as long as its algorithm runs, so that the
+    containers never use more than the budget. Jobs are started in order,
+    skipping the ones that do not fit in the remaining budget until enough
+    resources are released.
+
+    The number of jobs waiting between two stages is bounded, so that the
+    inputs are not generated far ahead of the algorithms, and no algorithm
+    is started while too many outputs are waiting to be parsed. Two jobs
+    of the same algorithm on the same dataset share their input folder,
+    even with different parameters, and never overlap.
+
+    Failures are isolated to their job: a job whose algorithm fails or
+    runs past its timeout is retried after a delay, which doubles after
+    every attempt, as set by the policy of its runner (see
+    :func:`getPolicy`). A job that still fails, or whose inputs or
+    outputs cannot be processed, is recorded to failure.json in its
+    output folder, and the other jobs keep running.
+
+    :param cores: Number of cores available to the jobs. Defaults to the number of cores of the machine.
+    :type cores: float
+
+    :param memory: Memory available to the jobs in GB. Defaults to the physical memory of the machine, and is not limited if it cannot be determined.
+    :type memory: float
+
+    :param queueSize: Maximum number of jobs waiting to run, and waiting to be parsed. Defaults to the number of cores.
+    :type queueSize: int
+
+    :param cache: A cache of the outputs of completed runs. The stages of a job whose outputs are in the cache are skipped, and the outputs of the other jobs are added to the cache once parsed.
+    :type cache: :class:`BLRun.resultCache.ResultCache`
+    '''
+
+    def __init__(self, cores = None, memory = None, queueSize = None, cache = None) -> None:
+        self.cores = cores if cores is not None else multiprocessing.cpu_count()
+        self.memory = memory if memory is not None else getTotalMemory()
+        self.queueSize = queueSize if queueSize is not None else max(1, int(math.ceil(self.cores)))
+        self.cache = cache
+
+    def run(self, runners):
+        '''
+        Runs the jobs of all the runners. The resources of a runner are
+        capped to the budget, and written back to the runner before its
+        algorithm is run, so that the containers are started with
+        matching limits.
+
+        :param runners: Runners to process, in order of priority.
+        :type runners: list
+
+        :returns:
+            A list of the records of the jobs that failed,
+            see :func:`BLRun.runner.Runner.writeFailure`
+        '''
+        pending = list(runners)
+        ready = []
+        # (time, runner) of the jobs waiting to be retried
+        retries = []
+        futures = {}
+        cacheKeys = {}
+        attempts = {}
+        busyKeys = set()
+        usedCores = 0
+        usedMemory = 0
+        numInputs = 0
+        numOutputs = 0
+        failures = []
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers = 1) as inputExecutor, \
+                concurrent.futures.ThreadPoolExecutor(max_workers = max(1, len(pending))) as runExecutor, \
+                concurrent.futures.ThreadPoolExecutor(max_workers = 1) as outputExecutor:
+            while True:
+                # Queue the jobs whose retry is due
+                now = time.time()
+                for retry in sorted(retries, key = lambda retry: retry[0]):
+                    if retry[0] <= now:
+                        retries.remove(retry)
+                        numInputs += 1
+                        ready.append(retry[1])
+
+                # Generate the inputs of the next jobs,
+                # at most queueSize jobs ahead of the algorithms
+                for runner in list(pending):
+                    if numInputs >= self.queueSize:
+                        break
+                    key = self.__key(runner)
+                    if key in busyKeys:
+                        continue
+                    pending.remove(runner)
+                    busyKeys.add(key)
+                    numInputs += 1
+                    futures[inputExecutor.submit(self.__prepare, runner)] = ('inputs', runner)
+
+                # Run the algorithms that fit in the budget, unless
+                # too many outputs are waiting to be parsed
+                for runner in list(ready):
+                    if numOutputs >= self.queueSize:
+                        break
+                    cpus, memory = self.__grant(runner)
+                    if usedCores + cpus > self.cores or \
+                            (self.memory is not None and usedMemory + memory > self.memory):
+                        continue
+                    runner.resources = dict(runner.resources, cpus = cpus, memory = memory)
+                    ready.remove(runner)
+                    numInputs -= 1
+                    usedCores += cpus
+                    usedMemory += memory
+                    attempts[runner] = attempts.get(runner, 0) + 1
+                    futures[runExecutor.submit(self.__run, runner)] = ('run', runner)
+
+                if not futures and not retries:
+                    break
+
+                # Wait for a stage to end, or for the next retry
+                timeout = None
+                if retries:
+                    timeout = max(0, min(retry[0] for retry in retries) - time.time())
+                if not futures:
+                    time.sleep(timeout)
+                    continue
+                done, _ = concurrent.futures.wait(futures, timeout = timeout,
+                                return_when = concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    stage, runner = futures.pop(future)
+                    # https://stackoverflow.com/questions/35711160/detect-failed-tasks-in-concurrent-futures
+                    try:
+                        result = future.result()
+                        error = None
+                    except Exception as e:
+                        error = e
+
+                    if stage == 'inputs':
+                        if error is not None or result is None:
+                            # failed, or restored from the cache
+                            numInputs -= 1
+                            busyKeys.discard(self.__key(runner))
+                            if error is not None:
+                                failures.append(self.__fail(runner, stage, error, 1))
+                        else:
+                            cacheKeys[runner] = result
+                            ready.append(runner)
+                    elif stage == 'run':
+                        usedCores -= runner.resources['cpus']
+                        usedMemory -= runner.resources['memory']
+                        if error is None:
+                            numOutputs += 1
+                            futures[outputExecutor.submit(self.__finish, runner,
+                                                          *cacheKeys.pop(runner))] = ('outputs', runner)
+                        elif attempts[runner] <= runner.policy['retries']:
+                            delay = runner.policy['backoff']*2**(attempts[runner] - 1)
+                            print("%s on %s failed (%s: %s), retrying in %g seconds" %
+                                  (runner.name, runner.inputDir, type(error).__name__, error, delay))
+                            retries.append((time.time() + delay, runner))
+                        else:
+                            cacheKeys.pop(runner)
+                            busyKeys.discard(self.__key(runner))
+                            failures.append(self.__fail(runner, stage, error, attempts[runner]))
+                    else:
+                        numOutputs -= 1
+                        busyKeys.discard(self.__key(runner))
+                        if error is not None:
+                            failures.append(self.__fail(runner, stage, error, 1))
+
+        return failures
+
+    def __prepare(self, runner):
+        '''
+        Restores the outputs of a runner from the cache if possible,
+        and generates its inputs otherwise. Returns None if the outputs
+        were restored, and the cache key of the run and the time at
+        which it started otherwise.
+        '''
+        since = time.time()
+        key = None
+        runner.writeManifest()
+        runner.clearFailure()
+        if self.cache is not None:
+            key = self.cache.getKey(runner)
+            if self.cache.restore(runner, key):
+                print("Restored the outputs of %s on %s from the cache" % (runner.name, runner.inputDir))
+                return None
+        runner.generateInputs()
+        return key, since
+
+    def __run(self, runner):
+        '''
+        Runs the algorithm of a runner, until the timeout of its policy.
+        '''
+        timeout = runner.policy['timeout']
+        runner.deadline = time.time() + timeout if timeout else None
+        try:
+            runner.run()
+        finally:
+            runner.deadline = None
+
+    @staticmethod
+    def __fail(runner, stage, error, attempts):
+        '''
+        Records the failure of a stage of a job, and returns the record.
+        '''
+        print("%s on %s failed in stage %s after %d attempt(s): %s: %s" %
+              (runner.name, runner.inputDir, stage, attempts, type(error).__name__, error))
+        return runner.writeFailure(stage, error, attempts)
+
+    def __finish(self, runner, key, since):
+        '''
+        Parses the outputs of a runner, and adds them to the cache.
+        '''
+        runner.parseOutput()
+        if self.cache is not None:
+            self.cache.store(runner, key, since)
+
+    def __grant(self, runner):
+        '''
+        Returns the cores and memory of a runner, capped to the budget.
+        '''
+        cpus = min(runner.resources['cpus'], self.cores)
+        memory = runner.resources['memory']
+        if self.memory is not None:
+            memory = min(memory, self.memory)
+        return cpus, memory
+
+    @staticmethod
+    def __key(runner):
+        '''
+        Returns the key of the folders a runner writes to. The runners
+        of an algorithm on a dataset share their input folder, even if
+        their parameters and output folders differ.
+        '''
+        return (str(runner.inputDir), runner.name)
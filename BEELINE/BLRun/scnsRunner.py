@@ -4,12 +4,14 @@ import pandas as pd
 from itertools import permutations
 from collections import Counter
 import re
+from BLRun.rankedEdges import writeRankedEdges
+from BLRun.expressionStore import getExpressionData
 
 def generateInputs(RunnerObj):
     '''
     Function to generate desired inputs for SCNS.
-    If the folder/files under RunnerObj.datadir exist, 
-    this function will not do anything.
+    It is only called when the inputs are out of date,
+    see :meth:`BLRun.runner.Runner.generateInputs`.
     '''
     
     if not RunnerObj.inputDir.joinpath("SCNS").exists():
@@ -17,8 +19,7 @@ def generateInputs(RunnerObj):
         RunnerObj.inputDir.joinpath("SCNS").mkdir(exist_ok = False)
         
     # input file
-    ExpressionData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.exprData),
-                                 header = 0, index_col = 0)
+    ExpressionData = getExpressionData(RunnerObj)
 
     # Convert input expression to boolean
     # If  the gene's expression value is >= it's avg. expression across cells
@@ -92,19 +93,17 @@ def run(RunnerObj):
                     
     
     # make output dirs if they do not exist:
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/SCNS/"
+    outDir = RunnerObj.getOutputDir()
     os.makedirs(outDir, exist_ok = True)
     
     outPath = "data/" +  str(outDir)
-    cmdToRun = ' '.join(['docker run --rm -v', str(Path.cwd())+':/SCNS-Toolkit/SynthesisEngine/data/', 
-                         'grnbeeline/scns:base /bin/sh -c \"time -v -o', "data/" + str(outDir) + 'time.txt',
+    cmdToRun = ' '.join(['time -v -o', "data/" + str(outDir) + 'time.txt',
                          'mono SynthesisEngine.exe', inputPath+'ExpressionData.csv',
                           inputPath+'Edges.csv',  inputPath+'Parameters.csv',
                           inputPath+'initial.txt',  inputPath+'target.txt',
-                          outPath, '\"'])
+                          outPath])
 
-    print(cmdToRun)
-    os.system(cmdToRun)
+    RunnerObj.runContainer('/SCNS-Toolkit/SynthesisEngine/data/', cmdToRun)
                                    
 def parseOutput(RunnerObj):
     '''
@@ -112,13 +111,13 @@ def parseOutput(RunnerObj):
     '''
     # Get list of input genes
     ExprDF = pd.read_csv(RunnerObj.inputDir.joinpath("SCNS/ExpressionData.csv"), index_col = 0, header = 0)
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/SCNS/"
+    outDir = RunnerObj.getOutputDir()
     geneList = list(ExprDF.columns)
     
     # Initialize ranked egdes file 
     possibleEdges = list(permutations(geneList, r = 2))
     trueEdges =  {'|'.join(p):0 for p in possibleEdges}
-    rankedEdges = pd.DataFrame(index = trueEdges.keys(),columns=['Gene1','Gene2','EdgeWeight'])
+    rankedEdges = []
         
     for gene in geneList:
         outFile = gene+'.txt'
@@ -134,12 +133,11 @@ def parseOutput(RunnerObj):
                     trueEdges[gene+'|'+gene2] = count[gene2]
                 if gene != gene2:
                     # ignoring self-edges
-                    rankedEdges.loc[gene+'|'+gene2,'EdgeWeight'] = trueEdges[gene+'|'+gene2]
-                    rankedEdges.loc[gene+'|'+gene2,'Gene1'] = gene2
-                    rankedEdges.loc[gene+'|'+gene2,'Gene2'] = gene
+                    rankedEdges.append((gene2, gene, trueEdges[gene+'|'+gene2]))
         else:
             # Skip if output file does not exist
             print(outDir+outFile+' does not exist, skipping...')
         
-    rankedEdges.sort_values('EdgeWeight', ascending=False, inplace=True)
-    rankedEdges.to_csv(outDir+'rankedEdges.csv',sep='\t', index = False)
+    rankedEdges = pd.DataFrame(rankedEdges, columns = ['Gene1','Gene2','EdgeWeight'])
+    writeRankedEdges(rankedEdges, outDir + 'rankedEdges.csv', sortBy = 'EdgeWeight',
+                     formats = RunnerObj.edgeFormats)
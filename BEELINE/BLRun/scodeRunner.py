@@ -2,12 +2,14 @@ import os
 import pandas as pd
 from pathlib import Path
 import numpy as np
+from BLRun.rankedEdges import writeRankedEdges, rankMatrix, EdgeMerger
+from BLRun.expressionStore import getExpressionData
 
 def generateInputs(RunnerObj):
     '''
     Function to generate desired inputs for SCODE.
-    If the folder/files under RunnerObj.datadir exist, 
-    this function will not do anything.
+    It is only called when the inputs are out of date,
+    see :meth:`BLRun.runner.Runner.generateInputs`.
     '''
     if not RunnerObj.inputDir.joinpath("SCODE").exists():
         print("Input folder for SCODE does not exist, creating input folder...")
@@ -15,8 +17,7 @@ def generateInputs(RunnerObj):
         
 
     
-    ExpressionData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.exprData),
-                                     header = 0, index_col = 0)
+    ExpressionData = getExpressionData(RunnerObj)
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
                              header = 0, index_col = 0)
 
@@ -43,7 +44,7 @@ def run(RunnerObj):
     '''
     
     # make output dirs if they do not exist:
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/SCODE/"
+    outDir = RunnerObj.getOutputDir()
     os.makedirs(outDir, exist_ok = True)
     
     inputPath = "data"+str(RunnerObj.inputDir).split(str(Path.cwd()))[1]+"/SCODE/"
@@ -69,15 +70,13 @@ def run(RunnerObj):
 
         os.makedirs(outDir+str(idx), exist_ok = True)
 
-        cmdToRun = ' '.join(['docker run --rm -v', 
-                             str(Path.cwd())+':/SCODE/data/  grnbeeline/scode:base /bin/sh -c \"time -v -o',
+        cmdToRun = ' '.join(['time -v -o',
                              "data/" + str(outDir) + 'time'+str(idx)+'.txt', 'ruby run_R.rb',
                             inputPath +'ExpressionData'+str(idx)+'.csv', 
                             inputPath + 'PseudoTime'+str(idx)+'.csv', 
                             'data/'+outDir+str(idx),
-                             nGenes, z, nCells, nIter, nRep, '\"'])
-        print(cmdToRun)
-        os.system(cmdToRun)
+                             nGenes, z, nCells, nIter, nRep])
+        RunnerObj.runContainer('/SCODE/data/', cmdToRun)
 
 
 
@@ -85,11 +84,17 @@ def parseOutput(RunnerObj):
     '''
     Function to parse outputs from SCODE.
     '''
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/SCODE/"
+    outDir = RunnerObj.getOutputDir()
 
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
                              header = 0, index_col = 0)
     colNames = PTData.columns
+    # read input file for list of gene names
+    ExpressionData = getExpressionData(RunnerObj)
+    GeneList = list(ExpressionData.index)
+
+    # Merge the trajectories by taking the maximum weight of each edge
+    merger = EdgeMerger(GeneList)
     for indx in range(len(colNames)):
         # Read output
         outFile = str(indx)+'/meanA.txt'
@@ -100,35 +105,9 @@ def parseOutput(RunnerObj):
             return
         OutDF = pd.read_csv(outDir+outFile, sep = '\t', header = None)
 
+        # Rank the edges of each trajectory by the absolute value of A
+        writeRankedEdges(rankMatrix(OutDF.values, GeneList), outDir + 'outFile'+str(indx)+'.csv')
+        merger.addMatrix(np.abs(OutDF.values))
 
-
-        # Sort values in a matrix using code from:
-        # https://stackoverflow.com/questions/21922806/sort-values-of-matrix-in-python
-        OutMatrix = np.abs(OutDF.values)
-        idx = np.argsort(OutMatrix, axis = None)[::-1]
-        rows, cols = np.unravel_index(idx, OutDF.shape)    
-        DFSorted = OutMatrix[rows, cols]
-
-        # read input file for list of gene names
-        ExpressionData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.exprData),
-                                         header = 0, index_col = 0)
-        GeneList = list(ExpressionData.index)
-
-        outFile = open(outDir + 'outFile'+str(indx)+'.csv','w')
-        outFile.write('Gene1'+'\t'+'Gene2'+'\t'+'EdgeWeight'+'\n')
-
-        for row, col, val in zip(rows, cols, DFSorted):
-            outFile.write('\t'.join([GeneList[row],GeneList[col],str(val)])+'\n')
-        outFile.close()
-        
-    OutSubDF = [0]*len(colNames)
-    for indx in range(len(colNames)):
-        outFile = 'outFile'+str(indx)+'.csv'
-        OutSubDF[indx] = pd.read_csv(outDir+outFile, sep = '\t', header = 0)
-
-        OutSubDF[indx].EdgeWeight = np.abs(OutSubDF[indx].EdgeWeight)
-
-    outDF = pd.concat(OutSubDF)
-    FinalDF = outDF[outDF['EdgeWeight'] == outDF.groupby(['Gene1','Gene2'])['EdgeWeight'].transform('max')]
-    FinalDF.sort_values(['EdgeWeight'], ascending = False, inplace = True)
-    FinalDF.to_csv(outDir+'rankedEdges.csv',sep = '\t', index = False)
+    writeRankedEdges(merger.getRankedEdges(), outDir + 'rankedEdges.csv',
+                     formats = RunnerObj.edgeFormats)
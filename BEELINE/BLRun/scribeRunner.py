@@ -2,20 +2,21 @@ import os
 import pandas as pd
 from pathlib import Path
 import numpy as np
+from BLRun.rankedEdges import writeRankedEdges, EdgeMerger
+from BLRun.expressionStore import getExpressionData
 
 def generateInputs(RunnerObj):
     '''
     Function to generate desired inputs for SCRIBE.
-    If the folder/files under RunnerObj.datadir exist, 
-    this function will not do anything.
+    It is only called when the inputs are out of date,
+    see :meth:`BLRun.runner.Runner.generateInputs`.
     '''
     if not RunnerObj.inputDir.joinpath("SCRIBE").exists():
         print("Input folder for SCRIBE does not exist, creating input folder...")
         RunnerObj.inputDir.joinpath("SCRIBE").mkdir(exist_ok = False)
     
     
-    ExpressionData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.exprData),
-                                     header = 0, index_col = 0)
+    ExpressionData = getExpressionData(RunnerObj)
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
                              header = 0, index_col = 0)
 
@@ -35,14 +36,13 @@ def generateInputs(RunnerObj):
         ptDF.to_csv(RunnerObj.inputDir.joinpath(cellName),
                                  sep = ',', header  = True, index = True)
         
-    if not RunnerObj.inputDir.joinpath("SCRIBE/GeneData.csv").exists():
-        # required column!!
-        geneDict = {}
-        geneDict['gene_short_name'] = [gene.replace('x_', '') for gene in ExpressionData.index]
+    # required column!!
+    geneDict = {}
+    geneDict['gene_short_name'] = [gene.replace('x_', '') for gene in ExpressionData.index]
         
-        geneDF = pd.DataFrame(geneDict, index = ExpressionData.index)
-        geneDF.to_csv(RunnerObj.inputDir.joinpath("SCRIBE/GeneData.csv"), 
-                      sep = ',', header = True)
+    geneDF = pd.DataFrame(geneDict, index = ExpressionData.index)
+    geneDF.to_csv(RunnerObj.inputDir.joinpath("SCRIBE/GeneData.csv"), 
+                  sep = ',', header = True)
     
 def run(RunnerObj):
     '''
@@ -65,7 +65,7 @@ def run(RunnerObj):
     ignorePT = str(RunnerObj.params['ignorePT'])
     
     # make output dirs if they do not exist:
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/SCRIBE/"
+    outDir = RunnerObj.getOutputDir()
     os.makedirs(outDir, exist_ok = True)
 
     # Build the command to run Scribe
@@ -80,7 +80,7 @@ def run(RunnerObj):
         outFile = "outFile"+str(idx)+".csv"
         timeFile = 'time'+str(idx)+".txt"
         
-        cmdToRun = ' '.join(['docker run --rm -v', str(Path.cwd())+':/data/ grnbeeline/scribe:base /bin/sh -c \"time -v -o', "data/" + str(outDir) + timeFile, 'Rscript runScribe.R',
+        cmdToRun = ' '.join(['time -v -o', "data/" + str(outDir) + timeFile, 'Rscript runScribe.R',
                        '-e',inputPath +exprName, '-c',inputPath + cellName, 
                        '-g',inputPath + 'GeneData.csv', '-o data/'+outDir, '-d',delay, '-l', low,
                        '-m', method, '-x',fam, '--outFile '+outFile])
@@ -90,11 +90,7 @@ def run(RunnerObj):
         if str(RunnerObj.params['ignorePT']) == 'True':
             cmdToRun += ' -i'
 
-        cmdToRun += '\"'
-
-        print(cmdToRun)
-
-        os.system(cmdToRun)
+        RunnerObj.runContainer('/data/', cmdToRun)
 
 
 
@@ -102,12 +98,13 @@ def parseOutput(RunnerObj):
     '''
     Function to parse outputs from SCRIBE.
     '''
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/SCRIBE/"
+    outDir = RunnerObj.getOutputDir()
 
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
                              header = 0, index_col = 0)
     colNames = PTData.columns
-    OutSubDF = [0]*len(colNames)
+    # Merge the trajectories by taking the maximum weight of each edge
+    merger = EdgeMerger()
     for idx in range(len(colNames)):
         # Read output
         outFile = 'outFile'+str(idx)+'.csv'
@@ -116,16 +113,8 @@ def parseOutput(RunnerObj):
 
             print(outDir+outFile+' does not exist, skipping...')
             return
-        OutSubDF[idx] = pd.read_csv(outDir+outFile, sep = ' ', header = None)
+        OutDF = pd.read_csv(outDir+outFile, sep = ' ', header = None)
+        merger.addEdges(OutDF, columns = [0, 1, 2])
 
-    # megre the dataframe by taking the maximum value from each DF
-    # From here: https://stackoverflow.com/questions/20383647/pandas-selecting-by-label-sometimes-return-series-sometimes-returns-dataframe
-    outDF = pd.concat(OutSubDF)
-    outDF.columns= ['Gene1','Gene2','EdgeWeight']
-    # Group by rows code is from here:
-    # https://stackoverflow.com/questions/53114609/pandas-how-to-remove-duplicate-rows-but-keep-all-rows-with-max-value
-    res = outDF[outDF['EdgeWeight'] == outDF.groupby(['Gene1','Gene2'])['EdgeWeight'].transform('max')]
-    # Sort values in the dataframe   
-    finalDF = res.sort_values('EdgeWeight',ascending=False)  
-    
-    finalDF.to_csv(outDir+'rankedEdges.csv',sep='\t', index = False)
+    writeRankedEdges(merger.getRankedEdges(), outDir + 'rankedEdges.csv',
+                     formats = RunnerObj.edgeFormats)
@@ -1,35 +1,32 @@
 import os
+import sys
 import pandas as pd
 from pathlib import Path
 import numpy as np
+from BLRun.rankedEdges import writeRankedEdges
+from BLRun.expressionStore import linkExpressionData, getExpressionStore
 
 def generateInputs(RunnerObj):
     '''
     Function to generate desired inputs for scSGL.
-    If the folder/files under RunnerObj.datadir exist, 
-    this function will not do anything.
+    It is only called when the inputs are out of date,
+    see :meth:`BLRun.runner.Runner.generateInputs`.
     :param RunnerObj: An instance of the :class:`BLRun`
     '''
     if not RunnerObj.inputDir.joinpath("SCSGL").exists():
         print("Input folder for SCSGL does not exist, creating input folder...")
         RunnerObj.inputDir.joinpath("SCSGL").mkdir(exist_ok = False)
         
-    if not RunnerObj.inputDir.joinpath("SCSGL/ExpressionData.csv").exists():
-        # input data
-        ExpressionData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.exprData),
-                                     header = 0, index_col = 0)
+    # Link gene expression data in SCSGL folder, as scSGL
+    # reads it in its original format
+    linkExpressionData(RunnerObj, RunnerObj.inputDir.joinpath("SCSGL/ExpressionData.csv"))
 
-        # Write gene expression data in SCSGL folder 
-        ExpressionData.to_csv(RunnerObj.inputDir.joinpath("SCSGL/ExpressionData.csv"),
-                             sep = ',', header  = True)
+    refNetworkData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.trueEdges),
+                                 header = 0, index_col = 0)
 
-    if not RunnerObj.inputDir.joinpath("SCSGL/refNetwork.csv").exists():
-        refNetworkData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.trueEdges),
-                                     header = 0, index_col = 0)
-
-	  # Write reference network data in SCSGL folder 
-        refNetworkData.to_csv(RunnerObj.inputDir.joinpath("SCSGL/refNetwork.csv"),
-                             sep = ',', header  = True)    
+    # Write reference network data in SCSGL folder 
+    refNetworkData.to_csv(RunnerObj.inputDir.joinpath("SCSGL/refNetwork.csv"),
+                         sep = ',', header  = True)    
 
     
 def run(RunnerObj):
@@ -50,18 +47,15 @@ def run(RunnerObj):
     assoc = str(RunnerObj.params['assoc'])
 
     # make output dirs if they do not exist:
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/SCSGL/"
+    outDir = RunnerObj.getOutputDir()
     os.makedirs(outDir, exist_ok = True)
     
     outPath = "data/" +  str(outDir) + 'outFile.txt'
-    cmdToRun = ' '.join(['docker run --rm -v', str(Path.cwd())+':/data/ --expose=41269', 
-                         'scsgl:base /bin/sh -c \"time -v -o', "data/" + str(outDir) + 'time.txt', 'python run_scSGL.py',
+    cmdToRun = ' '.join(['time -v -o', "data/" + str(outDir) + 'time.txt', 'python run_scSGL.py',
                          '--expression_file='+expressionDataPath, '--ref_net_file='+refNetworkPath, '--out_file='+outPath, 
-                         '--pos_density='+pos_density, '--neg_density='+neg_density, '--assoc='+assoc,
-                         '\"'])
+                         '--pos_density='+pos_density, '--neg_density='+neg_density, '--assoc='+assoc])
 
-    print(cmdToRun)
-    os.system(cmdToRun)
+    RunnerObj.runContainer('/data/', cmdToRun, '--expose=41269')
 
 
 def parseOutput(RunnerObj):
@@ -70,23 +64,66 @@ def parseOutput(RunnerObj):
     :param RunnerObj: An instance of the :class:`BLRun`
     '''
     # Quit if output directory does not exist
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/SCSGL/"
+    outDir = RunnerObj.getOutputDir()
+    if not Path(outDir+'outFile.txt').exists():
+        print(outDir+'outFile.txt'+'does not exist, skipping...')
+        return
 
-        
     # Read output file
     OutDF = pd.read_csv(outDir+'outFile.txt', sep = '\t', header = 0)
 
-    OutDF.sort_values(by="EdgeWeight", ascending=False, inplace=True)
-    
-    if not Path(outDir+'outFile.txt').exists():
-        print(outDir+'outFile.txt'+'does not exist, skipping...')
-        return
-    
-    # Formats the outFile into a ranked edgelist comma-separated file
-    outFile = open(outDir + 'rankedEdges.csv','w')
-    outFile.write('Gene1'+'\t'+'Gene2'+'\t'+'EdgeWeight'+'\n')
-
-    for idx, row in OutDF.iterrows():
-        # TODO: might need to sort
-        outFile.write('\t'.join([row['Gene1'],row['Gene2'],str(row['EdgeWeight'])])+'\n')
-    outFile.close()
+    # Formats the outFile into a ranked edgelist tab-separated file
+    writeRankedEdges(OutDF, outDir + 'rankedEdges.csv', sortBy = 'EdgeWeight',
+                     formats = RunnerObj.edgeFormats)
+
+
+def runNative(RunnerObj):
+    '''
+    Function to run SCSGL in-process with the executor of the runner,
+    see :class:`BLRun.executors.NativeExecutor`. The expression data
+    is memory-mapped from its store, see :mod:`BLRun.expressionStore`,
+    and the ranked edges are written directly.
+    :param RunnerObj: An instance of the :class:`BLRun`
+    '''
+    # make output dirs if they do not exist:
+    outDir = RunnerObj.getOutputDir()
+    os.makedirs(outDir, exist_ok = True)
+
+    # The store of the expression data is passed by path, and mapped by the process of the pool
+    OutDF = RunnerObj.executor.call(inferNetwork,
+                                    (getExpressionStore(RunnerObj),
+                                     float(RunnerObj.params['pos_density']),
+                                     float(RunnerObj.params['neg_density']),
+                                     str(RunnerObj.params['assoc'])),
+                                    outDir + 'time.txt', timeout = RunnerObj.getTimeout())
+    writeRankedEdges(OutDF, outDir + 'rankedEdges.csv', sortBy = 'EdgeWeight',
+                     formats = RunnerObj.edgeFormats)
+
+
+def inferNetwork(store, pos_density, neg_density, assoc):
+    '''
+    Function to learn a signed graph with scSGL, as in run_scSGL.py.
+    :param store: The store of the expression data
+    :type store: :class:`BLRun.expressionStore.ExpressionStore`
+
+    :param pos_density: Density of the positive part of the graph
+    :type pos_density: float
+
+    :param neg_density: Density of the negative part of the graph
+    :type neg_density: float
+
+    :param assoc: Association type, e.g., correlation
+    :type assoc: str
+
+    :returns:
+        A DataFrame with the columns Gene1, Gene2 and EdgeWeight
+    '''
+    # The scSGL sources are shipped in Algorithms/SCSGL
+    scsglDir = str(Path(__file__).resolve().parents[1].joinpath('Algorithms/SCSGL/scSGL'))
+    if scsglDir not in sys.path:
+        sys.path.append(scsglDir)
+    from pysrc.graphlearning import learn_signed_graph
+
+    # scSGL expects a genes x cells array
+    return learn_signed_graph(np.array(store.values), pos_density = pos_density, neg_density = neg_density,
+                              assoc = assoc, gene_names = np.array(store.genes))
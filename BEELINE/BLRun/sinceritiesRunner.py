@@ -2,13 +2,15 @@ import os
 import pandas as pd
 from pathlib import Path
 import numpy as np
+from BLRun.rankedEdges import writeRankedEdges, EdgeMerger
+from BLRun.expressionStore import getExpressionData
 
 
 def generateInputs(RunnerObj):
     '''
     Function to generate desired inputs for SINCERITIES.
-    If the folder/files under RunnerObj.datadir exist, 
-    this function will not do anything.
+    It is only called when the inputs are out of date,
+    see :meth:`BLRun.runner.Runner.generateInputs`.
 
     :param RunnerObj: An instance of the :class:`BLRun`
     '''
@@ -17,8 +19,7 @@ def generateInputs(RunnerObj):
         RunnerObj.inputDir.joinpath("SINCERITIES").mkdir(exist_ok = False)
     
     
-    ExpressionData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.exprData),
-                                     header = 0, index_col = 0)
+    ExpressionData = getExpressionData(RunnerObj)
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
                              header = 0, index_col = 0)
 
@@ -48,7 +49,7 @@ def run(RunnerObj):
     inputPath = "data" + str(RunnerObj.inputDir).split(str(Path.cwd()))[1] + \
                         "/SINCERITIES/"
     # make output dirs if they do not exist:
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/SINCERITIES/"
+    outDir = RunnerObj.getOutputDir()
     os.makedirs(outDir, exist_ok = True)
     
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
@@ -58,12 +59,10 @@ def run(RunnerObj):
     for idx in range(len(colNames)):
         inFile = "ExpressionData"+str(idx)+".csv"
         outPath = 'data/' + str(outDir) + 'outFile'+str(idx)+'.txt'
-        cmdToRun = ' '.join(['docker run --rm -v', 
-                             str(Path.cwd())+':/SINCERITIES/data/ grnbeeline/sincerities:base /bin/sh -c \"time -v -o', 
+        cmdToRun = ' '.join(['time -v -o', 
                              "data/" + str(outDir) + 'time'+str(idx)+'.txt', 'Rscript MAIN.R',
-                             inputPath+inFile, outPath, '\"'])
-        print(cmdToRun)
-        os.system(cmdToRun)
+                             inputPath+inFile, outPath])
+        RunnerObj.runContainer('/SINCERITIES/data/', cmdToRun)
 
 
 def parseOutput(RunnerObj):
@@ -72,12 +71,13 @@ def parseOutput(RunnerObj):
 
     :param RunnerObj: An instance of the :class:`BLRun`
     '''
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/SINCERITIES/"
+    outDir = RunnerObj.getOutputDir()
 
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
                              header = 0, index_col = 0)
     colNames = PTData.columns
-    OutSubDF = [0]*len(colNames)
+    # Merge the trajectories by taking the maximum weight of each edge
+    merger = EdgeMerger()
     for idx in range(len(colNames)):
         # Read output
         outFile = 'outFile'+str(idx)+'.txt'
@@ -86,19 +86,11 @@ def parseOutput(RunnerObj):
 
             print(outDir+outFile+' does not exist, skipping...')
             return
-        OutSubDF[idx] = pd.read_csv(outDir+outFile, sep = ',', header = 0)
+        OutDF = pd.read_csv(outDir+outFile, sep = ',', header = 0)
+        # SINCERITIES output is incorrectly orderd,
+        # the target genes are in the first column
+        merger.addEdges(OutDF, columns = ['TargetGENES','SourceGENES','Interaction'])
 
-    # megre the dataframe by taking the maximum value from each DF
-    # From here: https://stackoverflow.com/questions/20383647/pandas-selecting-by-label-sometimes-return-series-sometimes-returns-dataframe
-    outDF = pd.concat(OutSubDF)
-    # Group by rows code is from here:
-    # https://stackoverflow.com/questions/53114609/pandas-how-to-remove-duplicate-rows-but-keep-all-rows-with-max-value
-    res = outDF[outDF['Interaction'] == outDF.groupby(['SourceGENES','TargetGENES'])['Interaction'].transform('max')]
-    # Sort values in the dataframe   
-    finalDF = res.sort_values('Interaction',ascending=False)
-    finalDF.drop(labels = 'Edges',axis = 'columns', inplace = True)
-    # SINCERITIES output is incorrectly orderd
-    finalDF.columns = ['Gene2','Gene1','EdgeWeight']
-    finalDF.to_csv(outDir+'rankedEdges.csv',sep='\t', 
-                   columns = ['Gene1','Gene2','EdgeWeight'],index = False)
+    writeRankedEdges(merger.getRankedEdges(), outDir + 'rankedEdges.csv',
+                     formats = RunnerObj.edgeFormats)
     
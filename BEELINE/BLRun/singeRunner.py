@@ -3,19 +3,20 @@ import subprocess
 import pandas as pd
 from pathlib import Path
 import numpy as np
+from BLRun.rankedEdges import writeRankedEdges, EdgeMerger
+from BLRun.expressionStore import getExpressionData
 
 def generateInputs(RunnerObj):
     '''
     Function to generate desired inputs for SINGE.
-    If the folder/files under RunnerObj.datadir exist, 
-    this function will not do anything.
+    It is only called when the inputs are out of date,
+    see :meth:`BLRun.runner.Runner.generateInputs`.
     '''
     if not RunnerObj.inputDir.joinpath("SINGE").exists():
         print("Input folder for SINGE does not exist, creating input folder...")
         RunnerObj.inputDir.joinpath("SINGE").mkdir(exist_ok = False)
         
-    ExpressionData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.exprData),
-                                     header = 0, index_col = 0)
+    ExpressionData = getExpressionData(RunnerObj)
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
                              header = 0, index_col = 0)
 
@@ -40,7 +41,7 @@ def run(RunnerObj):
     
 
     # make output dirs if they do not exist:
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/SINGE/"
+    outDir = RunnerObj.getOutputDir()
     os.makedirs(outDir, exist_ok = True)
 
     # if the parameters aren't specified, then use default parameters
@@ -90,7 +91,7 @@ def run(RunnerObj):
         This is a workaround for https://github.com/gitter-lab/SINGE/blob/master/code/parseParams.m#L39
         not allowing '/' characters in the outDir parameter.
         '''
-        symlink_out_file = ' '.join(['ln -s', outFile, outFileSymlink])
+        symlink_out_file = ' '.join(['ln -sfn', outFile, outFileSymlink])
 
         '''
         See https://github.com/gitter-lab/SINGE/blob/master/README.md.  SINGE expects a data matfile with variables "X" and "ptime",
@@ -107,29 +108,27 @@ def run(RunnerObj):
                              'f = fopen(\'' + inputFile + '\'); gene_list = strsplit(fgetl(f), \',\')(1:end-1).\'; fclose(f); ' + \
                              'save(\'-v7\',\'' + geneListMat + '\', \'gene_list\')\\"'
 
-        cmdToRun = ' '.join(['docker run --rm --entrypoint /bin/sh -v', 
-                             str(Path.cwd())+':/usr/local/SINGE/data/ grnbeeline/singe:0.4.1 -c \"echo \\"',
+        cmdToRun = ' '.join(['echo \\"',
                              params_str, '\\" >', paramsFile, '&&', symlink_out_file, '&&', convert_input_to_matfile,
                              '&& time -v -o', "data/" + str(outDir) + 'time'+str(idx)+'.txt',
                              '/usr/local/SINGE/SINGE.sh /usr/local/MATLAB/MATLAB_Runtime/v94 standalone',
-                             inputMat, geneListMat, outFileSymlink, paramsFile, '\"'])
-        print(cmdToRun)
+                             inputMat, geneListMat, outFileSymlink, paramsFile])
         # also print the parameters
         print("\tParameters: %s" % (', '.join("%s: %s" % (p, str(params[p])) for p in params_order)))
-        subprocess.check_call(cmdToRun, shell=True)
+        RunnerObj.runContainer('/usr/local/SINGE/data/', cmdToRun)
 
 
 def parseOutput(RunnerObj):
     '''
     Function to parse outputs from SINGE.
     '''
-    outDir = "outputs/"+str(RunnerObj.inputDir).split("inputs/")[1]+"/SINGE/"
+    outDir = RunnerObj.getOutputDir()
     PTData = pd.read_csv(RunnerObj.inputDir.joinpath(RunnerObj.cellData),
                              header = 0, index_col = 0)
 
     colNames = PTData.columns
-    OutSubDF = [0]*len(colNames)
-
+    # Merge the trajectories by taking the maximum weight of each edge
+    merger = EdgeMerger()
     for idx in range(len(colNames)):  
         
         # Quit if output directory does not exist
@@ -138,16 +137,9 @@ def parseOutput(RunnerObj):
             return
 
         # Read output
-        OutSubDF[idx] = pd.read_csv(outDir+ str(idx)+'/SINGE_Ranked_Edge_List.txt',
+        OutDF = pd.read_csv(outDir+ str(idx)+'/SINGE_Ranked_Edge_List.txt',
                             sep = '\t', header = 0)
-    # megre the dataframe by taking the maximum value from each DF
-    # Code from here: 
-    # https://stackoverflow.com/questions/20383647/pandas-selecting-by-label-sometimes-return-series-sometimes-returns-dataframe
-    outDF = pd.concat(OutSubDF)
-    outDF.columns= ['Gene1','Gene2','EdgeWeight']
-    # Group by rows code is from here:
-    # https://stackoverflow.com/questions/53114609/pandas-how-to-remove-duplicate-rows-but-keep-all-rows-with-max-value
-    res = outDF[outDF['EdgeWeight'] == outDF.groupby(['Gene1','Gene2'])['EdgeWeight'].transform('max')]
-    # Sort values in the dataframe   
-    finalDF = res.sort_values('EdgeWeight', ascending=False)   
-    finalDF.to_csv(outDir+'rankedEdges.csv',sep='\t', index = False)
+        merger.addEdges(OutDF, columns = OutDF.columns[:3])
+
+    writeRankedEdges(merger.getRankedEdges(), outDir + 'rankedEdges.csv',
+                     formats = RunnerObj.edgeFormats)
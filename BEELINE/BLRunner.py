@@ -21,6 +21,7 @@ import concurrent.futures
 from typing import Dict, List
 from BLRun.runner import Runner
 import os
+import sys
 import pandas as pd
 
 import BLRun as br
@@ -38,6 +39,38 @@ def get_parser() -> argparse.ArgumentParser:
     parser.add_argument('--config', default='config.yaml',
         help='Path to config file')
 
+    parser.add_argument('--cores', type=float, default=None,
+        help='Number of cores shared by the algorithms running '
+        'concurrently (default: all the cores)')
+
+    parser.add_argument('--memory', type=float, default=None,
+        help='Memory in GB shared by the algorithms running '
+        'concurrently (default: all the physical memory)')
+
+    parser.add_argument('--force', action='store_true', default=False,
+        help='Run all the algorithms again, even if their outputs '
+        'for the same inputs and parameters are in the cache')
+
+    parser.add_argument('--executor', choices=['docker', 'warm', 'local', 'native'],
+        default='docker',
+        help='How to run the algorithms: in a new container per command '
+        '(docker), in worker containers kept for later commands (warm), '
+        'on the host, e.g. for testing (local), or in a local process '
+        'pool for the Python algorithms GENIE3, GRNBOOST2 and SCSGL, '
+        'and in new containers for the others (native)')
+
+    parser.add_argument('--sample', type=float, default=None, metavar='SECONDS',
+        help='Sample the CPU and memory usage of each algorithm every '
+        'SECONDS seconds while it runs, to resources.csv next to its '
+        'time.txt (default: no sampling)')
+
+    parser.add_argument('--formats', nargs='+', choices=['csv', 'feather', 'parquet'],
+        default=['csv', 'feather'],
+        help='Formats in which the ranked edges of each algorithm are '
+        'written: rankedEdges.csv, and the binary rankedEdges.feather '
+        'and rankedEdges.parquet, which need pyarrow and are read by '
+        'BLEvaluator.py instead of the text file (default: csv feather)')
+
     return parser
 
 def parse_arguments():
@@ -61,16 +94,15 @@ def main():
     print('Evaluation started')
 
 
-    for idx in range(len(evaluation.runners)):
-        evaluation.runners[idx].generateInputs()
-
-    for idx in range(len(evaluation.runners)):
-        evaluation.runners[idx].run()
-
-    for idx in range(len(evaluation.runners)):
-        evaluation.runners[idx].parseOutput()
+    failures = evaluation.execute_runners(cores=opts.cores, memory=opts.memory,
+                                          force=opts.force, executor=opts.executor,
+                                          sampleInterval=opts.sample,
+                                          edgeFormats=opts.formats)
 
     print('Evaluation complete')
+    if failures:
+        print('%d run(s) failed, see failure.json in their output folders' % len(failures))
+        sys.exit(1)
 
 
 if __name__ == '__main__':